@@ -0,0 +1,186 @@
+# app/analytics/cohorts.py
+import threading
+
+import numpy as np
+
+from app.db.evaluations import SCORE_CRITERIA, fetch_score_rows
+
+BATCH_SIZE = 20000  # rows per bulk read during refresh
+HISTOGRAM_BINS = np.arange(0, 105, 5)  # totals are multiples of 5 in [0, 100]
+
+
+class ScoreStore:
+    """
+    Column-oriented, in-memory copy of the score columns of `evaluations`.
+    refresh() only reads rows newer than the last one seen, so keeping it
+    current costs one indexed query per rerun.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.ids = np.empty(0, dtype=np.int64)
+        self.role_ids = np.empty(0, dtype=np.int64)
+        self.scores = np.empty((0, len(SCORE_CRITERIA)), dtype=np.float64)
+        self.names = []
+        self.created_at = []
+        self.last_id = 0
+        self.version = 0
+        self._rank_cache = {}
+
+    def refresh(self) -> int:
+        """Append evaluations saved since the last refresh; returns how many."""
+        with self.lock:
+            added = 0
+            while True:
+                rows = fetch_score_rows(self.last_id, BATCH_SIZE)
+                if not rows:
+                    break
+                ids, role_ids, names, created_at, *cols = zip(*rows)
+                self.ids = np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)])
+                self.role_ids = np.concatenate(
+                    # NULL role_id (deleted/unknown role) becomes -1
+                    [self.role_ids, np.asarray([r if r is not None else -1 for r in role_ids],
+                                               dtype=np.int64)]
+                )
+                block = np.asarray(cols, dtype=np.float64).T
+                self.scores = np.vstack([self.scores, np.nan_to_num(block)])
+                self.names.extend(names)
+                self.created_at.extend(created_at)
+                self.last_id = int(ids[-1])
+                added += len(rows)
+                if len(rows) < BATCH_SIZE:
+                    break
+            if added:
+                self.version += 1
+                self._rank_cache.clear()
+            return added
+
+    @property
+    def totals(self) -> np.ndarray:
+        return self.scores.sum(axis=1)
+
+    def _mask(self, role_id):
+        if role_id is None:
+            return np.ones(len(self.ids), dtype=bool)
+        return self.role_ids == role_id
+
+    def role_stats(self, role_id=None) -> dict:
+        """Count, per-criterion mean/variance and total mean/variance."""
+        with self.lock:
+            scores = self.scores[self._mask(role_id)]
+            if not len(scores):
+                return {"count": 0}
+            totals = scores.sum(axis=1)
+            means = scores.mean(axis=0)
+            variances = scores.var(axis=0)
+            return {
+                "count": int(len(scores)),
+                "criteria": {
+                    c: {"mean": float(m), "variance": float(v)}
+                    for c, m, v in zip(SCORE_CRITERIA, means, variances)
+                },
+                "total_mean": float(totals.mean()),
+                "total_variance": float(totals.var()),
+                "total_percentiles": {
+                    p: float(v)
+                    for p, v in zip((25, 50, 75, 90), np.percentile(totals, [25, 50, 75, 90]))
+                },
+            }
+
+    def histogram(self, role_id=None) -> dict:
+        """Number of candidates per total score (0, 5, ..., 100)."""
+        with self.lock:
+            totals = self.totals[self._mask(role_id)]
+            counts, _ = np.histogram(totals, bins=np.append(HISTOGRAM_BINS, 105))
+            return {int(b): int(c) for b, c in zip(HISTOGRAM_BINS, counts)}
+
+    def criterion_correlations(self, role_id=None) -> dict:
+        """Pearson correlation between criteria (None where a criterion has no variance)."""
+        with self.lock:
+            scores = self.scores[self._mask(role_id)]
+            if len(scores) < 2:
+                return {}
+            with np.errstate(invalid="ignore", divide="ignore"):
+                corr = np.corrcoef(scores, rowvar=False)
+            return {
+                a: {
+                    b: (None if np.isnan(corr[i, j]) else float(corr[i, j]))
+                    for j, b in enumerate(SCORE_CRITERIA)
+                }
+                for i, a in enumerate(SCORE_CRITERIA)
+            }
+
+    def percentile_ranks(self, role_id) -> tuple:
+        """
+        (row indexes of the role, percentile rank of each within the role).
+        Rank = % of the role's candidates scoring lower, ties counted half.
+        """
+        with self.lock:
+            key = (role_id, self.version)
+            cached = self._rank_cache.get(key)
+            if cached is not None:
+                return cached
+            idx = np.flatnonzero(self._mask(role_id))
+            totals = self.totals[idx]
+            ordered = np.sort(totals)
+            below = np.searchsorted(ordered, totals, side="left")
+            upto = np.searchsorted(ordered, totals, side="right")
+            ranks = 100.0 * (below + 0.5 * (upto - below)) / max(len(totals), 1)
+            self._rank_cache[key] = (idx, ranks)
+            return idx, ranks
+
+    def leaderboard(self, role_id, limit: int = 50, offset: int = 0) -> list:
+        """Candidates of a role sorted by total score, with their percentile rank."""
+        with self.lock:
+            idx, ranks = self.percentile_ranks(role_id)
+            totals = self.totals[idx]
+            # highest total first, ties: older evaluation first
+            order = np.lexsort((self.ids[idx], -totals))[offset:offset + limit]
+            board = []
+            for pos, o in enumerate(order, start=offset + 1):
+                row = idx[o]
+                entry = {
+                    "rank": pos,
+                    "evaluation_id": int(self.ids[row]),
+                    "candidate": self.names[row] or "Unknown",
+                    "total": int(totals[o]),
+                    "percentile": round(float(ranks[o]), 1),
+                    "created_at": self.created_at[row],
+                }
+                entry.update({c: int(v) for c, v in zip(SCORE_CRITERIA, self.scores[row])})
+                board.append(entry)
+            return board
+
+    def compare_roles(self) -> list:
+        """Total score distribution per role, for cross-role comparison."""
+        with self.lock:
+            result = []
+            totals = self.totals
+            for role_id in np.unique(self.role_ids):
+                t = totals[self.role_ids == role_id]
+                p25, p50, p75 = np.percentile(t, [25, 50, 75])
+                result.append({
+                    "role_id": int(role_id),
+                    "count": int(len(t)),
+                    "mean": round(float(t.mean()), 1),
+                    "p25": float(p25),
+                    "median": float(p50),
+                    "p75": float(p75),
+                    "std": round(float(t.std()), 1),
+                })
+            return result
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_score_store() -> ScoreStore:
+    """Process-wide store, refreshed incrementally on every call."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ScoreStore()
+    _store.refresh()
+    return _store
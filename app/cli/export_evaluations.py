@@ -0,0 +1,55 @@
+# app/cli/export_evaluations.py
+"""
+Export evaluations in bulk to JSONL, CSV, Parquet or a ZIP of Markdown reports.
+
+    python -m app.cli.export_evaluations --format parquet --role-id 3 -o role3.parquet
+
+Rows are streamed from one SQLite cursor and written in chunks, so memory
+stays flat whatever the number of evaluations.
+"""
+import argparse
+import json
+import sys
+import time
+
+from app.db import connection
+from app.db.migrations import ensure_schema
+from app.export.evaluations import EXPORT_FORMATS, write_export
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="jsonl")
+    parser.add_argument("--role-id", type=int)
+    parser.add_argument("--from", dest="date_from", help="YYYY-MM-DD, inclusive")
+    parser.add_argument("--to", dest="date_to", help="YYYY-MM-DD, inclusive")
+    parser.add_argument("-o", "--output",
+                        help="output file, '-' for stdout (default: evaluations.<ext>)")
+    parser.add_argument("--db", help="database file (default: JOBFIT_DB_PATH or jobfit.db)")
+    args = parser.parse_args()
+
+    if args.db:
+        connection.set_db_path(args.db)
+    ensure_schema()
+
+    output = args.output or f"evaluations.{EXPORT_FORMATS[args.format][1]}"
+    start = time.perf_counter()
+    if output == "-":
+        count = write_export(args.format, sys.stdout.buffer,
+                             args.role_id, args.date_from, args.date_to)
+        sys.stdout.buffer.flush()
+    else:
+        with open(output, "wb") as out:
+            count = write_export(args.format, out,
+                                 args.role_id, args.date_from, args.date_to)
+
+    print(json.dumps({
+        "format": args.format,
+        "output": output,
+        "rows": count,
+        "elapsed_sec": round(time.perf_counter() - start, 2),
+    }), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+# app/cli/score_batch.py
+"""
+Score a JSONL/CSV file of candidates and answers for a role, without the UI.
+
+    python -m app.cli.score_batch answers.jsonl --role-id 3 --workers 8
+
+JSONL: one object per line, {"name", "email", "phone", "answers": {focus: answer}}
+(or a nested "candidate" object). CSV: name/email/phone columns plus either an
+"answers" column holding JSON or one column per focus.
+
+Scored rows are stored in batches together with a checkpoint per record, so
+running the same command again after a crash only scores what is missing.
+Records the judge could not fully score are reported as failed and left
+without a checkpoint, so the next run retries them.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from app.db import connection
+from app.db.imports import clear_import_checkpoints, imported_records, save_import_batch
+from app.db.migrations import ensure_schema
+from app.db.roles import get_role
+from app.llm.client import MAX_CONCURRENCY
+from app.llm.judge import evaluate_answers_with_llama, failed_parts
+
+CANDIDATE_FIELDS = ("name", "email", "phone", "years_exp", "tools")
+PROGRESS_EVERY = 10.0  # seconds between progress lines on stderr
+
+
+def source_key(path: Path, role_id: int) -> str:
+    """Checkpoint namespace: role + file content, so an edited file starts over."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return f"role:{role_id}:{digest.hexdigest()}"
+
+
+def iter_records(path: Path, fmt: str):
+    """Yield (record_no, raw dict) lazily; record_no is the line (JSONL) or data row (CSV)."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            for record_no, row in enumerate(csv.DictReader(f), start=1):
+                yield record_no, row
+        else:
+            for record_no, line in enumerate(f, start=1):
+                if line.strip():
+                    yield record_no, line
+
+
+def parse_record(raw, fmt: str):
+    """(candidate, answers) from a JSONL line or a CSV row."""
+    if fmt == "jsonl":
+        raw = json.loads(raw)
+    if not isinstance(raw, dict):
+        raise ValueError("record is not an object")
+
+    candidate = raw.get("candidate")
+    if not isinstance(candidate, dict):
+        candidate = {k: raw[k] for k in CANDIDATE_FIELDS if raw.get(k) not in (None, "")}
+
+    answers = raw.get("answers")
+    if isinstance(answers, str):
+        answers = json.loads(answers)
+    if answers is None:
+        skip = {*CANDIDATE_FIELDS, "candidate", "answers"}
+        answers = {k: v for k, v in raw.items() if k not in skip and v not in (None, "")}
+    if not isinstance(answers, dict) or not answers:
+        raise ValueError("record has no answers")
+    return candidate, answers
+
+
+def _score(record_no: int, candidate: dict, answers: dict, per_criterion):
+    start = time.perf_counter()
+    result = evaluate_answers_with_llama(answers, per_criterion=per_criterion)
+    elapsed = time.perf_counter() - start
+    # Placeholder scores are not saved or checkpointed: a rerun scores the record again
+    failed = failed_parts(result)
+    if failed:
+        raise RuntimeError(f"the judge gave no usable answer for {', '.join(failed)}")
+    return (record_no, candidate, answers, result["scores"], result["summary"]), elapsed
+
+
+def _percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    rank = max(int(-(-p * len(ordered) // 100)), 1)  # nearest rank
+    return ordered[rank - 1]
+
+
+def _stage_summary(samples: list) -> dict:
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "mean_ms": round(1000 * sum(samples) / len(samples), 1),
+        "p50_ms": round(1000 * _percentile(samples, 50), 1),
+        "p95_ms": round(1000 * _percentile(samples, 95), 1),
+        "max_ms": round(1000 * max(samples), 1),
+    }
+
+
+def run(path: Path, role_id: int, fmt: str, workers: int, batch_size: int,
+        per_criterion=None, restart: bool = False) -> dict:
+    ensure_schema()
+    if get_role(role_id) is None:
+        raise SystemExit(f"Role {role_id} not found")
+
+    source = source_key(path, role_id)
+    if restart:
+        clear_import_checkpoints(source)
+    done = imported_records(source)
+
+    stages = {"parse": [], "judge": [], "write": []}
+    counts = {"records": 0, "skipped": 0, "scored": 0, "failed": 0}
+    batch = []
+    started = time.perf_counter()
+    last_report = started
+
+    def flush():
+        if not batch:
+            return
+        t0 = time.perf_counter()
+        counts["scored"] += save_import_batch(source, role_id, batch)
+        stages["write"].append(time.perf_counter() - t0)
+        batch.clear()
+
+    def collect(finished):
+        nonlocal last_report
+        for future in finished:
+            try:
+                item, elapsed = future.result()
+            except Exception as e:
+                counts["failed"] += 1
+                print(f"record {future.record_no}: {type(e).__name__}: {e}", file=sys.stderr)
+                continue
+            stages["judge"].append(elapsed)
+            batch.append(item)
+            if len(batch) >= batch_size:
+                flush()
+        now = time.perf_counter()
+        if now - last_report >= PROGRESS_EVERY:
+            last_report = now
+            rate = 60 * counts["scored"] / (now - started)
+            print(
+                f"{counts['scored']} scored, {counts['failed']} failed, "
+                f"{len(batch)} unsaved, {rate:.1f} candidates/min",
+                file=sys.stderr,
+            )
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="score-batch")
+    pending = set()
+    try:
+        for record_no, raw in iter_records(path, fmt):
+            counts["records"] += 1
+            if record_no in done:
+                counts["skipped"] += 1
+                continue
+            t0 = time.perf_counter()
+            try:
+                candidate, answers = parse_record(raw, fmt)
+            except (ValueError, TypeError) as e:
+                counts["failed"] += 1
+                print(f"record {record_no}: {e}", file=sys.stderr)
+                continue
+            stages["parse"].append(time.perf_counter() - t0)
+
+            future = pool.submit(_score, record_no, candidate, answers, per_criterion)
+            future.record_no = record_no
+            pending.add(future)
+            # Bounded in-flight work: the file is never read far ahead of the judge
+            if len(pending) >= 2 * workers:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(finished)
+    except KeyboardInterrupt:
+        print("Interrupted: saving finished records, rerun to resume.", file=sys.stderr)
+        pool.shutdown(wait=False, cancel_futures=True)
+    finally:
+        flush()
+        pool.shutdown(wait=False)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "source": source,
+        "role_id": role_id,
+        "workers": workers,
+        **counts,
+        "elapsed_sec": round(elapsed, 1),
+        "candidates_per_min": round(60 * counts["scored"] / elapsed, 1) if elapsed else 0.0,
+        "stages": {name: _stage_summary(samples) for name, samples in stages.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", type=Path, help="JSONL or CSV file")
+    parser.add_argument("--role-id", type=int, required=True)
+    parser.add_argument("--format", choices=("jsonl", "csv"),
+                        help="default: from the file extension")
+    parser.add_argument("--workers", type=int, default=MAX_CONCURRENCY,
+                        help="concurrent judge calls (default: LLM_MAX_CONCURRENCY)")
+    parser.add_argument("--batch-size", type=int, default=50,
+                        help="evaluations per write transaction")
+    parser.add_argument("--per-criterion", action=argparse.BooleanOptionalAction,
+                        default=None, help="override JUDGE_PER_CRITERION")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore the checkpoints of a previous run of this file")
+    parser.add_argument("--db", help="database file (default: JOBFIT_DB_PATH or jobfit.db)")
+    args = parser.parse_args()
+
+    if args.db:
+        connection.set_db_path(args.db)
+    fmt = args.format or ("csv" if args.input.suffix.lower() == ".csv" else "jsonl")
+
+    summary = run(
+        args.input, args.role_id, fmt, max(args.workers, 1), max(args.batch_size, 1),
+        per_criterion=args.per_criterion, restart=args.restart,
+    )
+    print(json.dumps(summary, indent=2))
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
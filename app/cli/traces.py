@@ -0,0 +1,47 @@
+# app/cli/traces.py
+"""
+List the interview traces in a JSONL trace file, or print one as a waterfall.
+
+    python -m app.cli.traces                  # most recent traces
+    python -m app.cli.traces 4bf92f3577b34da6 # waterfall of a trace (id prefix)
+
+Spans are written by app/observability/tracing.py (JOBFIT_TRACE_FILE).
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from app.observability import tracing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("trace_id", nargs="?", help="trace id or unique prefix")
+    parser.add_argument("--file", help="trace file (default: JOBFIT_TRACE_FILE)")
+    parser.add_argument("--limit", type=int, default=20, help="traces to list")
+    parser.add_argument("--width", type=int, default=60, help="waterfall bar width")
+    args = parser.parse_args()
+
+    if not (args.file or tracing.TRACE_FILE):
+        sys.exit("No trace file: pass --file or set JOBFIT_TRACE_FILE.")
+    records = tracing.load_spans(args.file)
+    traces = tracing.list_traces(records)
+
+    if not args.trace_id:
+        for t in traces[:args.limit]:
+            started = datetime.fromtimestamp(t["start_ns"] / 1e9).strftime("%Y-%m-%d %H:%M:%S")
+            attrs = t["attributes"]
+            role = [str(attrs[k]) for k in ("role.company", "role.title") if attrs.get(k)]
+            name = " – ".join([t["name"], *role])
+            print(f"{t['trace_id']}  {started}  {t['duration_ms'] / 1000:>8.1f}s  "
+                  f"{t['spans']:>4} spans  {t['errors']:>2} errors  {name}")
+        return
+
+    matches = [t for t in traces if t["trace_id"].startswith(args.trace_id)]
+    if len(matches) != 1:
+        sys.exit(f"{len(matches)} traces match {args.trace_id!r}")
+    print(tracing.format_waterfall(tracing.waterfall(records, matches[0]["trace_id"]), args.width))
+
+
+if __name__ == "__main__":
+    main()
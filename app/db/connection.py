@@ -0,0 +1,75 @@
+# app/db/connection.py
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+DB_PATH = Path(os.environ.get("JOBFIT_DB_PATH", "jobfit.db"))
+
+BUSY_TIMEOUT_MS = 10000  # wait for the writer lock instead of "database is locked"
+CACHE_SIZE_KB = 16384  # page cache per connection
+STATEMENT_CACHE = 256  # compiled statements kept per connection
+
+_local = threading.local()
+
+
+def set_db_path(path):
+    """Point every module at another database file (CLIs, benchmarks)."""
+    global DB_PATH
+    DB_PATH = Path(path)
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=STATEMENT_CACHE,
+    )
+    # WAL: readers never block the writer and vice versa (persisted in the file)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    # NORMAL is durable across application crashes in WAL mode, only an OS crash can lose the last commits
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+def get_conn() -> sqlite3.Connection:
+    """
+    Connection owned by the calling thread, opened once and reused.
+    Do not close it: use `with conn:` to commit (or roll back) a write.
+    The same SQL text reuses its prepared statement from the connection cache.
+    """
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(DB_PATH)
+    if conn is None:
+        conn = conns[DB_PATH] = _connect(DB_PATH)
+    return conn
+
+
+@contextmanager
+def immediate_transaction():
+    """
+    Take the write lock up front (BEGIN IMMEDIATE) for read-then-update
+    sequences such as claiming a job, so two processes cannot race.
+    """
+    conn = get_conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+
+
+def close_thread_connections():
+    conns = getattr(_local, "conns", None) or {}
+    for conn in conns.values():
+        conn.close()
+    conns.clear()
@@ -1,58 +1,65 @@
 # app/db/evaluations.py
-import sqlite3, json
-from pathlib import Path
+import json
+from app.db.connection import get_conn
+from app.observability.metrics import timed_db
 
-DB_PATH = Path("jobfit.db")
+SCORE_CRITERIA = [
+    "Evidence density",
+    "Decision quality",
+    "Failure intelligence",
+    "Context translation",
+    "Uniqueness signal",
+]
 
-def get_conn():
-    return sqlite3.connect(DB_PATH)
+# Typed copies of scores_json, filled by save_evaluation (criterion -> column)
+SCORE_COLUMNS = {
+    "Evidence density": "score_evidence_density",
+    "Decision quality": "score_decision_quality",
+    "Failure intelligence": "score_failure_intelligence",
+    "Context translation": "score_context_translation",
+    "Uniqueness signal": "score_uniqueness_signal",
+}
 
-def init_evaluations_db():
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS evaluations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            role_id INTEGER,
-            candidate_name TEXT,
-            candidate_email TEXT,
-            candidate_phone TEXT,
-            answers_json TEXT,
-            scores_json TEXT,
-            summary TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-        """
+INSERT_EVALUATION_SQL = """
+    INSERT INTO evaluations (
+        role_id, candidate_name, candidate_email, candidate_phone,
+        answers_json, scores_json, summary,
+        score_evidence_density, score_decision_quality, score_failure_intelligence,
+        score_context_translation, score_uniqueness_signal, total_score
     )
-    conn.commit()
-    conn.close()
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
 
+def evaluation_params(role_id: int, candidate: dict, answers: dict,
+                      scores: dict, summary: str) -> tuple:
+    """Parameters of INSERT_EVALUATION_SQL for one evaluation."""
+    criterion_scores = [int(scores.get(c) or 0) for c in SCORE_CRITERIA]
+    return (
+        role_id,
+        candidate.get("name"),
+        candidate.get("email"),
+        candidate.get("phone"),
+        json.dumps(answers),
+        json.dumps(scores),
+        summary,
+        *criterion_scores,
+        sum(criterion_scores),
+    )
+
+@timed_db
 def save_evaluation(role_id: int, candidate: dict, answers: dict,
-                    scores: dict, summary: str):
+                    scores: dict, summary: str) -> int:
     conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        INSERT INTO evaluations (
-            role_id, candidate_name, candidate_email, candidate_phone,
-            answers_json, scores_json, summary
+    with conn:
+        cur = conn.cursor()
+        cur.execute(
+            INSERT_EVALUATION_SQL,
+            evaluation_params(role_id, candidate, answers, scores, summary),
         )
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            role_id,
-            candidate.get("name"),
-            candidate.get("email"),
-            candidate.get("phone"),
-            json.dumps(answers),
-            json.dumps(scores),
-            summary,
-        ),
-    )
-    conn.commit()
-    conn.close()
+        eval_id = cur.lastrowid
+    return eval_id
 
+@timed_db
 def list_evaluations():
     conn = get_conn()
     cur = conn.cursor()
@@ -64,29 +71,136 @@ def list_evaluations():
         """
     )
     rows = cur.fetchall()
-    conn.close()
     return rows
 
+def _filter_sql(role_id=None, date_from=None, date_to=None,
+                min_total=None, max_total=None):
+    """WHERE conditions + params shared by the listing and the bulk export."""
+    where = []
+    params = []
+    if role_id is not None:
+        where.append("role_id = ?")
+        params.append(role_id)
+    if date_from:
+        where.append("created_at >= ?")
+        params.append(str(date_from))
+    if date_to:
+        where.append("created_at < date(?, '+1 day')")
+        params.append(str(date_to))
+    if min_total is not None:
+        where.append("total_score >= ?")
+        params.append(min_total)
+    if max_total is not None:
+        where.append("total_score <= ?")
+        params.append(max_total)
+    return where, params
+
+@timed_db
+def list_evaluations_page(limit: int = 50, cursor=None, role_id: int | None = None,
+                          date_from: str | None = None, date_to: str | None = None,
+                          min_total: int | None = None, max_total: int | None = None):
+    """
+    Keyset-paginated list, newest first.
+    cursor: (created_at, id) of the last row of the previous page, None for the first page.
+    date_from / date_to: 'YYYY-MM-DD', both inclusive. min_total / max_total: score band.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    where, params = _filter_sql(role_id, date_from, date_to, min_total, max_total)
+    if cursor is not None:
+        where.append("(created_at, id) < (?, ?)")
+        params.extend(cursor)
+
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        SELECT id, created_at, role_id, candidate_name, candidate_email, candidate_phone
+        FROM evaluations
+        {where_sql}
+        ORDER BY created_at DESC, id DESC
+        LIMIT ?
+        """,
+        (*params, limit + 1),
+    )
+    rows = cur.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (rows[-1][1], rows[-1][0])
+    return rows, next_cursor
+
+EXPORT_COLUMNS = [
+    "id", "created_at", "role_id",
+    "candidate_name", "candidate_email", "candidate_phone",
+    *SCORE_COLUMNS.values(), "total_score",
+    "summary", "scores_json", "answers_json",
+]
+
+@timed_db
+def count_evaluations(role_id: int | None = None, date_from: str | None = None,
+                      date_to: str | None = None) -> int:
+    """Number of evaluations iter_evaluations() would yield for the same filters."""
+    where, params = _filter_sql(role_id, date_from, date_to)
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(f"SELECT COUNT(*) FROM evaluations {where_sql}", params)
+    return cur.fetchone()[0]
+
+@timed_db
+def iter_evaluations(role_id: int | None = None, date_from: str | None = None,
+                     date_to: str | None = None, batch_size: int = 500):
+    """
+    Every matching evaluation as a dict (EXPORT_COLUMNS), in id order.
+    One cursor stepped with fetchmany: memory stays at batch_size rows
+    whatever the table size.
+    """
+    where, params = _filter_sql(role_id, date_from, date_to)
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        SELECT {", ".join(EXPORT_COLUMNS)}
+        FROM evaluations
+        {where_sql}
+        ORDER BY id
+        """,
+        params,
+    )
+    try:
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(zip(EXPORT_COLUMNS, row))
+    finally:
+        cur.close()
+
+@timed_db
 def get_evaluation(eval_id: int):
     conn = get_conn()
     cur = conn.cursor()
     cur.execute(
         """
         SELECT id, role_id, candidate_name, candidate_email, candidate_phone,
-               answers_json, scores_json, summary, created_at
+               answers_json, scores_json, summary, created_at, total_score
         FROM evaluations
         WHERE id = ?
         """,
         (eval_id,),
     )
     row = cur.fetchone()
-    conn.close()
     if not row:
         return None
 
     (
         _id, role_id, name, email, phone,
-        answers_json, scores_json, summary, created_at
+        answers_json, scores_json, summary, created_at, total_score
     ) = row
 
     return {
@@ -99,4 +213,103 @@ def get_evaluation(eval_id: int):
         "scores_json": scores_json,
         "summary": summary,
         "created_at": created_at,
+        "total_score": total_score,
     }
+
+
+def _role_filter(role_id):
+    if role_id is None:
+        return "WHERE total_score IS NOT NULL", ()
+    return "WHERE role_id = ? AND total_score IS NOT NULL", (role_id,)
+
+@timed_db
+def top_evaluations_for_role(role_id: int, n: int = 10):
+    """Best n candidates of a role: (id, candidate_name, total_score, created_at)."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT id, candidate_name, total_score, created_at
+        FROM evaluations
+        WHERE role_id = ? AND total_score IS NOT NULL
+        ORDER BY total_score DESC, id
+        LIMIT ?
+        """,
+        (role_id, n),
+    )
+    return cur.fetchall()
+
+@timed_db
+def criterion_averages(role_id: int | None = None) -> dict:
+    """Average per criterion and of the total, optionally for one role."""
+    where_sql, params = _role_filter(role_id)
+    columns = [*SCORE_COLUMNS.values(), "total_score"]
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        SELECT COUNT(*), {", ".join(f"AVG({c})" for c in columns)}
+        FROM evaluations
+        {where_sql}
+        """,
+        params,
+    )
+    count, *avgs = cur.fetchone()
+    result = {"count": count}
+    result.update(zip([*SCORE_CRITERIA, "Total"], avgs))
+    return result
+
+@timed_db
+def total_score_percentiles(role_id: int | None = None,
+                            percentiles=(25, 50, 75, 90)) -> dict:
+    """
+    Nearest-rank percentiles of total_score, all from one ordered pass over
+    the total_score index: counts per distinct total (at most 101 rows),
+    walked until each rank is reached.
+    """
+    where_sql, params = _role_filter(role_id)
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        SELECT total_score, COUNT(*) FROM evaluations
+        {where_sql}
+        GROUP BY total_score
+        ORDER BY total_score
+        """,
+        params,
+    )
+    counts = cur.fetchall()
+    count = sum(n for _, n in counts)
+    if not count:
+        return {p: None for p in percentiles}
+    result = {}
+    for p in percentiles:
+        rank = max(int(-(-p * count // 100)), 1)  # ceil(p/100 * count)
+        seen = 0
+        for total, n in counts:
+            seen += n
+            if seen >= rank:
+                result[p] = total
+                break
+    return result
+
+@timed_db
+def fetch_score_rows(after_id: int = 0, limit: int = 10000):
+    """
+    Bulk read for analytics: rows with id > after_id, in id order.
+    (id, role_id, candidate_name, created_at, <5 criterion scores>)
+    """
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        SELECT id, role_id, candidate_name, created_at, {", ".join(SCORE_COLUMNS.values())}
+        FROM evaluations
+        WHERE id > ? AND total_score IS NOT NULL
+        ORDER BY id
+        LIMIT ?
+        """,
+        (after_id, limit),
+    )
+    return cur.fetchall()
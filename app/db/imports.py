@@ -0,0 +1,43 @@
+# app/db/imports.py
+from app.db.connection import get_conn
+from app.db.evaluations import INSERT_EVALUATION_SQL, evaluation_params
+from app.observability.metrics import timed_db
+
+@timed_db
+def imported_records(source: str) -> set:
+    """Record numbers of `source` already stored by a previous run."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT record_no FROM import_checkpoints WHERE source = ?", (source,))
+    return {row[0] for row in cur.fetchall()}
+
+@timed_db
+def save_import_batch(source: str, role_id: int, batch: list) -> int:
+    """
+    Store scored records and their checkpoints in one transaction, so a crash
+    never leaves an evaluation without its checkpoint (or the reverse).
+    batch: list of (record_no, candidate, answers, scores, summary).
+    """
+    if not batch:
+        return 0
+    conn = get_conn()
+    with conn:
+        cur = conn.cursor()
+        cur.executemany(
+            INSERT_EVALUATION_SQL,
+            [
+                evaluation_params(role_id, candidate, answers, scores, summary)
+                for _, candidate, answers, scores, summary in batch
+            ],
+        )
+        cur.executemany(
+            "INSERT OR IGNORE INTO import_checkpoints (source, record_no) VALUES (?, ?)",
+            [(source, item[0]) for item in batch],
+        )
+    return len(batch)
+
+@timed_db
+def clear_import_checkpoints(source: str):
+    conn = get_conn()
+    with conn:
+        conn.execute("DELETE FROM import_checkpoints WHERE source = ?", (source,))
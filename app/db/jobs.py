@@ -0,0 +1,207 @@
+# app/db/jobs.py
+import json, time
+from app.db.connection import get_conn, immediate_transaction
+from app.db.evaluations import INSERT_EVALUATION_SQL, evaluation_params
+from app.observability.metrics import timed_db
+
+JOB_COLUMNS = """
+    id, role_id, candidate_json, answers_json, status, attempts, max_attempts,
+    error, evaluation_id, created_at, run_after, started_at, finished_at, trace_parent,
+    partial_json
+"""
+
+def _row_to_job(row):
+    (
+        _id, role_id, candidate_json, answers_json, status, attempts, max_attempts,
+        error, evaluation_id, created_at, run_after, started_at, finished_at, trace_parent,
+        partial_json
+    ) = row
+    return {
+        "id": _id,
+        "role_id": role_id,
+        "candidate": json.loads(candidate_json or "{}"),
+        "answers": json.loads(answers_json or "{}"),
+        "status": status,
+        "attempts": attempts,
+        "max_attempts": max_attempts,
+        "error": error,
+        "evaluation_id": evaluation_id,
+        "created_at": created_at,
+        "run_after": run_after,
+        "started_at": started_at,
+        "finished_at": finished_at,
+        "trace_parent": trace_parent,
+        "partial": json.loads(partial_json) if partial_json else None,
+    }
+
+@timed_db
+def enqueue_evaluation_job(role_id: int, candidate: dict, answers: dict,
+                           max_attempts: int = 3, trace_parent: str | None = None,
+                           partial: dict | None = None) -> int:
+    now = time.time()
+    conn = get_conn()
+    with conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO evaluation_jobs (
+                role_id, candidate_json, answers_json, status, max_attempts,
+                created_at, run_after, trace_parent, partial_json
+            )
+            VALUES (?, ?, ?, 'queued', ?, ?, ?, ?, ?)
+            """,
+            (role_id, json.dumps(candidate), json.dumps(answers), max_attempts, now, now,
+             trace_parent, json.dumps(partial) if partial is not None else None),
+        )
+        job_id = cur.lastrowid
+    return job_id
+
+@timed_db
+def claim_next_job():
+    """Atomically move the oldest runnable job to 'running' (safe across processes)."""
+    now = time.time()
+    with immediate_transaction() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"""
+            SELECT {JOB_COLUMNS}
+            FROM evaluation_jobs
+            WHERE status = 'queued' AND run_after <= ?
+            ORDER BY run_after, id
+            LIMIT 1
+            """,
+            (now,),
+        )
+        row = cur.fetchone()
+        if not row:
+            return None
+        cur.execute(
+            """
+            UPDATE evaluation_jobs
+            SET status = 'running', attempts = attempts + 1, started_at = ?, error = NULL
+            WHERE id = ?
+            """,
+            (now, row[0]),
+        )
+
+    job = _row_to_job(row)
+    job["status"] = "running"
+    job["attempts"] += 1
+    job["started_at"] = now
+    return job
+
+@timed_db
+def complete_job(job_id: int, evaluation_id: int):
+    conn = get_conn()
+    with conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            UPDATE evaluation_jobs
+            SET status = 'done', evaluation_id = ?, finished_at = ?
+            WHERE id = ?
+            """,
+            (evaluation_id, time.time(), job_id),
+        )
+
+@timed_db
+def save_job_evaluation(job: dict, scores: dict, summary: str) -> int:
+    """
+    Store the job's evaluation and mark the job done in one transaction.
+    Idempotent: a job that already has an evaluation (e.g. judged twice after
+    being requeued as stale) gets no second one; its id is returned.
+    """
+    now = time.time()
+    with immediate_transaction() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT evaluation_id FROM evaluation_jobs WHERE id = ?", (job["id"],))
+        row = cur.fetchone()
+        eval_id = row[0] if row else None
+        if eval_id is None:
+            cur.execute(
+                INSERT_EVALUATION_SQL,
+                evaluation_params(job["role_id"], job["candidate"], job["answers"],
+                                  scores, summary),
+            )
+            eval_id = cur.lastrowid
+        cur.execute(
+            """
+            UPDATE evaluation_jobs
+            SET status = 'done', evaluation_id = ?, finished_at = ?, error = NULL
+            WHERE id = ?
+            """,
+            (eval_id, now, job["id"]),
+        )
+    return eval_id
+
+@timed_db
+def fail_job(job_id: int, error: str, retry_delay: float):
+    """Re-queue with a delay while attempts remain, otherwise mark as failed."""
+    now = time.time()
+    conn = get_conn()
+    with conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            UPDATE evaluation_jobs
+            SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+                run_after = ?,
+                error = ?,
+                finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE ? END
+            WHERE id = ?
+            """,
+            (now + retry_delay, error, now, job_id),
+        )
+
+@timed_db
+def requeue_stale_jobs(older_than: float) -> int:
+    """Jobs left 'running' by a crashed process go back to the queue."""
+    conn = get_conn()
+    with conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            UPDATE evaluation_jobs
+            SET status = 'queued', run_after = ?
+            WHERE status = 'running' AND started_at < ?
+            """,
+            (time.time(), time.time() - older_than),
+        )
+        count = cur.rowcount
+    return count
+
+@timed_db
+def get_job(job_id: int):
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(f"SELECT {JOB_COLUMNS} FROM evaluation_jobs WHERE id = ?", (job_id,))
+    row = cur.fetchone()
+    if not row:
+        return None
+    return _row_to_job(row)
+
+@timed_db
+def list_jobs(statuses=("queued", "running", "failed"), limit: int = 50):
+    placeholders = ", ".join("?" for _ in statuses)
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        SELECT {JOB_COLUMNS}
+        FROM evaluation_jobs
+        WHERE status IN ({placeholders})
+        ORDER BY created_at DESC
+        LIMIT ?
+        """,
+        (*statuses, limit),
+    )
+    rows = cur.fetchall()
+    return [_row_to_job(r) for r in rows]
+
+@timed_db
+def count_jobs_by_status() -> dict:
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT status, COUNT(*) FROM evaluation_jobs GROUP BY status")
+    rows = cur.fetchall()
+    return dict(rows)
@@ -0,0 +1,82 @@
+# app/db/llm_cache.py
+import json, time
+from app.db.connection import get_conn
+from app.observability.metrics import timed_db
+
+@timed_db
+def get_cached_response(cache_key: str, ttl: float):
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT response_json, created_at FROM llm_cache WHERE cache_key = ?",
+        (cache_key,),
+    )
+    row = cur.fetchone()
+    if not row:
+        return None
+
+    response_json, created_at = row
+    now = time.time()
+    with conn:
+        if now - created_at > ttl:
+            conn.execute("DELETE FROM llm_cache WHERE cache_key = ?", (cache_key,))
+            return None
+        conn.execute(
+            "UPDATE llm_cache SET last_hit_at = ?, hits = hits + 1 WHERE cache_key = ?",
+            (now, cache_key),
+        )
+    return json.loads(response_json)
+
+@timed_db
+def save_cached_response(cache_key: str, model: str, entry: dict):
+    now = time.time()
+    conn = get_conn()
+    with conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO llm_cache (cache_key, model, response_json, created_at, last_hit_at, hits)
+            VALUES (?, ?, ?, ?, ?, 0)
+            ON CONFLICT(cache_key) DO UPDATE SET
+                model = excluded.model,
+                response_json = excluded.response_json,
+                created_at = excluded.created_at,
+                last_hit_at = excluded.last_hit_at
+            """,
+            (cache_key, model, json.dumps(entry), now, now),
+        )
+
+@timed_db
+def delete_cached_response(cache_key: str):
+    conn = get_conn()
+    with conn:
+        conn.execute("DELETE FROM llm_cache WHERE cache_key = ?", (cache_key,))
+
+@timed_db
+def evict_cached_responses(ttl: float, max_rows: int) -> int:
+    """Drop expired rows, then the least recently used ones above max_rows."""
+    conn = get_conn()
+    with conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - ttl,))
+        removed = cur.rowcount
+        cur.execute(
+            """
+            DELETE FROM llm_cache
+            WHERE cache_key IN (
+                SELECT cache_key FROM llm_cache
+                ORDER BY last_hit_at DESC
+                LIMIT -1 OFFSET ?
+            )
+            """,
+            (max_rows,),
+        )
+        removed += cur.rowcount
+    return removed
+
+@timed_db
+def clear_cached_responses():
+    conn = get_conn()
+    with conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM llm_cache")
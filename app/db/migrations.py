@@ -0,0 +1,283 @@
+# app/db/migrations.py
+import threading
+
+from app.db import connection
+from app.db.connection import get_conn, immediate_transaction
+from app.db.evaluations import SCORE_COLUMNS
+from app.observability.metrics import timed_db
+
+# Every migration must also work on databases created by the old per-page
+# init_* functions (tables may already exist): use IF NOT EXISTS / _add_column.
+
+
+def _add_column(conn, table: str, column: str, decl: str):
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in existing:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+def _m001_base_tables(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS roles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            company_name TEXT,
+            title TEXT,
+            context TEXT,
+            min_years_exp INTEGER,
+            required_tech TEXT,
+            requires_degree TEXT,
+            must_haves TEXT,
+            nice_to_have TEXT,
+            red_flags TEXT,
+            num_questions INTEGER
+        );
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS role_plans (
+            role_id INTEGER PRIMARY KEY,
+            plan_json TEXT
+        );
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS evaluations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            role_id INTEGER,
+            candidate_name TEXT,
+            candidate_email TEXT,
+            candidate_phone TEXT,
+            answers_json TEXT,
+            scores_json TEXT,
+            summary TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+    )
+
+
+def _m002_llm_cache(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            cache_key TEXT PRIMARY KEY,
+            model TEXT,
+            response_json TEXT,
+            created_at REAL,
+            last_hit_at REAL,
+            hits INTEGER DEFAULT 0
+        );
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_llm_cache_last_hit ON llm_cache(last_hit_at)"
+    )
+
+
+def _m003_evaluation_jobs(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS evaluation_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            role_id INTEGER,
+            candidate_json TEXT,
+            answers_json TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            error TEXT,
+            evaluation_id INTEGER,
+            created_at REAL,
+            run_after REAL,
+            started_at REAL,
+            finished_at REAL
+        );
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_evaluation_jobs_status ON evaluation_jobs(status, run_after)"
+    )
+
+
+def _m004_question_sets(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS role_question_sets (
+            role_id INTEGER PRIMARY KEY,
+            source_hash TEXT,
+            questions_json TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+    )
+
+
+def _m005_question_variants(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS question_variants (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            role_id INTEGER NOT NULL,
+            source_hash TEXT NOT NULL,
+            slot_id INTEGER NOT NULL,
+            question TEXT NOT NULL,
+            weight REAL NOT NULL DEFAULT 1.0,
+            served_count INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_question_variants_slot
+        ON question_variants(role_id, source_hash, slot_id, served_count)
+        """
+    )
+
+
+def _m006_evaluation_listing_indexes(conn):
+    # Newest-first listing, globally and per role (rowid breaks ties)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_evaluations_created_at ON evaluations(created_at)"
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_evaluations_role_created
+        ON evaluations(role_id, created_at)
+        """
+    )
+
+
+def _json_score_sql(criterion: str) -> str:
+    return f"""CAST(COALESCE(json_extract(scores_json, '$."{criterion}"'), 0) AS INTEGER)"""
+
+
+def _m007_score_columns(conn):
+    """Typed copies of scores_json, backfilled for existing rows."""
+    for column in [*SCORE_COLUMNS.values(), "total_score"]:
+        _add_column(conn, "evaluations", column, "INTEGER")
+
+    set_sql = ", ".join(
+        f"{col} = {_json_score_sql(crit)}" for crit, col in SCORE_COLUMNS.items()
+    )
+    total_sql = " + ".join(_json_score_sql(c) for c in SCORE_COLUMNS)
+    conn.execute(
+        f"""
+        UPDATE evaluations
+        SET {set_sql}, total_score = {total_sql}
+        WHERE total_score IS NULL
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_evaluations_role_total
+        ON evaluations(role_id, total_score)
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_evaluations_total ON evaluations(total_score)"
+    )
+
+
+def _m008_import_checkpoints(conn):
+    # Records of a bulk import file already stored (see app/cli/score_batch.py)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS import_checkpoints (
+            source TEXT NOT NULL,
+            record_no INTEGER NOT NULL,
+            imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (source, record_no)
+        );
+        """
+    )
+
+
+def _m009_job_trace_parent(conn):
+    # W3C traceparent of the interview that queued the job (app/observability/tracing.py)
+    _add_column(conn, "evaluation_jobs", "trace_parent", "TEXT")
+
+
+def _m010_job_partial_scores(conn):
+    # Per-answer scores computed during the interview (incremental judge mode)
+    _add_column(conn, "evaluation_jobs", "partial_json", "TEXT")
+
+
+# Ordered, append-only: never edit or renumber an applied migration, add a new one
+MIGRATIONS = [
+    (1, "base tables", _m001_base_tables),
+    (2, "llm response cache", _m002_llm_cache),
+    (3, "evaluation job queue", _m003_evaluation_jobs),
+    (4, "precomputed question sets", _m004_question_sets),
+    (5, "question variant pool", _m005_question_variants),
+    (6, "evaluation listing indexes", _m006_evaluation_listing_indexes),
+    (7, "typed evaluation score columns", _m007_score_columns),
+    (8, "bulk import checkpoints", _m008_import_checkpoints),
+    (9, "evaluation job trace context", _m009_job_trace_parent),
+    (10, "evaluation job partial scores", _m010_job_partial_scores),
+]
+
+_lock = threading.Lock()
+_migrated = set()  # database paths already brought up to date in this process
+
+
+def _current_version(conn) -> int:
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+@timed_db
+def run_migrations() -> list:
+    """
+    Apply pending migrations in order. Each one runs in its own
+    BEGIN IMMEDIATE transaction, so concurrent processes apply it once.
+    Returns the versions applied by this call.
+    """
+    conn = get_conn()
+    with conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            """
+        )
+
+    applied = []
+    for version, name, migrate in MIGRATIONS:
+        with immediate_transaction() as conn:
+            if _current_version(conn) >= version:
+                continue
+            migrate(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                (version, name),
+            )
+            applied.append(version)
+    return applied
+
+
+@timed_db
+def ensure_schema():
+    """
+    Bring the database up to date once per process; later calls are a set lookup.
+    Entry points (pages, workers, CLIs) call this instead of the old init_* functions.
+    """
+    path = connection.DB_PATH
+    if path in _migrated:
+        return
+    with _lock:
+        if path in _migrated:
+            return
+        run_migrations()
+        _migrated.add(path)
+
+
+@timed_db
+def schema_version() -> int:
+    return _current_version(get_conn())
@@ -1,46 +1,59 @@
 # app/db/plans.py
-import sqlite3, json
-from pathlib import Path
-
-DB_PATH = Path("jobfit.db")
-
-def get_conn():
-    return sqlite3.connect(DB_PATH)
-
-def init_plans_db():
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS role_plans (
-            role_id INTEGER PRIMARY KEY,
-            plan_json TEXT
-        );
-        """
-    )
-    conn.commit()
-    conn.close()
+import json
+from app.db.connection import get_conn
+from app.observability.metrics import timed_db
 
+@timed_db
 def get_plan_for_role(role_id: int):
     conn = get_conn()
     cur = conn.cursor()
     cur.execute("SELECT plan_json FROM role_plans WHERE role_id = ?", (role_id,))
     row = cur.fetchone()
-    conn.close()
     if not row:
         return None
     return json.loads(row[0])
 
+@timed_db
 def save_plan_for_role(role_id: int, plan: list):
+    conn = get_conn()
+    with conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO role_plans (role_id, plan_json)
+            VALUES (?, ?)
+            ON CONFLICT(role_id) DO UPDATE SET plan_json = excluded.plan_json
+            """,
+            (role_id, json.dumps(plan)),
+        )
+
+@timed_db
+def get_question_set(role_id: int, source_hash: str):
+    """Precomputed questions for the role, only if built from the same plan/profile."""
     conn = get_conn()
     cur = conn.cursor()
     cur.execute(
-        """
-        INSERT INTO role_plans (role_id, plan_json)
-        VALUES (?, ?)
-        ON CONFLICT(role_id) DO UPDATE SET plan_json = excluded.plan_json
-        """,
-        (role_id, json.dumps(plan)),
+        "SELECT questions_json FROM role_question_sets WHERE role_id = ? AND source_hash = ?",
+        (role_id, source_hash),
     )
-    conn.commit()
-    conn.close()
+    row = cur.fetchone()
+    if not row:
+        return None
+    return json.loads(row[0])
+
+@timed_db
+def save_question_set(role_id: int, source_hash: str, questions: list):
+    conn = get_conn()
+    with conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO role_question_sets (role_id, source_hash, questions_json, created_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(role_id) DO UPDATE SET
+                source_hash = excluded.source_hash,
+                questions_json = excluded.questions_json,
+                created_at = excluded.created_at
+            """,
+            (role_id, source_hash, json.dumps(questions)),
+        )
@@ -0,0 +1,120 @@
+# app/db/variants.py
+import random
+from app.db.connection import get_conn, immediate_transaction
+from app.observability.metrics import timed_db
+
+@timed_db
+def add_question_variants(role_id: int, source_hash: str, variants: list):
+    """variants: list of (slot_id, question)."""
+    conn = get_conn()
+    with conn:
+        cur = conn.cursor()
+        cur.executemany(
+            """
+            INSERT INTO question_variants (role_id, source_hash, slot_id, question)
+            VALUES (?, ?, ?, ?)
+            """,
+            [(role_id, source_hash, slot_id, q) for slot_id, q in variants],
+        )
+
+@timed_db
+def count_fresh_variants(role_id: int, source_hash: str, max_serves: int) -> dict:
+    """slot_id -> number of variants served fewer than max_serves times."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT slot_id, COUNT(*)
+        FROM question_variants
+        WHERE role_id = ? AND source_hash = ? AND served_count < ?
+        GROUP BY slot_id
+        """,
+        (role_id, source_hash, max_serves),
+    )
+    rows = cur.fetchall()
+    return dict(rows)
+
+@timed_db
+def draw_variants(role_id: int, source_hash: str, slot_ids: list,
+                  strategy: str = "round_robin"):
+    """
+    Pick one variant per slot and bump its served_count, in one transaction.
+    round_robin: least served first. weighted: random, weight / (1 + served_count).
+    Returns {slot_id: question}, or None if any slot has no variants yet.
+    """
+    picked = {}
+    with immediate_transaction() as conn:
+        cur = conn.cursor()
+        for slot_id in slot_ids:
+            if strategy == "weighted":
+                cur.execute(
+                    """
+                    SELECT id, question, weight, served_count
+                    FROM question_variants
+                    WHERE role_id = ? AND source_hash = ? AND slot_id = ?
+                    """,
+                    (role_id, source_hash, slot_id),
+                )
+                rows = cur.fetchall()
+                if not rows:
+                    conn.rollback()
+                    return None
+                weights = [w / (1 + served) for _, _, w, served in rows]
+                variant_id, question, _, _ = random.choices(rows, weights=weights)[0]
+            else:
+                cur.execute(
+                    """
+                    SELECT id, question
+                    FROM question_variants
+                    WHERE role_id = ? AND source_hash = ? AND slot_id = ?
+                    ORDER BY served_count, id
+                    LIMIT 1
+                    """,
+                    (role_id, source_hash, slot_id),
+                )
+                row = cur.fetchone()
+                if not row:
+                    conn.rollback()
+                    return None
+                variant_id, question = row
+
+            cur.execute(
+                "UPDATE question_variants SET served_count = served_count + 1 WHERE id = ?",
+                (variant_id,),
+            )
+            picked[slot_id] = question
+    return picked
+
+@timed_db
+def delete_stale_variants(role_id: int, source_hash: str):
+    """Drop variants generated for an older version of the role/plan."""
+    conn = get_conn()
+    with conn:
+        cur = conn.cursor()
+        cur.execute(
+            "DELETE FROM question_variants WHERE role_id = ? AND source_hash != ?",
+            (role_id, source_hash),
+        )
+
+@timed_db
+def delete_exhausted_variants(role_id: int, source_hash: str, max_serves: int) -> int:
+    """
+    Drop variants served max_serves times or more, in the slots that still
+    have a fresh one (a slot is never left empty). Returns the rows deleted.
+    """
+    conn = get_conn()
+    with conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            DELETE FROM question_variants
+            WHERE role_id = ? AND source_hash = ? AND served_count >= ?
+              AND slot_id IN (
+                  SELECT slot_id FROM question_variants
+                  WHERE role_id = ? AND source_hash = ? AND served_count < ?
+              )
+            """,
+            (role_id, source_hash, max_serves, role_id, source_hash, max_serves),
+        )
+        count = cur.rowcount
+    return count
@@ -0,0 +1,189 @@
+# app/export/evaluations.py
+import csv
+import io
+import json
+import re
+import tempfile
+import zipfile
+
+from app.db.evaluations import (
+    EXPORT_COLUMNS, SCORE_COLUMNS, SCORE_CRITERIA, count_evaluations, iter_evaluations,
+)
+
+CHUNK_ROWS = 500  # rows per cursor batch / write / Parquet row group
+# Rows the Score Report download may hold in memory; larger exports go through the CLI
+DOWNLOAD_MAX_ROWS = 5000
+CLI_HINT = "python -m app.cli.export_evaluations"
+
+# format -> (mime type, file extension)
+EXPORT_FORMATS = {
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "markdown": ("application/zip", "zip"),  # one anti-portfolio .md per candidate
+}
+
+
+def evaluation_scores(ev: dict) -> tuple:
+    """(scores by criterion, total) of an evaluation row."""
+    scores = json.loads(ev["scores_json"] or "{}")
+    total = ev.get("total_score")
+    if total is None:
+        total = sum(scores.get(c, 0) for c in SCORE_CRITERIA)
+    return scores, total
+
+
+def anti_portfolio_markdown(ev: dict) -> str:
+    """The anti-portfolio report of one evaluation (Score Report download / ZIP export)."""
+    scores, total = evaluation_scores(ev)
+    md = f"""# JobFitIndex Anti-Portfolio – Score Report
+
+## Candidate
+- Name: {ev['candidate_name'] or '-'}
+- Email: {ev['candidate_email'] or '-'}
+- Phone: {ev['candidate_phone'] or '-'}
+
+## Impronta professionale (signature summary)
+{ev['summary']}
+
+## Score breakdown
+Total score: {total} / 100
+
+"""
+    for crit in SCORE_CRITERIA:
+        md += f"- {crit}: {scores.get(crit, 0)} / 20\n"
+
+    md += """
+
+## Come usare questo anti-portfolio
+Questo documento è generato da JobFitIndex a partire da un'intervista strutturata.
+Mette in evidenza pattern decisionali, densità di evidenze e segnali di unicità,
+invece di limitarsi a job title e lista di esperienze.
+"""
+    return md
+
+
+def report_file_name(ev: dict) -> str:
+    return f"jobfitindex_anti_portfolio_{ev['candidate_name'] or 'candidate'}.md"
+
+
+def _json_record(ev: dict) -> dict:
+    scores, total = evaluation_scores(ev)
+    return {
+        "id": ev["id"],
+        "created_at": ev["created_at"],
+        "role_id": ev["role_id"],
+        "candidate": {
+            "name": ev["candidate_name"],
+            "email": ev["candidate_email"],
+            "phone": ev["candidate_phone"],
+        },
+        "scores": scores,
+        "total_score": total,
+        "summary": ev["summary"],
+        "answers": json.loads(ev["answers_json"] or "{}"),
+    }
+
+
+def _chunks(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_ROWS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _write_jsonl(rows, out) -> int:
+    count = 0
+    for chunk in _chunks(rows):
+        out.write("".join(
+            json.dumps(_json_record(ev), ensure_ascii=False) + "\n" for ev in chunk
+        ).encode("utf-8"))
+        count += len(chunk)
+    return count
+
+
+def _write_csv(rows, out) -> int:
+    count = 0
+    for chunk in _chunks(rows):
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        if not count:
+            writer.writerow(EXPORT_COLUMNS)
+        writer.writerows([ev[c] for c in EXPORT_COLUMNS] for ev in chunk)
+        out.write(buf.getvalue().encode("utf-8"))
+        count += len(chunk)
+    return count
+
+
+def _write_parquet(rows, out) -> int:
+    # pyarrow ships with streamlit; imported here because only this format needs it
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    int_columns = {"id", "role_id", *SCORE_COLUMNS.values(), "total_score"}
+    schema = pa.schema([
+        (c, pa.int64() if c in int_columns else pa.string()) for c in EXPORT_COLUMNS
+    ])
+    count = 0
+    with pq.ParquetWriter(out, schema, compression="zstd") as writer:
+        for chunk in _chunks(rows):
+            # one row group per chunk
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            count += len(chunk)
+        if not count:
+            writer.write_table(schema.empty_table())
+    return count
+
+
+def _write_markdown_zip(rows, out) -> int:
+    count = 0
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for ev in rows:
+            slug = re.sub(r"[^\w.-]+", "_", ev["candidate_name"] or "candidate").strip("_")
+            zf.writestr(f"{ev['id']:06d}_{slug}.md", anti_portfolio_markdown(ev))
+            count += 1
+    return count
+
+
+_WRITERS = {
+    "jsonl": _write_jsonl,
+    "csv": _write_csv,
+    "parquet": _write_parquet,
+    "markdown": _write_markdown_zip,
+}
+
+
+def write_export(fmt: str, out, role_id: int | None = None,
+                 date_from: str | None = None, date_to: str | None = None) -> int:
+    """
+    Stream matching evaluations to the binary file object `out` in `fmt`
+    (see EXPORT_FORMATS), CHUNK_ROWS at a time. Returns the number of rows.
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    rows = iter_evaluations(role_id, date_from, date_to, batch_size=CHUNK_ROWS)
+    return _WRITERS[fmt](rows, out)
+
+
+def export_bytes(fmt: str, role_id: int | None = None,
+                 date_from: str | None = None, date_to: str | None = None) -> bytes:
+    """
+    The whole export in memory, for st.download_button (Streamlit holds every
+    download in its media store, it cannot stream one). Capped at
+    DOWNLOAD_MAX_ROWS: larger exports raise ValueError and go through the
+    CLI, which streams to a file.
+    """
+    count = count_evaluations(role_id, date_from, date_to)
+    if count > DOWNLOAD_MAX_ROWS:
+        raise ValueError(
+            f"{count} evaluations match, over the {DOWNLOAD_MAX_ROWS} the page can "
+            f"download: use {CLI_HINT}."
+        )
+    with tempfile.TemporaryFile() as out:
+        write_export(fmt, out, role_id, date_from, date_to)
+        out.seek(0)
+        return out.read()
@@ -0,0 +1,89 @@
+# app/jobs/answer_scoring.py
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+from app.db.migrations import ensure_schema
+from app.llm.judge import score_answer
+from app.observability import tracing
+
+SCORING_WORKERS = int(st.secrets.get("ANSWER_SCORING_WORKERS", 4))
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_executor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                ensure_schema()
+                _executor = ThreadPoolExecutor(
+                    max_workers=SCORING_WORKERS, thread_name_prefix="answer-scoring"
+                )
+    return _executor
+
+
+class AnswerScorer:
+    """
+    Scores the answers of one interview in the background while the candidate
+    goes on (incremental judge mode, see JUDGE_INCREMENTAL). Answers are
+    scored one at a time in the order they are given, because each request
+    updates the running summary left by the previous one. Kept in
+    st.session_state for the length of the interview.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = []  # scoring tasks, in answer order
+        self._running = False
+        self.scored = {}  # focus -> score_answer() result
+        self.summary = ""  # signature summary after the last scored answer
+        self.failed = 0
+
+    def submit(self, focus: str, answer: str):
+        # bound to the caller's span, so the scoring shows up under the answer in its trace
+        task = tracing.wrap_context(functools.partial(self._score, focus, answer))
+        with self._lock:
+            self._pending.append(task)
+            if self._running:
+                return
+            self._running = True
+        _get_executor().submit(self._drain)
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._running = False
+                    return
+                task = self._pending.pop(0)
+            task()
+
+    def _score(self, focus: str, answer: str):
+        try:
+            result = score_answer(focus, answer, self.summary)
+        except Exception as e:
+            # the final merge scores it again; the judge.answer span already has the error
+            logger.warning("Scoring the %r answer failed: %r", focus, e)
+            with self._lock:
+                self.failed += 1
+            return
+        with self._lock:
+            self.scored[focus] = result
+            self.summary = result["summary"]
+
+    def partial(self) -> dict:
+        """
+        The scores so far, for evaluate_answers_with_llama(partial=...) (JSON
+        serializable, so it can go through the job queue). An answer still in
+        flight is scored again by the merge: the identical request is
+        coalesced with it or read from the response cache.
+        """
+        with self._lock:
+            return {"answers": dict(self.scored), "summary": self.summary}
@@ -0,0 +1,115 @@
+# app/jobs/evaluations.py
+import logging
+import threading
+import time
+
+import streamlit as st
+from app.db.migrations import ensure_schema
+from app.db.jobs import (
+    enqueue_evaluation_job,
+    claim_next_job,
+    complete_job,
+    fail_job,
+    requeue_stale_jobs,
+    save_job_evaluation,
+)
+from app.llm.judge import evaluate_answers_with_llama
+from app.observability import tracing
+
+# Score finished interviews on the worker pool instead of inline in the Interview page
+EVAL_IN_BACKGROUND = bool(st.secrets.get("EVAL_IN_BACKGROUND", True))
+NUM_WORKERS = int(st.secrets.get("EVAL_WORKERS", 2))
+MAX_ATTEMPTS = int(st.secrets.get("EVAL_MAX_ATTEMPTS", 3))
+POLL_INTERVAL = 2.0  # seconds between queue checks when idle
+RETRY_BASE_DELAY = 10.0  # seconds, doubled on every failed attempt
+STALE_AFTER = 15 * 60  # a 'running' job older than this was lost by a crashed process
+REQUEUE_INTERVAL = 60.0  # seconds between sweeps for stale jobs while the workers run
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_started = False
+_wakeup = threading.Event()
+_next_requeue = 0.0  # time.monotonic() of the next stale-job sweep
+
+
+def start_workers():
+    """Start the worker threads once per process (no-op afterwards)."""
+    global _started
+    if _started:
+        return
+    with _lock:
+        if _started:
+            return
+        ensure_schema()
+        for i in range(NUM_WORKERS):
+            threading.Thread(
+                target=_worker_loop, name=f"eval-worker-{i}", daemon=True
+            ).start()
+        _started = True
+
+
+def submit_evaluation(role_id: int, candidate: dict, answers: dict,
+                      partial: dict | None = None) -> int:
+    """
+    Queue the judge + save_evaluation for a finished interview, return the job id.
+    partial: per-answer scores from AnswerScorer (incremental mode), merged by the job.
+    Called inside a trace, the job's spans continue it.
+    """
+    start_workers()
+    span = tracing.current_span()
+    job_id = enqueue_evaluation_job(
+        role_id, candidate, answers, max_attempts=MAX_ATTEMPTS,
+        trace_parent=span.traceparent() if span is not None else None, partial=partial,
+    )
+    _wakeup.set()
+    return job_id
+
+
+def _run_job(job: dict):
+    with tracing.span("evaluation_job", parent=job.get("trace_parent"), **{
+        "job.id": job["id"], "job.attempt": job["attempts"],
+        "job.queued_ms": round((job["started_at"] - job["created_at"]) * 1000, 1),
+    }) as span:
+        if job["evaluation_id"] is not None:
+            # saved by an earlier attempt: only the status update was lost
+            complete_job(job["id"], job["evaluation_id"])
+            return
+        try:
+            result = evaluate_answers_with_llama(job["answers"], partial=job["partial"])
+            # evaluation + job status in one transaction: a retry never saves twice
+            save_job_evaluation(job, result["scores"], result["summary"])
+        except Exception as e:
+            span.record_error(e)
+            delay = RETRY_BASE_DELAY * (2 ** (job["attempts"] - 1))
+            fail_job(job["id"], f"{type(e).__name__}: {e}", delay)
+
+
+def _requeue_stale():
+    """Put stale jobs back in the queue, at most every REQUEUE_INTERVAL across the workers."""
+    global _next_requeue
+    now = time.monotonic()
+    with _lock:
+        if now < _next_requeue:
+            return
+        _next_requeue = now + REQUEUE_INTERVAL
+    count = requeue_stale_jobs(STALE_AFTER)
+    if count:
+        logger.warning("Requeued %d stale evaluation job(s)", count)
+
+
+def _worker_loop():
+    while True:
+        try:
+            _requeue_stale()
+            job = claim_next_job()
+            if job is None:
+                _wakeup.wait(POLL_INTERVAL)
+                _wakeup.clear()
+                continue
+            _run_job(job)
+        except Exception:
+            # e.g. database briefly locked: back off and go on. A job whose status
+            # could not be written stays 'running' until a later _requeue_stale().
+            logger.exception("Evaluation worker error")
+            time.sleep(POLL_INTERVAL)
@@ -0,0 +1,168 @@
+# app/jobs/prefetch.py
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+from app.db.roles import get_role
+from app.db.migrations import ensure_schema
+from app.db.plans import get_question_set, save_question_set
+from app.db.variants import (
+    add_question_variants,
+    count_fresh_variants,
+    draw_variants,
+    delete_exhausted_variants,
+    delete_stale_variants,
+)
+from app.llm.plan import generate_interview_plan
+from app.llm.questions import (
+    generate_questions_batch,
+    generate_question_variants,
+    question_set_hash,
+)
+from app.observability import tracing
+
+PREFETCH_WORKERS = int(st.secrets.get("PREFETCH_WORKERS", 2))
+
+# Question variant pool (see app/db/variants.py)
+VARIANTS_PER_BATCH = int(st.secrets.get("QUESTION_VARIANTS", 3))
+VARIANT_STRATEGY = st.secrets.get("QUESTION_VARIANT_STRATEGY", "round_robin")  # or "weighted"
+VARIANT_MAX_SERVES = int(st.secrets.get("QUESTION_VARIANT_MAX_SERVES", 20))
+VARIANT_LOW_WATER = int(st.secrets.get("QUESTION_VARIANT_LOW_WATER", 2))
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_executor = None
+_latest = {}  # role_id -> source hash of the most recent request
+_topping_up = set()  # (role_id, source_hash) with a top-up in flight
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                ensure_schema()
+                _executor = ThreadPoolExecutor(
+                    max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch"
+                )
+    return _executor
+
+
+def interview_base_plan(role_profile: dict) -> list:
+    """The id/type/focus plan the Interview page uses (cached plan, no LLM)."""
+    num_questions = role_profile.get("num_questions", 5)
+    return generate_interview_plan(role_profile, num_questions, use_llm=False)
+
+
+def load_question_set(role_profile: dict, plan: list):
+    role_id = role_profile.get("id")
+    if not role_id:
+        return None
+    return get_question_set(role_id, question_set_hash(plan, role_profile))
+
+
+def store_question_set(role_profile: dict, plan: list, questions: list):
+    role_id = role_profile.get("id")
+    if role_id:
+        save_question_set(role_id, question_set_hash(plan, role_profile), questions)
+
+
+@tracing.traced("prefetch.question_set")
+def _build_question_set(role: dict, plan: list, source_hash: str):
+    role_id = role["id"]
+    if get_question_set(role_id, source_hash) is not None:
+        return
+    try:
+        questions = generate_questions_batch(plan, role, answers={})
+    except Exception as e:
+        logger.warning("Question set prefetch for role %s failed: %r", role_id, e)
+        tracing.record_error(e)
+        return
+    with _lock:
+        # The role was edited again while we were generating: a newer build will save
+        if _latest.get(role_id) != source_hash:
+            return
+    save_question_set(role_id, source_hash, questions)
+
+
+def prefetch_question_set(role_id: int):
+    """
+    (Re)generate the role's question set in the background, so an interview
+    start only has to read it from role_question_sets.
+    """
+    executor = _get_executor()
+    role = get_role(role_id)
+    if not role:
+        return None
+    plan = interview_base_plan(role)
+    source_hash = question_set_hash(plan, role)
+    with _lock:
+        _latest[role_id] = source_hash
+    schedule_variant_top_up(role, plan, source_hash)
+    # in the caller's trace, if any
+    return executor.submit(
+        tracing.wrap_context(functools.partial(_build_question_set, role, plan, source_hash))
+    )
+
+
+@tracing.traced("prefetch.variant_top_up")
+def _top_up_variants(role: dict, plan: list, source_hash: str):
+    role_id = role["id"]
+    try:
+        fresh = count_fresh_variants(role_id, source_hash, VARIANT_MAX_SERVES)
+        if all(fresh.get(slot["id"], 0) >= VARIANT_LOW_WATER for slot in plan):
+            return
+        variants = generate_question_variants(plan, role, VARIANTS_PER_BATCH)
+        with _lock:
+            if _latest.get(role_id, source_hash) != source_hash:
+                return
+        add_question_variants(
+            role_id,
+            source_hash,
+            [(slot_id, q) for slot_id, questions in variants.items() for q in questions],
+        )
+        # used-up variants are only ever drawn again when nothing fresher is left
+        delete_exhausted_variants(role_id, source_hash, VARIANT_MAX_SERVES)
+        delete_stale_variants(role_id, source_hash)
+    except Exception as e:
+        logger.warning("Question variant top-up for role %s failed: %r", role_id, e)
+        tracing.record_error(e)
+    finally:
+        with _lock:
+            _topping_up.discard((role_id, source_hash))
+
+
+def schedule_variant_top_up(role: dict, plan: list, source_hash: str):
+    """Refill the role's variant pool in the background when it runs low."""
+    key = (role["id"], source_hash)
+    executor = _get_executor()
+    with _lock:
+        if key in _topping_up:
+            return None
+        _topping_up.add(key)
+    # in the caller's trace, if any (e.g. the interview that drew the variants)
+    return executor.submit(
+        tracing.wrap_context(functools.partial(_top_up_variants, role, plan, source_hash))
+    )
+
+
+def draw_question_set(role_profile: dict, plan: list):
+    """
+    One variant per plan slot from the pool (round-robin or weighted), no LLM call.
+    Returns None while the pool does not cover every slot yet.
+    """
+    role_id = role_profile.get("id")
+    if not role_id:
+        return None
+    _get_executor()
+    source_hash = question_set_hash(plan, role_profile)
+    picked = draw_variants(
+        role_id, source_hash, [slot["id"] for slot in plan], VARIANT_STRATEGY
+    )
+    schedule_variant_top_up(role_profile, plan, source_hash)
+    if picked is None:
+        return None
+    return [{**slot, "question": picked[slot["id"]]} for slot in plan]
@@ -0,0 +1,252 @@
+# app/llm/budget.py
+import json
+import re
+import threading
+import time
+from collections import deque
+
+import streamlit as st
+
+from app.observability import metrics
+
+# Prompt tokens allowed per call name; previous answers are clipped / dropped to
+# fit, except in prompts built with finish(fit=False) (the judge), which fail instead
+PROMPT_BUDGETS = {
+    "next_question": 1500,
+    "questions": 2000,
+    "question_variants": 2000,
+    "judge": 4000,
+    "judge_criterion": 3000,
+    "judge_summary": 3000,
+    "judge_answer": 1500,
+    **dict(st.secrets.get("LLM_PROMPT_BUDGETS", {})),
+}
+DEFAULT_BUDGET = 3000
+# Most recent answers always sent in full to question prompts (older ones are clipped first)
+RECENT_ANSWERS = int(st.secrets.get("LLM_RECENT_ANSWERS", 2))
+
+ANSWERS_SLOT = "<<ANSWERS>>"  # placeholder filled by PromptBudget.finish()
+CLIP_STEPS = (1000, 500, 250, 120)  # max characters per clipped answer, tried in order
+MESSAGE_OVERHEAD = 4  # tokens per chat message (role, separators)
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+_lock = threading.Lock()
+_stats = {}  # call name -> counters, see prompt_stats()
+_recent = deque(maxlen=200)  # per-call records, see recent_prompts()
+
+
+class PromptTooLong(RuntimeError):
+    """A prompt whose answers must be sent in full does not fit its budget."""
+
+    def __init__(self, call_name: str, tokens: int, budget: int):
+        super().__init__(
+            f"Prompt for {call_name} is ~{tokens} tokens, over its budget of {budget} "
+            f"(LLM_PROMPT_BUDGETS); the answers are not shortened for this call."
+        )
+        self.call_name = call_name
+        self.tokens = tokens
+        self.budget = budget
+
+
+def count_tokens(text: str) -> int:
+    """
+    Local estimate of BPE tokens: one per punctuation mark, one per started
+    5 characters of a word. Within ~10-15% of real tokenizers on English
+    prose and JSON, with no tokenizer download.
+    """
+    return sum(1 + (len(piece) - 1) // 5 for piece in _TOKEN_RE.findall(text or ""))
+
+
+def count_message_tokens(messages: list) -> int:
+    return sum(count_tokens(m.get("content") or "") + MESSAGE_OVERHEAD for m in messages)
+
+
+def compact_json(obj) -> str:
+    """JSON without indentation, spaces after separators or empty fields."""
+    if isinstance(obj, dict):
+        obj = {k: v for k, v in obj.items() if v not in (None, "", [], {})}
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _clip(value, max_chars: int):
+    """Shorten a long text answer, ending on a sentence (or word) boundary."""
+    if not isinstance(value, str) or len(value) <= max_chars:
+        return value
+    head = value[:max_chars]
+    end = max(head.rfind(". "), head.rfind("! "), head.rfind("? "))
+    if end < max_chars // 2:
+        end = head.rfind(" ")
+    if end < max_chars // 2:
+        end = max_chars
+    return head[:end + 1].rstrip() + " …"
+
+
+def fit_answers(answers: dict, budget: int, keep_recent: int = 0) -> tuple:
+    """
+    (answers, clipped, dropped): the answers as compact JSON fit in `budget`
+    tokens. Answers older than the last keep_recent are clipped to shorter
+    and shorter lengths, then dropped oldest first; the recent ones are only
+    clipped as a last resort.
+    """
+    fitted = {k: v for k, v in (answers or {}).items() if v not in (None, "")}
+
+    def size(d):
+        return count_tokens(compact_json(d))
+
+    if size(fitted) <= budget:
+        return fitted, 0, 0
+
+    keys = list(fitted)
+    older = keys[:-keep_recent] if keep_recent else keys
+    recent = [k for k in keys if k not in older]
+
+    candidate = fitted
+    for cap in CLIP_STEPS:
+        candidate = {k: (_clip(v, cap) if k in older else v) for k, v in fitted.items()}
+        if size(candidate) <= budget:
+            break
+
+    dropped = 0
+    while size(candidate) > budget and dropped < len(older):
+        dropped += 1
+        candidate = {"earlier_answers_omitted": dropped, **{
+            k: v for k, v in candidate.items() if k not in older[:dropped]
+            and k != "earlier_answers_omitted"
+        }}
+
+    if size(candidate) > budget:
+        candidate = {k: (_clip(v, CLIP_STEPS[-1]) if k in recent else v)
+                     for k, v in candidate.items()}
+
+    clipped = sum(1 for k in keys if k in candidate and candidate[k] != fitted[k])
+    return candidate, clipped, dropped
+
+
+def role_context_message(role_profile: dict) -> dict:
+    """
+    Static role context, identical for every question prompt of a role. Sent
+    first so providers with prompt caching reuse it across calls.
+    """
+    return {
+        "role": "system",
+        "content": (
+            "You are an interview assistant for JobFitIndex, an AI-native anti-portfolio.\n"
+            f"ROLE PROFILE (JSON):\n{compact_json(role_profile or {})}"
+        ),
+    }
+
+
+class PromptBudget:
+    """
+    Builds the variable parts of one prompt: compact JSON for context objects
+    and previous answers fitted to the call's budget. Records the prompt size
+    next to what the same context would have cost as indented JSON.
+    """
+
+    def __init__(self, call_name: str):
+        self.call_name = call_name
+        self.budget = int(PROMPT_BUDGETS.get(call_name, DEFAULT_BUDGET))
+        self.verbose_tokens = 0  # context as json.dumps(indent=2)
+        self.compact_tokens = 0  # the same context as actually sent
+
+    def _tally(self, obj, sent: str):
+        self.verbose_tokens += count_tokens(json.dumps(obj, indent=2, default=str))
+        self.compact_tokens += count_tokens(sent)
+
+    def json(self, obj) -> str:
+        text = compact_json(obj)
+        self._tally(obj, text)
+        return text
+
+    def role_message(self, role_profile: dict) -> dict:
+        message = role_context_message(role_profile)
+        self._tally(role_profile or {}, compact_json(role_profile or {}))
+        return message
+
+    def finish(self, messages: list, answers: dict | None = None, keep_recent: int = 0,
+               fit: bool = True) -> list:
+        """
+        Replace ANSWERS_SLOT with the fitted answers and record the prompt size.
+        With fit=False the answers are only serialized compactly, never clipped
+        or dropped, and PromptTooLong is raised if the prompt is over budget.
+        """
+        clipped = dropped = 0
+        if any(ANSWERS_SLOT in (m.get("content") or "") for m in messages):
+            fixed = count_message_tokens(messages) - count_tokens(ANSWERS_SLOT)
+            if fit:
+                fitted, clipped, dropped = fit_answers(
+                    answers or {}, max(self.budget - fixed, 0), keep_recent
+                )
+            else:
+                fitted = {k: v for k, v in (answers or {}).items() if v not in (None, "")}
+            answers_json = compact_json(fitted)
+            self._tally(answers or {}, answers_json)
+            messages = [
+                {**m, "content": (m.get("content") or "").replace(ANSWERS_SLOT, answers_json)}
+                for m in messages
+            ]
+        prompt_tokens = count_message_tokens(messages)
+        if not fit and prompt_tokens > self.budget:
+            raise PromptTooLong(self.call_name, prompt_tokens, self.budget)
+        _record(self.call_name, prompt_tokens,
+                prompt_tokens - self.compact_tokens + self.verbose_tokens, clipped, dropped)
+        return messages
+
+
+def _record(call_name: str, prompt_tokens: int, baseline_tokens: int, clipped: int, dropped: int):
+    with _lock:
+        stats = _stats.setdefault(call_name, {
+            "calls": 0,
+            "prompt_tokens": 0,  # estimated, as sent
+            "baseline_tokens": 0,  # estimated, with indented JSON and no clipping
+            "answers_clipped": 0,
+            "answers_dropped": 0,
+        })
+        stats["calls"] += 1
+        stats["prompt_tokens"] += prompt_tokens
+        stats["baseline_tokens"] += baseline_tokens
+        stats["answers_clipped"] += clipped
+        stats["answers_dropped"] += dropped
+        _recent.append({
+            "at": time.time(),
+            "call": call_name,
+            "prompt_tokens": prompt_tokens,
+            "baseline_tokens": baseline_tokens,
+            "answers_clipped": clipped,
+            "answers_dropped": dropped,
+        })
+
+
+def prompt_stats() -> dict:
+    """Per call name: estimated prompt tokens sent vs the uncompacted baseline."""
+    with _lock:
+        result = {}
+        for name, s in _stats.items():
+            baseline = s["baseline_tokens"]
+            result[name] = {
+                **s,
+                "avg_prompt_tokens": round(s["prompt_tokens"] / s["calls"], 1),
+                "saved_pct": round(100 * (1 - s["prompt_tokens"] / baseline), 1) if baseline else 0.0,
+            }
+        return result
+
+
+def _metrics_families() -> list:
+    with _lock:
+        stats = {name: dict(s) for name, s in _stats.items()}
+    return [
+        ("jobfit_llm_prompt_tokens_estimated_total", "counter",
+         "Estimated prompt tokens sent (kind=sent) vs the uncompacted baseline (kind=baseline).",
+         [({"call": name, "kind": kind}, s[key]) for name, s in stats.items()
+          for kind, key in (("sent", "prompt_tokens"), ("baseline", "baseline_tokens"))]),
+    ]
+
+
+metrics.register_collector(_metrics_families)
+
+
+def recent_prompts() -> list:
+    """The last per-call token records, oldest first."""
+    with _lock:
+        return list(_recent)
@@ -0,0 +1,167 @@
+# app/llm/cache.py
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import streamlit as st
+from app.db.migrations import ensure_schema
+from app.db.llm_cache import (
+    get_cached_response,
+    save_cached_response,
+    delete_cached_response,
+    evict_cached_responses,
+    clear_cached_responses,
+)
+
+CACHE_ENABLED = bool(st.secrets.get("LLM_CACHE_ENABLED", True))
+CACHE_TTL = float(st.secrets.get("LLM_CACHE_TTL", 7 * 24 * 3600))  # seconds
+CACHE_MEMORY_SIZE = int(st.secrets.get("LLM_CACHE_MEMORY_SIZE", 512))  # entries
+CACHE_MAX_ROWS = int(st.secrets.get("LLM_CACHE_MAX_ROWS", 20000))  # rows in jobfit.db
+EVICT_EVERY = 200  # run the SQLite eviction every N writes
+
+_lock = threading.Lock()
+_memory = OrderedDict()  # key -> entry
+_writes = 0
+
+_stats = {
+    "memory_hits": 0,
+    "disk_hits": 0,
+    "misses": 0,
+    "bypassed": 0,
+    "lookup_errors": 0,  # SQLite reads that failed (counted as misses too)
+    "store_errors": 0,  # SQLite writes that failed (the memory tier still has the entry)
+    "saved_latency_ms": 0.0,
+    "saved_prompt_tokens": 0,
+    "saved_completion_tokens": 0,
+}
+
+
+def make_key(model: str, messages: list, temperature: float, max_tokens: int) -> str:
+    raw = json.dumps(
+        {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _memory_get(key: str):
+    with _lock:
+        entry = _memory.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry["created_at"] > CACHE_TTL:
+            del _memory[key]
+            return None
+        _memory.move_to_end(key)
+        return entry
+
+
+def _memory_put(key: str, entry: dict):
+    with _lock:
+        _memory[key] = entry
+        _memory.move_to_end(key)
+        while len(_memory) > CACHE_MEMORY_SIZE:
+            _memory.popitem(last=False)
+
+
+def _record_hit(kind: str, entry: dict):
+    with _lock:
+        _stats[kind] += 1
+        _stats["saved_latency_ms"] += entry.get("latency_ms", 0.0)
+        _stats["saved_prompt_tokens"] += entry.get("prompt_tokens", 0)
+        _stats["saved_completion_tokens"] += entry.get("completion_tokens", 0)
+
+
+def lookup(key: str):
+    """Memory tier first, then SQLite (promoted into memory on hit)."""
+    entry = _memory_get(key)
+    if entry is not None:
+        _record_hit("memory_hits", entry)
+        return entry
+
+    # A busy or locked database is a miss, not a failed call
+    try:
+        ensure_schema()
+        entry = get_cached_response(key, CACHE_TTL)
+    except sqlite3.Error:
+        entry = None
+        with _lock:
+            _stats["lookup_errors"] += 1
+    if entry is not None:
+        _memory_put(key, entry)
+        _record_hit("disk_hits", entry)
+        return entry
+
+    with _lock:
+        _stats["misses"] += 1
+    return None
+
+
+def store(key: str, model: str, content: str, usage: dict, latency_ms: float):
+    global _writes
+    entry = {
+        "content": content,
+        "prompt_tokens": usage.get("prompt_tokens", 0),
+        "completion_tokens": usage.get("completion_tokens", 0),
+        "latency_ms": latency_ms,
+        "created_at": time.time(),
+    }
+    _memory_put(key, entry)
+
+    # The answer is already in hand: a busy or locked database must not fail the call
+    try:
+        ensure_schema()
+        save_cached_response(key, model, entry)
+        with _lock:
+            _writes += 1
+            evict = _writes % EVICT_EVERY == 0
+        if evict:
+            evict_cached_responses(CACHE_TTL, CACHE_MAX_ROWS)
+    except sqlite3.Error:
+        with _lock:
+            _stats["store_errors"] += 1
+
+
+def evict(key: str):
+    """Drop one entry from both tiers (e.g. a reply that turned out to be unusable)."""
+    with _lock:
+        _memory.pop(key, None)
+    try:
+        ensure_schema()
+        delete_cached_response(key)
+    except sqlite3.Error:
+        with _lock:
+            _stats["store_errors"] += 1
+
+
+def record_bypass():
+    with _lock:
+        _stats["bypassed"] += 1
+
+
+def cache_stats() -> dict:
+    with _lock:
+        stats = dict(_stats)
+        stats["memory_entries"] = len(_memory)
+    lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+    stats["hit_rate"] = (
+        (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+    )
+    return stats
+
+
+def clear_cache():
+    with _lock:
+        _memory.clear()
+    ensure_schema()
+    clear_cached_responses()
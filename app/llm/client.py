@@ -1,44 +1,845 @@
 # app/llm/client.py
+import asyncio
+import functools
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import json
+from app.llm import cache, ratelimit, singleflight, router as routing
+from app.observability import metrics, tracing
 
 API_URL = st.secrets.get("LLM_API_URL", "https://openrouter.ai/api/v1/chat/completions")
 API_KEY = st.secrets.get("LLM_API_KEY")
 MODEL_NAME = st.secrets.get("LLM_MODEL", "meta-llama/llama-3.3-70b-instruct:free")
 
+# Connection pool (shared by every session / thread in the process)
+POOL_SIZE = int(st.secrets.get("LLM_POOL_SIZE", 20))
+POOL_KEEPALIVE = bool(st.secrets.get("LLM_POOL_KEEPALIVE", True))
+CONNECT_TIMEOUT = float(st.secrets.get("LLM_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = float(st.secrets.get("LLM_READ_TIMEOUT", 90))
+USE_HTTP2 = bool(st.secrets.get("LLM_HTTP2", False))
+
+# Concurrency: max LLM requests in flight for the whole process, default per-call deadline
+MAX_CONCURRENCY = int(st.secrets.get("LLM_MAX_CONCURRENCY", 8))
+CALL_TIMEOUT = float(st.secrets.get("LLM_CALL_TIMEOUT", 180))
+
+# Authorization is per backend (see app/llm/router.py)
 HEADERS = {
-    "Authorization": f"Bearer {API_KEY}",
     "Content-Type": "application/json",
     "HTTP-Referer": "http://localhost:8501",
     "X-Title": "jobfitindex-dev",
 }
 
-def call_llm(messages, temperature=0.7, max_tokens=512):
+_adapter = None
+_adapter_lock = threading.Lock()
+_http2 = False  # HTTP/2 actually enabled (USE_HTTP2 and urllib3.http2 available)
+_local = threading.local()
+
+RETRY_STATUSES = (429, 502, 503, 504)
+
+_slots = threading.BoundedSemaphore(MAX_CONCURRENCY)
+_executor = None
+_executor_lock = threading.Lock()
+_hedge_executor = None
+
+# Backends tried per call type ("plan", "questions", "judge", "default")
+router = routing.load_router(API_URL, API_KEY, MODEL_NAME)
+
+
+def _enable_http2() -> bool:
+    """
+    urllib3 >= 2.3 ships experimental HTTP/2 support (needs the `h2` package).
+    Returns False when it is not available, so we stay on HTTP/1.1 keep-alive.
+    """
+    try:
+        import urllib3.http2
+        urllib3.http2.inject_into_urllib3()
+        return True
+    except (ImportError, AttributeError):
+        return False
+
+
+def _get_adapter() -> HTTPAdapter:
+    global _adapter, _http2
+    if _adapter is None:
+        with _adapter_lock:
+            if _adapter is None:
+                if USE_HTTP2:
+                    _http2 = _enable_http2()
+                _adapter = HTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=POOL_SIZE,
+                    pool_block=True,
+                )
+    return _adapter
+
+
+def get_session() -> requests.Session:
+    """
+    One requests.Session per thread, all mounted on the same HTTPAdapter:
+    the connection pool is shared, the session state (cookies, headers) is not.
+    """
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = _get_adapter()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(HEADERS)
+        if not POOL_KEEPALIVE:
+            session.headers["Connection"] = "close"
+        _local.session = session
+    return session
+
+
+def pool_stats() -> dict:
+    """
+    Connection reuse counters from the urllib3 pools.
+    misses = new TCP/TLS connections opened, hits = requests served on a reused one.
+    """
+    adapter = _get_adapter()
+    pools = adapter.poolmanager.pools
+    num_requests = 0
+    num_connections = 0
+    for key in list(pools.keys()):
+        try:
+            pool = pools[key]
+        except KeyError:
+            continue
+        num_requests += pool.num_requests
+        num_connections += pool.num_connections
+
+    return {
+        "pool_size": POOL_SIZE,
+        "http2": _http2,
+        "requests": num_requests,
+        "hits": max(num_requests - num_connections, 0),
+        "misses": num_connections,
+    }
+
+
+def _remaining(deadline: float) -> float:
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise RuntimeError("LLM call exceeded its deadline.")
+    return left
+
+
+def _payload(backend, messages, temperature, max_tokens, response_format=None) -> dict:
     payload = {
-        "model": MODEL_NAME,
+        "model": backend.model,
         "messages": messages,
         "temperature": temperature,
         "max_tokens": max_tokens,
     }
+    # JSON mode only where the provider supports it (json_mode in LLM_BACKENDS)
+    if response_format and backend.json_mode:
+        payload["response_format"] = response_format
+    return payload
 
-    # DEBUG
-    print("API_URL =", repr(API_URL))
-    print("MODEL_NAME =", repr(MODEL_NAME))
 
-    for attempt in range(3):
-        response = requests.post(API_URL, json=payload, headers=HEADERS)
+def _post_completion(backend, messages, temperature, max_tokens, deadline, cancelled=None,
+                     max_retries=None, response_format=None, call_type="default"):
+    payload = _payload(backend, messages, temperature, max_tokens, response_format)
+    if max_retries is None:
+        max_retries = ratelimit.MAX_RETRIES
 
-        print("STATUS:", response.status_code)
-        print("BODY:", response.text[:500])
+    session = get_session()
+    est_tokens = ratelimit.estimate_tokens(messages, max_tokens)
 
-        if response.status_code == 429:
-            time.sleep(5 * (attempt + 1))
+    for attempt in range(max_retries + 1):
+        if cancelled is not None and cancelled.is_set():
+            raise RuntimeError("LLM call cancelled.")
+
+        # Process-wide request/token budget for this backend (fails fast if the breaker is open)
+        ratelimit.before_request(backend.name, est_tokens, _remaining(deadline))
+
+        # Global in-flight limit, shared by sync and async callers
+        if not _slots.acquire(timeout=_remaining(deadline)):
+            ratelimit.release_probe(backend.name)
+            raise RuntimeError("LLM call exceeded its deadline waiting for a free slot.")
+        try:
+            read_timeout = min(READ_TIMEOUT, _remaining(deadline))
+            response = session.post(
+                backend.url,
+                json=payload,
+                headers=backend.headers,
+                timeout=(CONNECT_TIMEOUT, read_timeout),
+            )
+        except requests.RequestException as e:
+            # No response: a breaker failure (this also ends a half-open probe)
+            ratelimit.observe_failure(backend.name)
+            if isinstance(e, requests.Timeout):
+                raise RuntimeError("LLM call timed out.")
+            raise
+        finally:
+            _slots.release()
+
+        if response.status_code in RETRY_STATUSES:
+            ratelimit.observe_response(
+                backend.name, response.status_code, response.headers, est_tokens
+            )
+            metrics.count_llm_retry(call_type, backend.model, response.status_code)
+            tracing.add_event("retry", status=response.status_code, attempt=attempt + 1)
+            if attempt == max_retries:
+                break
+            delay = ratelimit.backoff_delay(attempt, response.headers)
+            time.sleep(min(delay, _remaining(deadline)))
             continue
 
-        response.raise_for_status()
-        data = response.json()
-        return data["choices"][0]["message"]["content"]
+        if response.status_code >= 400:
+            ratelimit.observe_response(
+                backend.name, response.status_code, response.headers, est_tokens
+            )
+            response.raise_for_status()
+        try:
+            data = response.json()
+        except ValueError:
+            ratelimit.observe_failure(backend.name)
+            raise
+        used = (data.get("usage") or {}).get("total_tokens")
+        ratelimit.observe_response(
+            backend.name, response.status_code, response.headers, est_tokens, used
+        )
+        return data
 
     raise RuntimeError("LLM rate-limited (429). Please try again later.")
+
+
+# Failures after which the next backend is tried
+BACKEND_ERRORS = (RuntimeError, requests.RequestException, ValueError)
+
+
+def _backend_failure(error: Exception) -> RuntimeError:
+    """Callers only handle RuntimeError: transport and body errors are wrapped."""
+    if isinstance(error, RuntimeError):
+        return error
+    wrapped = RuntimeError(f"LLM call failed: {error}")
+    wrapped.__cause__ = error
+    return wrapped
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    # Separate from _executor: its workers block on these futures
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _executor_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(
+                    max_workers=MAX_CONCURRENCY * 2,
+                    thread_name_prefix="llm-hedge",
+                )
+    return _hedge_executor
+
+
+def _timed_completion(backend, call_type, messages, temperature, max_tokens, deadline,
+                      cancelled=None, max_retries=None, response_format=None):
+    """
+    _post_completion on one backend, feeding its latency / error stats, the
+    metrics and an "llm.request" span.
+    """
+    started = time.monotonic()
+    with tracing.span("llm.request", **{
+        "llm.backend": backend.name, "gen_ai.request.model": backend.model,
+    }) as span:
+        try:
+            data = _post_completion(
+                backend, messages, temperature, max_tokens, deadline, cancelled, max_retries,
+                response_format, call_type,
+            )
+        except BACKEND_ERRORS as e:
+            if cancelled is None or not cancelled.is_set():
+                backend.record(call_type, time.monotonic() - started, ok=False)
+                metrics.observe_llm_request(call_type, backend.model, 0.0, error=e)
+            raise
+        usage = data.get("usage") or {}
+        span.set(**{
+            "gen_ai.usage.input_tokens": usage.get("prompt_tokens"),
+            "gen_ai.usage.output_tokens": usage.get("completion_tokens"),
+        })
+    elapsed = time.monotonic() - started
+    backend.record(call_type, elapsed, ok=True)
+    metrics.observe_llm_request(call_type, backend.model, elapsed, usage)
+    return data
+
+
+def _hedged_completion(primary, secondary, hedge_after, call_type, messages, temperature,
+                       max_tokens, deadline, cancelled, secondary_retries, tried: set,
+                       response_format=None):
+    """
+    Send to `primary`; if it has not answered after hedge_after seconds, send
+    the same request to `secondary` too and keep whichever answers first.
+    The loser is told to stop retrying (its in-flight HTTP request still completes).
+    Backends actually used are added to `tried`.
+    """
+    pool = _get_hedge_executor()
+    stops = {primary.name: threading.Event(), secondary.name: threading.Event()}
+
+    def attempt(backend, retries):
+        return _timed_completion(
+            backend, call_type, messages, temperature, max_tokens, deadline,
+            stops[backend.name], retries, response_format,
+        )
+
+    tried.add(primary.name)
+    futures = {
+        pool.submit(tracing.wrap_context(attempt), primary, routing.FALLBACK_RETRIES): primary
+    }
+    done, _ = wait(futures, timeout=min(hedge_after, _remaining(deadline)))
+    if not done:
+        tried.add(secondary.name)
+        router.record_decision(call_type, secondary, "hedge")
+        futures[pool.submit(tracing.wrap_context(attempt), secondary, secondary_retries)] = secondary
+
+    pending = set(futures)
+    errors = []
+    try:
+        while pending:
+            if cancelled is not None and cancelled.is_set():
+                raise RuntimeError("LLM call cancelled.")
+            done, pending = wait(
+                pending, timeout=min(0.5, _remaining(deadline)), return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                try:
+                    data = future.result()
+                except BACKEND_ERRORS as e:
+                    errors.append(f"{futures[future].name}: {e}")
+                    continue
+                if len(futures) > 1:
+                    router.record_decision(call_type, futures[future], "hedge_win")
+                return data
+    finally:
+        for stop in stops.values():
+            stop.set()
+    raise RuntimeError("; ".join(errors))
+
+
+def _routed_completion(call_type, messages, temperature, max_tokens, deadline, cancelled=None,
+                       response_format=None):
+    """
+    Try the backends of call_type fastest-healthy first, hedging slow calls
+    and falling back to the next backend on errors. Returns the response data.
+    """
+    backends = router.candidates(call_type)
+    tried = set()
+    errors = []
+    for i, backend in enumerate(backends):
+        if backend.name in tried:
+            continue
+        if cancelled is not None and cancelled.is_set():
+            raise RuntimeError("LLM call cancelled.")
+        _remaining(deadline)
+
+        rest = [b for b in backends[i + 1:] if b.name not in tried]
+        # The last backend gets the full retry budget, the others give up early
+        retries = routing.FALLBACK_RETRIES if rest else ratelimit.MAX_RETRIES
+        router.record_decision(call_type, backend, "fallback" if tried else "primary")
+        hedge_after = router.hedge_delay(backend, call_type) if rest else None
+        try:
+            if hedge_after is None:
+                tried.add(backend.name)
+                return _timed_completion(
+                    backend, call_type, messages, temperature, max_tokens, deadline,
+                    cancelled, retries, response_format,
+                )
+            secondary_retries = (
+                ratelimit.MAX_RETRIES if len(rest) == 1 else routing.FALLBACK_RETRIES
+            )
+            return _hedged_completion(
+                backend, rest[0], hedge_after, call_type, messages, temperature,
+                max_tokens, deadline, cancelled, secondary_retries, tried, response_format,
+            )
+        except BACKEND_ERRORS as e:
+            errors.append((backend.name, e))
+
+    if len(errors) == 1:
+        raise _backend_failure(errors[0][1])
+    raise RuntimeError(
+        "All LLM backends failed: " + " | ".join(f"{name}: {e}" for name, e in errors)
+    )
+
+
+def _gave_up(deadline, cancelled) -> bool:
+    """The caller's own deadline / cancellation, as opposed to a backend failure."""
+    return (cancelled is not None and cancelled.is_set()) or time.monotonic() >= deadline
+
+
+def _cache_route_key(call_type, response_format) -> str:
+    """Models of the route, plus the response format when one is requested."""
+    route_key = router.route_key(call_type)
+    if response_format:
+        route_key += "|" + response_format["type"]
+    return route_key
+
+
+def replace_cached_reply(messages, temperature, max_tokens, call_type="default",
+                         response_format=None, content: str | None = None):
+    """
+    For a call_llm() reply that failed validation: cache `content` (the
+    corrected output) under the call's key instead, or drop the entry when
+    content is None, so identical calls do not replay the bad reply.
+    """
+    if not cache.CACHE_ENABLED:
+        return
+    route_key = _cache_route_key(call_type, response_format)
+    key = cache.make_key(route_key, messages, temperature, max_tokens)
+    if content is None:
+        cache.evict(key)
+    else:
+        cache.store(key, route_key, content, {}, 0.0)
+
+
+def _call_llm_blocking(messages, temperature, max_tokens, deadline,
+                       cancelled=None, use_cache=True, call_type="default",
+                       response_format=None):
+    started = time.monotonic()
+    outcome = {}
+    with tracing.span("llm.call", **{"llm.call_site": call_type}) as span:
+        try:
+            content = _answer_blocking(
+                messages, temperature, max_tokens, deadline, cancelled, use_cache, call_type,
+                response_format, outcome,
+            )
+        except Exception:
+            metrics.observe_llm_call(call_type, "error", time.monotonic() - started)
+            raise
+        finally:
+            span.set(**_span_attributes(outcome))
+    metrics.observe_llm_call(call_type, outcome["result"], time.monotonic() - started)
+    return content
+
+
+def _span_attributes(outcome: dict) -> dict:
+    usage = outcome.get("usage") or {}
+    return {
+        "llm.cache": outcome.get("cache"),
+        "gen_ai.response.model": outcome.get("model"),
+        "gen_ai.usage.input_tokens": usage.get("prompt_tokens"),
+        "gen_ai.usage.output_tokens": usage.get("completion_tokens"),
+    }
+
+
+def _answer_blocking(messages, temperature, max_tokens, deadline, cancelled, use_cache,
+                     call_type, response_format, outcome: dict):
+    """
+    The completion text. Fills outcome: "result" (cache_hit, coalesced or
+    network), "cache" (hit, miss, bypass, coalesced), "model" and "usage".
+    """
+    # use_cache=False callers want a fresh answer: never served from the cache or a shared flight
+    coalesce = use_cache
+    use_cache = use_cache and cache.CACHE_ENABLED
+    route_key = _cache_route_key(call_type, response_format)
+    key = cache.make_key(route_key, messages, temperature, max_tokens)
+    if not use_cache:
+        cache.record_bypass()
+        outcome["cache"] = "bypass"
+    else:
+        hit = cache.lookup(key)
+        if hit is not None:
+            outcome.update(result="cache_hit", cache="hit", usage=hit)
+            return hit["content"]
+        outcome["cache"] = "miss"
+
+    if coalesce:
+        flight, leader = singleflight.join(key)
+        if not leader:
+            try:
+                content = flight.result(deadline, cancelled)
+                outcome.update(result="coalesced", cache="coalesced")
+                return content
+            except singleflight.Abandoned:
+                coalesce = False  # the leader gave up on its own: send our own request
+
+    started = time.monotonic()
+    try:
+        data = _routed_completion(
+            call_type, messages, temperature, max_tokens, deadline, cancelled, response_format
+        )
+        content = data["choices"][0]["message"]["content"]
+    except BaseException as e:
+        if coalesce:
+            singleflight.land(key, flight, e, abandoned=_gave_up(deadline, cancelled))
+        raise
+
+    # Followers first: they must not wait on the cache write
+    if coalesce:
+        flight.push(content)
+        singleflight.land(key, flight)
+    if use_cache:
+        latency_ms = (time.monotonic() - started) * 1000
+        cache.store(key, data.get("model") or route_key, content,
+                    data.get("usage") or {}, latency_ms)
+
+    outcome.update(result="network", model=data.get("model"), usage=data.get("usage"))
+    return content
+
+
+def _stream_completion(backend, messages, temperature, max_tokens, deadline, usage_out: dict,
+                       max_retries=None, response_format=None, call_type="default"):
+    """
+    Same retry / rate-limit path as _post_completion, but with "stream": true.
+    Yields content deltas from the SSE body; fills usage_out if the provider sends it.
+    """
+    if max_retries is None:
+        max_retries = ratelimit.MAX_RETRIES
+    payload = _payload(backend, messages, temperature, max_tokens, response_format)
+    payload["stream"] = True
+
+    session = get_session()
+    est_tokens = ratelimit.estimate_tokens(messages, max_tokens)
+
+    for attempt in range(max_retries + 1):
+        ratelimit.before_request(backend.name, est_tokens, _remaining(deadline))
+
+        if not _slots.acquire(timeout=_remaining(deadline)):
+            ratelimit.release_probe(backend.name)
+            raise RuntimeError("LLM call exceeded its deadline waiting for a free slot.")
+        retry_headers = None
+        observed = False  # the outcome reached the breaker
+        try:
+            read_timeout = min(READ_TIMEOUT, _remaining(deadline))
+            response = session.post(
+                backend.url,
+                json=payload,
+                headers=backend.headers,
+                timeout=(CONNECT_TIMEOUT, read_timeout),
+                stream=True,
+            )
+            with response:
+                if response.status_code in RETRY_STATUSES:
+                    ratelimit.observe_response(
+                        backend.name, response.status_code, response.headers, est_tokens
+                    )
+                    observed = True
+                    metrics.count_llm_retry(call_type, backend.model, response.status_code)
+                    tracing.add_event("retry", status=response.status_code, attempt=attempt + 1)
+                    retry_headers = response.headers
+                else:
+                    if response.status_code >= 400:
+                        ratelimit.observe_response(
+                            backend.name, response.status_code, response.headers, est_tokens
+                        )
+                        observed = True
+                        response.raise_for_status()
+                    for line in response.iter_lines(decode_unicode=True):
+                        # Blank keep-alives and ": OPENROUTER PROCESSING" comments
+                        if not line or not line.startswith("data:"):
+                            continue
+                        chunk = line[5:].strip()
+                        if chunk == "[DONE]":
+                            break
+                        event = json.loads(chunk)
+                        if "error" in event:
+                            raise RuntimeError(f"LLM stream error: {event['error']}")
+                        if event.get("usage"):
+                            usage_out.update(event["usage"])
+                        choices = event.get("choices") or []
+                        delta = (choices[0].get("delta") or {}).get("content") if choices else None
+                        if delta:
+                            yield delta
+                    ratelimit.observe_response(
+                        backend.name, response.status_code, response.headers, est_tokens,
+                        usage_out.get("total_tokens"),
+                    )
+                    observed = True
+                    return
+        except GeneratorExit:
+            # Abandoned by the caller (cancelled, lost hedge): no verdict on the backend
+            observed = True
+            ratelimit.release_probe(backend.name)
+            raise
+        except requests.Timeout:
+            raise RuntimeError("LLM call timed out.")
+        finally:
+            _slots.release()
+            if not observed:
+                # timeout, connection error, broken or failed stream
+                ratelimit.observe_failure(backend.name)
+
+        if attempt == max_retries:
+            break
+        delay = ratelimit.backoff_delay(attempt, retry_headers)
+        time.sleep(min(delay, _remaining(deadline)))
+
+    raise RuntimeError("LLM rate-limited (429). Please try again later.")
+
+
+def _routed_stream(call_type, messages, temperature, max_tokens, deadline, usage_out: dict,
+                   response_format=None):
+    """
+    _stream_completion on the backends of call_type in router order. Falls back
+    to the next backend only before the first delta: a started stream is never
+    replayed. No hedging (two streams cannot be merged).
+    """
+    backends = router.candidates(call_type)
+    errors = []
+    for i, backend in enumerate(backends):
+        _remaining(deadline)
+        last = i == len(backends) - 1
+        router.record_decision(call_type, backend, "fallback" if i else "primary")
+        started = time.monotonic()
+        streaming = False
+        try:
+            for delta in _stream_completion(
+                backend, messages, temperature, max_tokens, deadline, usage_out,
+                ratelimit.MAX_RETRIES if last else routing.FALLBACK_RETRIES, response_format,
+                call_type,
+            ):
+                streaming = True
+                yield delta
+        except BACKEND_ERRORS as e:
+            backend.record(call_type, time.monotonic() - started, ok=False)
+            metrics.observe_llm_request(call_type, backend.model, 0.0, error=e)
+            if streaming:
+                raise _backend_failure(e)
+            errors.append((backend.name, e))
+            continue
+        elapsed = time.monotonic() - started
+        backend.record(call_type, elapsed, ok=True)
+        metrics.observe_llm_request(call_type, backend.model, elapsed, usage_out)
+        return
+
+    if len(errors) == 1:
+        raise _backend_failure(errors[0][1])
+    raise RuntimeError(
+        "All LLM backends failed: " + " | ".join(f"{name}: {e}" for name, e in errors)
+    )
+
+
+def stream_llm(messages, temperature=0.7, max_tokens=512, timeout=None, use_cache=True,
+               call_type="default", response_format=None):
+    """
+    Generator of token deltas (OpenAI-style SSE). A cache hit yields the whole
+    answer at once; a completed stream is stored in the cache like call_llm.
+    Identical concurrent calls share one stream: followers replay the deltas
+    received so far, then get the rest live.
+    """
+    started = time.monotonic()
+    outcome = {}
+    # Not made current: the consumer's own work runs between our yields
+    span = tracing.start_span("llm.stream", **{"llm.call_site": call_type})
+    first = True
+    try:
+        for delta in _stream_answer(messages, temperature, max_tokens, timeout, use_cache,
+                                    call_type, response_format, outcome):
+            if first:
+                span.set(**{"llm.time_to_first_delta_ms":
+                            round((time.monotonic() - started) * 1000, 1)})
+                first = False
+            yield delta
+    except Exception as e:
+        metrics.observe_llm_call(call_type, "error", time.monotonic() - started)
+        span.record_error(e)
+        raise
+    finally:
+        span.set(**_span_attributes(outcome))
+        span.end()
+    metrics.observe_llm_call(call_type, outcome["result"], time.monotonic() - started)
+
+
+def _stream_answer(messages, temperature, max_tokens, timeout, use_cache, call_type,
+                   response_format, outcome: dict):
+    """stream_llm's deltas; fills outcome like _answer_blocking."""
+    deadline = time.monotonic() + (timeout or CALL_TIMEOUT)
+    coalesce = use_cache
+    use_cache = use_cache and cache.CACHE_ENABLED
+    route_key = _cache_route_key(call_type, response_format)
+    key = cache.make_key(route_key, messages, temperature, max_tokens)
+    if not use_cache:
+        cache.record_bypass()
+        outcome["cache"] = "bypass"
+    else:
+        hit = cache.lookup(key)
+        if hit is not None:
+            outcome.update(result="cache_hit", cache="hit", usage=hit)
+            yield hit["content"]
+            return
+        outcome["cache"] = "miss"
+
+    if coalesce:
+        flight, leader = singleflight.join(key)
+        if not leader:
+            sent = False
+            try:
+                for delta in flight.follow(deadline):
+                    sent = True
+                    yield delta
+                outcome.update(result="coalesced", cache="coalesced")
+                return
+            except singleflight.Abandoned:
+                if sent:
+                    raise RuntimeError("LLM stream interrupted.")
+                coalesce = False  # nothing shown yet: send our own request
+
+    started = time.monotonic()
+    usage = {}
+    parts = []
+    try:
+        for delta in _routed_stream(call_type, messages, temperature, max_tokens, deadline, usage,
+                                    response_format):
+            parts.append(delta)
+            if coalesce:
+                flight.push(delta)
+            yield delta
+    except BaseException as e:
+        if coalesce:
+            # GeneratorExit: our consumer stopped reading, followers must not wait on us
+            abandoned = isinstance(e, GeneratorExit) or _gave_up(deadline, None)
+            singleflight.land(key, flight, None if abandoned else e, abandoned=abandoned)
+        raise
+
+    # Followers first: they must not wait on the cache write
+    if coalesce:
+        singleflight.land(key, flight)
+    if use_cache:
+        latency_ms = (time.monotonic() - started) * 1000
+        cache.store(key, route_key, "".join(parts), usage, latency_ms)
+    outcome.update(result="network", usage=usage)
+
+
+def call_llm(messages, temperature=0.7, max_tokens=512, timeout=None, use_cache=True,
+             on_delta=None, call_type="default", response_format=None):
+    """
+    Blocking completion. With on_delta, the response is streamed and
+    on_delta(delta) is called for every chunk; the full text is still returned.
+    call_type ("plan", "questions", "judge") selects the route in LLM_ROUTES.
+    response_format (e.g. {"type": "json_object"}) is sent to backends with json_mode.
+    Every failure (transport included) is raised as RuntimeError.
+    """
+    if on_delta is not None:
+        parts = []
+        for delta in stream_llm(messages, temperature, max_tokens, timeout, use_cache,
+                                call_type, response_format):
+            parts.append(delta)
+            on_delta(delta)
+        return "".join(parts)
+
+    deadline = time.monotonic() + (timeout or CALL_TIMEOUT)
+    return _call_llm_blocking(
+        messages, temperature, max_tokens, deadline, use_cache=use_cache, call_type=call_type,
+        response_format=response_format,
+    )
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=MAX_CONCURRENCY * 2,
+                    thread_name_prefix="llm",
+                )
+    return _executor
+
+
+async def acall_llm(messages, temperature=0.7, max_tokens=512, timeout=None,
+                    use_cache=True, call_type="default", response_format=None):
+    """
+    Async version of call_llm. The HTTP call runs on a shared worker pool and
+    counts against the same global in-flight limit as call_llm.
+    Cancelling the task (or hitting the deadline) stops any further retries.
+    """
+    timeout = timeout or CALL_TIMEOUT
+    deadline = time.monotonic() + timeout
+    cancelled = threading.Event()
+
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(
+        _get_executor(),
+        tracing.wrap_context(functools.partial(
+            _call_llm_blocking, messages, temperature, max_tokens, deadline,
+            cancelled, use_cache, call_type, response_format,
+        )),
+    )
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        cancelled.set()
+        raise RuntimeError("LLM call exceeded its deadline.")
+    except asyncio.CancelledError:
+        cancelled.set()
+        raise
+
+
+def run_sync(coro):
+    """
+    Run a coroutine from sync code (Streamlit script thread, CLI).
+    Falls back to a helper thread if this thread already has a running loop.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(tracing.wrap_context(asyncio.run), coro).result()
+
+
+async def acall_llm_many(calls: list, return_exceptions: bool = False) -> list:
+    """
+    calls: list of dicts with the call_llm keyword arguments
+    (messages, temperature, max_tokens, timeout, use_cache, call_type).
+    Results keep the input order.
+    """
+    return await asyncio.gather(
+        *(acall_llm(**c) for c in calls),
+        return_exceptions=return_exceptions,
+    )
+
+
+def call_llm_many(calls: list, return_exceptions: bool = False) -> list:
+    """Sync wrapper around acall_llm_many: fan out several LLM calls at once."""
+    return run_sync(acall_llm_many(calls, return_exceptions=return_exceptions))
+
+
+def coalescing_stats() -> dict:
+    """Single-flight counters: requests sent vs callers that shared one in flight."""
+    return singleflight.singleflight_stats()
+
+
+def router_stats() -> dict:
+    """Per-backend rolling p50/p95 latency, error rate, health and routing decisions."""
+    return router.stats()
+
+
+def _metrics_families() -> list:
+    """The stats above as Prometheus families, for the /metrics endpoint."""
+    cache_counts = cache.cache_stats()
+    flights = coalescing_stats()
+    backends = router_stats()["backends"]
+    limits = ratelimit.ratelimit_stats()
+    pool = pool_stats()
+    return [
+        ("jobfit_llm_cache_lookups_total", "counter", "LLM response cache lookups by result.",
+         [({"result": k}, cache_counts[k])
+          for k in ("memory_hits", "disk_hits", "misses", "bypassed")]),
+        ("jobfit_llm_cache_entries", "gauge", "Entries in the in-memory LLM cache tier.",
+         [({}, cache_counts["memory_entries"])]),
+        ("jobfit_llm_cache_store_errors_total", "counter",
+         "LLM cache writes that failed in SQLite (the answer was still returned).",
+         [({}, cache_counts["store_errors"])]),
+        ("jobfit_llm_cache_lookup_errors_total", "counter",
+         "LLM cache reads that failed in SQLite (served as a miss).",
+         [({}, cache_counts["lookup_errors"])]),
+        ("jobfit_llm_singleflight_total", "counter",
+         "Requests sent (leaders), callers served by another's request (coalesced), leaders abandoned.",
+         [({"kind": k}, flights[k]) for k in ("leaders", "coalesced", "abandoned")]),
+        ("jobfit_llm_backend_healthy", "gauge", "1 while the router considers a backend healthy.",
+         [({"backend": name, "model": b["model"]}, b["healthy"]) for name, b in backends.items()]),
+        ("jobfit_llm_backend_error_rate", "gauge", "Rolling error rate of a backend.",
+         [({"backend": name, "model": b["model"]}, b["error_rate"]) for name, b in backends.items()]),
+        ("jobfit_llm_ratelimit_queue_depth", "gauge", "Calls waiting for the client-side rate limit.",
+         [({"backend": name}, s["queue_depth"]) for name, s in limits.items()]),
+        ("jobfit_llm_breaker_open", "gauge", "1 while a backend's circuit breaker is open.",
+         [({"backend": name}, s["breaker_state"] == "open") for name, s in limits.items()]),
+        ("jobfit_llm_connections_total", "counter", "HTTP requests on reused (hit) or new (miss) connections.",
+         [({"kind": "hit"}, pool["hits"]), ({"kind": "miss"}, pool["misses"])]),
+    ]
+
+
+metrics.register_collector(_metrics_families)
@@ -1,7 +1,11 @@
 # app/llm/judge.py
-import json
+import asyncio
+import re
 import streamlit as st
-from app.llm.client import call_llm
+from app.llm.budget import ANSWERS_SLOT, PromptBudget, PromptTooLong
+from app.llm.client import run_sync
+from app.llm.structured import StructuredOutputError, acomplete_structured, complete_structured
+from app.observability.tracing import traced
 
 
 CRITERIA = [
@@ -12,27 +16,310 @@ CRITERIA = [
     "Uniqueness signal",
 ]
 
+CRITERIA_DESCRIPTIONS = {
+    "Evidence density": "How concrete, specific, and supported by proof the answers are.",
+    "Decision quality": "How well trade-offs, options, and reasoning are explained.",
+    "Failure intelligence": "How deeply they reflect on failures and improve their process.",
+    "Context translation": "How well they adapt explanations for non-technical people.",
+    "Uniqueness signal": "How clearly their unique style and differentiators emerge.",
+}
 
-def evaluate_answers_with_llama(answers: dict):
+ALLOWED_SCORES = (0, 5, 10, 15, 20)
+# Placeholders when the judge gave no usable answer; see failed_parts()
+FAILED_REASON = "Automatic scoring failed, defaulting to 0."
+FAILED_SUMMARY = "Automatic scoring failed. No summary available."
+
+# Score each criterion in its own small request (plus one for the summary), concurrently
+JUDGE_PER_CRITERION = bool(st.secrets.get("JUDGE_PER_CRITERION", False))
+JUDGE_CRITERION_RETRIES = 2  # re-asks for an unusable criterion answer
+# Score each answer in the background as soon as it is given (app/jobs/answer_scoring.py);
+# the final step only merges the partial scores
+JUDGE_INCREMENTAL = bool(st.secrets.get("JUDGE_INCREMENTAL", False))
+
+SCORE_SCHEMA = {"type": "integer", "enum": list(ALLOWED_SCORES)}
+REASON_SCHEMA = {"type": "string", "minLength": 1}
+
+
+def _scores_schema(criteria: list) -> dict:
+    return {
+        "type": "object",
+        "required": ["scores", "reasons", "summary"],
+        "properties": {
+            "scores": {
+                "type": "object",
+                "required": criteria,
+                "properties": {c: SCORE_SCHEMA for c in criteria},
+            },
+            "reasons": {
+                "type": "object",
+                "required": criteria,
+                "properties": {c: REASON_SCHEMA for c in criteria},
+            },
+            "summary": {"type": "string", "minLength": 1},
+        },
+    }
+
+
+JUDGE_SCHEMA = _scores_schema(CRITERIA)
+
+CRITERION_SCHEMA = {
+    "type": "object",
+    "required": ["score", "reason"],
+    "properties": {"score": SCORE_SCHEMA, "reason": REASON_SCHEMA},
+}
+
+SUMMARY_SCHEMA = {
+    "type": "object",
+    "required": ["summary"],
+    "properties": {"summary": {"type": "string", "minLength": 1}},
+}
+
+
+JUDGE_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are a precise, structured evaluator for JobFitIndex. Always return valid JSON only.",
+}
+
+# Shared opening of the per-criterion and summary prompts: the answers come
+# first so the six concurrent requests of one candidate share a cacheable prefix
+PER_CRITERION_PREFIX = f"""
+You are evaluating a professional profile for an AI-native anti-portfolio called JobFitIndex.
+
+Candidate answers (JSON):
+{ANSWERS_SLOT}
+"""
+
+
+def _criterion_messages(criterion: str, answers: dict) -> list:
+    prompt = PER_CRITERION_PREFIX + f"""
+Score the candidate on ONE criterion only:
+{criterion}: {CRITERIA_DESCRIPTIONS[criterion]}
+
+You MUST choose ONE score from this set: 0, 5, 10, 15, or 20. Do NOT invent other numbers.
+- Use 0 ONLY if the answers are empty, clearly non-serious, or completely off-topic for this criterion.
+- If there is at least some relevant content, prefer 5 instead of 0 and go higher only when the answer is strong.
+
+Return ONLY a JSON object with EXACTLY this structure (no extra text):
+{{"score": 0, "reason": "2-3 sentence justification"}}
+"""
+    pb = PromptBudget("judge_criterion")
+    return pb.finish([JUDGE_SYSTEM_MESSAGE, {"role": "user", "content": prompt}], answers,
+                     fit=False)
+
+
+def _summary_messages(answers: dict) -> list:
+    prompt = PER_CRITERION_PREFIX + """
+Write a 3-sentence "signature summary" of HOW this person works.
+
+Return ONLY a JSON object with EXACTLY this structure (no extra text):
+{"summary": "3-sentence summary"}
+"""
+    pb = PromptBudget("judge_summary")
+    return pb.finish([JUDGE_SYSTEM_MESSAGE, {"role": "user", "content": prompt}], answers,
+                     fit=False)
+
+
+async def _score_criterion(messages: list):
+    """
+    Returns (score, reason) for one _criterion_messages() prompt. Only this
+    criterion is re-asked when its output is unusable.
+    """
+    try:
+        result = await acomplete_structured(
+            "judge_criterion", messages, CRITERION_SCHEMA,
+            temperature=0.1, max_tokens=200, call_type="judge",
+            max_reasks=JUDGE_CRITERION_RETRIES,
+        )
+    except (StructuredOutputError, RuntimeError):
+        # a transport error costs this criterion only, not the whole gather
+        return 0, FAILED_REASON
+    return int(result["score"]), result["reason"]
+
+
+async def _write_summary(messages: list) -> str:
+    try:
+        result = await acomplete_structured(
+            "judge_summary", messages, SUMMARY_SCHEMA,
+            temperature=0.1, max_tokens=220, call_type="judge", max_reasks=0,
+        )
+    except StructuredOutputError as e:
+        # plain text is still a usable summary
+        return e.raw.strip() or FAILED_SUMMARY
+    except RuntimeError:
+        return FAILED_SUMMARY
+    return result["summary"]
+
+
+# ---------------------------
+# Incremental mode: one answer at a time
+# ---------------------------
+
+def criteria_for_focus(focus: str) -> list:
+    """The criterion an answer targets, from its plan focus tag; every criterion otherwise."""
+    tag = re.sub(r"[^a-z]+", " ", (focus or "").lower())
+    return [c for c in CRITERIA if c.lower() in tag] or list(CRITERIA)
+
+
+def _answer_messages(focus: str, answer: str, summary: str, criteria: list) -> list:
+    descriptions = "\n".join(f"- {c}: {CRITERIA_DESCRIPTIONS[c]}" for c in criteria)
+    scores = ", ".join(f'"{c}": 0' for c in criteria)
+    reasons = ", ".join(f'"{c}": "1-2 sentence justification"' for c in criteria)
+    prompt = f"""
+You are evaluating ONE answer of an interview for an AI-native anti-portfolio called JobFitIndex.
+
+Signature summary of the candidate so far (from their previous answers):
+{summary or "(this is the first answer)"}
+
+Candidate answer (JSON, key is what the question explores):
+{ANSWERS_SLOT}
+
+Score this answer ONLY on these criteria:
+{descriptions}
+
+You MUST choose ONE score from this set: 0, 5, 10, 15, or 20. Do NOT invent other numbers.
+- Use 0 ONLY if the answer is empty, clearly non-serious, or completely off-topic for the criterion.
+- If there is at least some relevant content, prefer 5 instead of 0 and go higher only when the answer is strong.
+
+Then rewrite the signature summary (3 sentences on HOW this person works) so it also reflects this answer.
+
+Return ONLY a JSON object with EXACTLY this structure (no extra text):
+{{"scores": {{{scores}}}, "reasons": {{{reasons}}}, "summary": "3-sentence summary"}}
+"""
+    pb = PromptBudget("judge_answer")
+    return pb.finish([JUDGE_SYSTEM_MESSAGE, {"role": "user", "content": prompt}], {focus: answer},
+                     fit=False)
+
+
+@traced("judge.answer")
+def score_answer(focus: str, answer: str, summary: str = "") -> dict:
+    """
+    Partial judgement of one answer: score and reason for the criteria it
+    targets, plus the signature summary updated with it.
+    Raises StructuredOutputError / RuntimeError when the answer could not be scored.
+    """
+    criteria = criteria_for_focus(focus)
+    result = complete_structured(
+        "judge_answer", _answer_messages(focus, answer, summary, criteria),
+        _scores_schema(criteria), temperature=0.1, max_tokens=160 + 80 * len(criteria),
+        call_type="judge", max_reasks=JUDGE_CRITERION_RETRIES,
+    )
+    return {
+        "scores": {c: int(result["scores"][c]) for c in criteria},
+        "reasons": {c: result["reasons"][c] for c in criteria},
+        "summary": result["summary"],
+    }
+
+
+def _nearest_allowed(score: float) -> int:
+    # halves round up: 7.5 -> 10
+    return min(ALLOWED_SCORES, key=lambda s: (abs(s - score), -s))
+
+
+def _merge_partial_scores(answers: dict, partial: dict) -> dict:
+    """
+    Final judgement from per-answer partial scores: answers not scored yet
+    (still in flight or failed) are scored now, each criterion gets the mean
+    of its partial scores, and the running summary is the signature summary.
+    Only a criterion no answer was scored on costs a request over all answers.
+    Raises PromptTooLong when an answer cannot be judged without shortening it.
+    """
+    scored = dict(partial.get("answers") or {})
+    summary = partial.get("summary") or ""
+    for focus, answer in answers.items():
+        if focus in scored or answer in (None, ""):
+            continue
+        try:
+            scored[focus] = score_answer(focus, answer, summary)
+        except PromptTooLong:
+            raise
+        except (StructuredOutputError, RuntimeError):
+            continue
+        summary = scored[focus]["summary"]
+
+    found = {c: [] for c in CRITERIA}
+    for focus in answers:
+        part = scored.get(focus) or {}
+        for c, score in (part.get("scores") or {}).items():
+            if c in found:
+                found[c].append((score, part["reasons"][c]))
+
+    missing = [c for c in CRITERIA if not found[c]]
+    if missing or not summary:
+        criterion_messages = [_criterion_messages(c, answers) for c in missing]
+        summary_messages = None if summary else _summary_messages(answers)
+
+        async def fill():
+            requests = [_score_criterion(m) for m in criterion_messages]
+            if summary_messages:
+                requests.append(_write_summary(summary_messages))
+            return await asyncio.gather(*requests)
+
+        filled = run_sync(fill())
+        for c, result in zip(missing, filled):
+            found[c].append(result)
+        if not summary:
+            summary = filled[-1]
+
+    return {
+        "scores": {c: _nearest_allowed(sum(s for s, _ in found[c]) / len(found[c]))
+                   for c in CRITERIA},
+        "reasons": {c: " ".join(reason for _, reason in found[c]) for c in CRITERIA},
+        "summary": summary,
+    }
+
+
+async def _evaluate_per_criterion(criterion_messages: list, summary_messages: list):
+    *scored, summary = await asyncio.gather(
+        *(_score_criterion(m) for m in criterion_messages),
+        _write_summary(summary_messages),
+    )
+    return {
+        "scores": {c: score for c, (score, _) in zip(CRITERIA, scored)},
+        "reasons": {c: reason for c, (_, reason) in zip(CRITERIA, scored)},
+        "summary": summary,
+    }
+
+
+def failed_parts(result: dict) -> list:
+    """
+    The criteria (and "summary") of a judgement that fell back to the default
+    placeholders: a 0 there is not the judge's score.
+    """
+    failed = [c for c in CRITERIA if FAILED_REASON in (result["reasons"].get(c) or "")]
+    if result["summary"] == FAILED_SUMMARY:
+        failed.append("summary")
+    return failed
+
+
+@traced("judge")
+def evaluate_answers_with_llama(answers: dict, on_delta=None, per_criterion: bool | None = None,
+                                partial: dict | None = None):
     """
     Use the LLM to suggest scores (0,5,10,15,20) and reasons per criterion,
     plus a short signature summary.
+    on_delta: optional callback, receives the raw JSON text as it streams in
+    (single-request mode only).
+    per_criterion: one concurrent request per criterion + one for the summary
+    (defaults to the JUDGE_PER_CRITERION secret).
+    partial: per-answer scores computed during the interview (incremental
+    mode, see app/jobs/answer_scoring.py); they are merged instead of
+    judging every answer again.
+    Answers are never clipped or dropped: when they do not fit one judge
+    prompt they are scored one at a time, and PromptTooLong is raised when
+    even that does not fit.
     """
-
-    # Mock disattivato
-    if False:
-        scores = {
-            "Evidence density": 10,
-            "Decision quality": 15,
-            "Failure intelligence": 5,
-            "Context translation": 10,
-            "Uniqueness signal": 5,
-        }
-        reasons = {k: "Mock reason for development." for k in scores}
-        summary = "Mock summary for development. This is not from the LLM."
-        return {"scores": scores, "reasons": reasons, "summary": summary}
-
-    answers_json = json.dumps(answers, indent=2)
+    if partial is not None:
+        return _merge_partial_scores(answers, partial)
+    if per_criterion is None:
+        per_criterion = JUDGE_PER_CRITERION
+    if per_criterion:
+        try:
+            criterion_messages = [_criterion_messages(c, answers) for c in CRITERIA]
+            summary_messages = _summary_messages(answers)
+        except PromptTooLong:
+            # answers are never shortened for the judge: score them one at a time instead
+            return _merge_partial_scores(answers, {})
+        return run_sync(_evaluate_per_criterion(criterion_messages, summary_messages))
 
     prompt = f"""
 You are scoring a professional profile for an AI-native anti-portfolio called JobFitIndex.
@@ -48,7 +335,7 @@ Criteria:
 5) Uniqueness signal: How clearly their unique style and differentiators emerge.
 
 Candidate answers (JSON, keys are criterion names):
-{answers_json}
+{ANSWERS_SLOT}
 
 INSTRUCTIONS:
 - Read the answers carefully.
@@ -79,49 +366,39 @@ Return ONLY a JSON object with EXACTLY this structure (no extra text):
 }}
 """
 
-    messages = [
-        {
-            "role": "system",
-            "content": "You are a precise, structured evaluator for JobFitIndex. Always return valid JSON only.",
-        },
-        {
-            "role": "user",
-            "content": prompt,
-        },
-    ]
-
-    raw = call_llm(messages, temperature=0.1, max_tokens=900)
-
-    # Pulizia: rimuovi ```
-    raw_clean = raw.strip()
-    if raw_clean.startswith("```"):
-        raw_clean = raw_clean.strip("`").strip()
-        if raw_clean.lower().startswith("json"):
-            raw_clean = raw_clean[4:].lstrip()
-
+    try:
+        messages = PromptBudget("judge").finish(
+            [JUDGE_SYSTEM_MESSAGE, {"role": "user", "content": prompt}], answers, fit=False
+        )
+    except PromptTooLong:
+        # answers are never shortened for the judge: score them one at a time instead
+        return _merge_partial_scores(answers, {})
 
-    # Try direct JSON parse
+    # Fenced / truncated JSON is repaired locally; only the criteria still
+    # missing or out of range are re-asked
     try:
-        result = json.loads(raw_clean)
-    except json.JSONDecodeError:
-        scores = {c: 0 for c in CRITERIA}
-        reasons = {c: "Automatic scoring failed, defaulting to 0." for c in CRITERIA}
-        summary = "Automatic scoring failed. No summary available."
-        return {
-            "scores": scores,
-            "reasons": reasons,
-            "summary": summary,
-        }
-
-    scores = result.get("scores", {})
-    reasons = result.get("reasons", {})
-    summary = result.get("summary", "")
+        result = complete_structured(
+            "judge", messages, JUDGE_SCHEMA, temperature=0.1, max_tokens=900,
+            call_type="judge", on_delta=on_delta,
+        )
+    except StructuredOutputError as e:
+        result = e.value if isinstance(e.value, dict) else {}
+
+    scores = result.get("scores")
+    reasons = result.get("reasons")
+    scores = scores if isinstance(scores, dict) else {}
+    reasons = reasons if isinstance(reasons, dict) else {}
+    summary = result.get("summary")
+    if not isinstance(summary, str) or not summary.strip():
+        summary = FAILED_SUMMARY
 
     # Completa eventuali chiavi mancanti, senza floor a 5
     for c in CRITERIA:
-        if c not in scores:
+        if scores.get(c) not in ALLOWED_SCORES:
             scores[c] = 0
-        if c not in reasons:
+            reasons[c] = FAILED_REASON
+        scores[c] = int(scores[c])
+        if not isinstance(reasons.get(c), str) or not reasons[c].strip():
             reasons[c] = "No justification provided."
 
     return {
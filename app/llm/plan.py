@@ -1,14 +1,37 @@
 # app/llm/plan.py
 import json
-from app.llm.client import call_llm
+from app.llm.structured import complete_structured
 from app.db.plans import get_plan_for_role, save_plan_for_role
+from app.observability.tracing import traced
 
+QUESTION_TYPES = ["open", "mcq", "scale"]
+
+
+def plan_schema(num_questions: int) -> dict:
+    return {
+        "type": "array",
+        "minItems": num_questions,
+        "maxItems": num_questions,
+        "items": {
+            "type": "object",
+            "required": ["id", "type", "focus"],
+            "properties": {
+                "id": {"type": "integer"},
+                "type": {"type": "string", "enum": QUESTION_TYPES},
+                "focus": {"type": "string", "minLength": 1},
+            },
+        },
+    }
 
-import json
-from app.llm.client import call_llm
-from app.db.plans import get_plan_for_role, save_plan_for_role
 
+def _check_plan_ids(plan: list) -> list:
+    expected = list(range(1, len(plan) + 1))
+    if [slot["id"] for slot in plan] != expected:
+        return [("$", f"ids must be {expected}, in order")]
+    return []
 
+
+@traced("generate_interview_plan")
 def generate_interview_plan(role_profile: dict, num_questions: int, use_llm: bool = True):
     role_id = role_profile.get("id")
 
@@ -52,20 +75,13 @@ Example output for 2 questions:
         {"role": "user", "content": prompt},
     ]
 
-    raw = call_llm(messages, temperature=0.2, max_tokens=200)
-    print("PLAN RAW LLM:", repr(raw))
-
-    import re, json as _json
-    try:
-        plan = _json.loads(raw)
-    except _json.JSONDecodeError:
-        match = re.search(r"\[.*\]", raw, re.DOTALL)
-        if not match:
-            raise RuntimeError(f"LLM did not return JSON. Got: {raw[:200]}")
-        json_str = match.group(0)
-        plan = _json.loads(json_str)
-
-    print("PLAN PARSED:", plan)
+    # Raises StructuredOutputError (a RuntimeError) if no valid plan comes back
+    plan = complete_structured(
+        "plan", messages, plan_schema(num_questions), temperature=0.2, max_tokens=200,
+        call_type="plan", check=_check_plan_ids,
+    )
+    for slot in plan:
+        slot["id"] = int(slot["id"])
 
     if role_id:
         save_plan_for_role(role_id, plan)
@@ -1,9 +1,41 @@
 # app/llm/questions.py
+import hashlib
 import json
 import streamlit as st
+from app.llm.budget import ANSWERS_SLOT, RECENT_ANSWERS, PromptBudget
 from app.llm.client import call_llm
-
-
+from app.llm.structured import complete_structured
+from app.observability.tracing import traced
+
+QUESTION_ITEM_SCHEMA = {
+    "type": "object",
+    "required": ["id", "question"],
+    "properties": {
+        "id": {"type": "integer"},
+        "question": {"type": "string", "minLength": 1},
+    },
+}
+
+VARIANT_ITEM_SCHEMA = {
+    "type": "object",
+    "required": ["id", "questions"],
+    "properties": {
+        "id": {"type": "integer"},
+        "questions": {"type": "array", "minItems": 1, "items": {"type": "string"}},
+    },
+}
+
+
+def _missing_ids(plan: list):
+    """check() for outputs that must cover every plan slot."""
+    def check(items: list) -> list:
+        got = {item["id"] for item in items}
+        missing = [slot["id"] for slot in plan if slot["id"] not in got]
+        return [("$", f"missing items with id {missing}")] if missing else []
+    return check
+
+
+@traced("generate_next_question")
 def generate_next_question(
     criterion: str,
     answers: dict,
@@ -17,8 +49,7 @@ def generate_next_question(
     question_type: "open", "mcq", or "scale".
     """
 
-    profile_str = json.dumps(role_profile, indent=2) if role_profile else "{}"
-    answers_str = json.dumps(answers, indent=2)
+    pb = PromptBudget("next_question")
 
     min_years = role_profile.get("min_years_exp")
     required_tech = (role_profile.get("required_tech") or "").strip()
@@ -28,7 +59,7 @@ def generate_next_question(
     company = role_profile.get("company_name", "")
 
     candidate = st.session_state.get("candidate", {})
-    candidate_str = json.dumps(candidate, indent=2)
+    candidate_str = pb.json(candidate)
 
     # Flags (if we ever want to use them programmatically)
     has_required_tech = bool(required_tech)
@@ -60,11 +91,7 @@ def generate_next_question(
         )
 
     prompt = f"""
-You are an interview assistant for an AI-native anti-portfolio called JobFitIndex.
-You design questions to reveal HOW a candidate works, tailored to the role profile and to what they already said.
-
-ROLE PROFILE (JSON):
-{profile_str}
+You design questions to reveal HOW a candidate works, tailored to the role profile above and to what they already said.
 
 CANDIDATE BASIC INFO (JSON):
 {candidate_str}
@@ -72,8 +99,8 @@ CANDIDATE BASIC INFO (JSON):
 CURRENT CRITERION TO EXPLORE:
 {criterion}
 
-PREVIOUS ANSWERS (JSON, may be empty):
-{answers_str}
+PREVIOUS ANSWERS (JSON, may be empty; older ones may be shortened):
+{ANSWERS_SLOT}
 
 REQUIREMENT FLAGS:
 - Minimum years of experience: {min_years}
@@ -102,7 +129,8 @@ OUTPUT FORMAT:
 {format_instructions}
 """
 
-    messages = [
+    messages = pb.finish([
+        pb.role_message(role_profile),
         {
             "role": "system",
             "content": (
@@ -114,31 +142,28 @@ OUTPUT FORMAT:
             "role": "user",
             "content": prompt,
         },
-    ]
+    ], answers, keep_recent=RECENT_ANSWERS)
 
-    return call_llm(messages, temperature=0.6, max_tokens=220)
+    return call_llm(messages, temperature=0.6, max_tokens=220, call_type="questions")
 
 
-def generate_questions_batch(plan: list, role_profile: dict, answers: dict | None = None) -> list:
+@traced("generate_questions_batch")
+def generate_questions_batch(plan: list, role_profile: dict, answers: dict | None = None,
+                             on_delta=None) -> list:
     """
     Prende il plan (lista di slot con id/type/focus) e genera una domanda testuale per ogni slot
     in UNA sola chiamata LLM. Ritorna una nuova lista di slot con anche "question".
+    on_delta: optional callback, receives the raw JSON text as it streams in.
     """
-    profile_str = json.dumps(role_profile, indent=2) if role_profile else "{}"
-    plan_str = json.dumps(plan, indent=2)
-    answers_str = json.dumps(answers or {}, indent=2)
+    pb = PromptBudget("questions")
+    plan_str = pb.json(plan)
 
     prompt = f"""
-You are an interview assistant for JobFitIndex.
-
-ROLE PROFILE (JSON):
-{profile_str}
-
 INTERVIEW PLAN (JSON, without question text yet):
 {plan_str}
 
-PREVIOUS ANSWERS (JSON, may be empty):
-{answers_str}
+PREVIOUS ANSWERS (JSON, may be empty; older ones may be shortened):
+{ANSWERS_SLOT}
 
 TASK:
 For each item in the INTERVIEW PLAN, fill in a concrete, short "question" field.
@@ -151,14 +176,79 @@ Rules:
 - Do NOT add or remove items.
 """
 
-    messages = [
+    messages = pb.finish([
+        pb.role_message(role_profile),
         {
             "role": "system",
             "content": "You return valid JSON only. You keep the same list length and ids.",
         },
         {"role": "user", "content": prompt},
-    ]
+    ], answers, keep_recent=RECENT_ANSWERS)
+
+    items = complete_structured(
+        "questions", messages, {"type": "array", "items": QUESTION_ITEM_SCHEMA},
+        temperature=0.4, max_tokens=600, call_type="questions", on_delta=on_delta,
+        check=_missing_ids(plan),
+    )
+    # The plan is authoritative for ids, order, type and focus
+    by_id = {item["id"]: item["question"].strip() for item in items}
+    return [{**slot, "question": by_id[slot["id"]]} for slot in plan]
+
+
+@traced("generate_question_variants")
+def generate_question_variants(plan: list, role_profile: dict, n: int = 3) -> dict:
+    """
+    Generate n alternative questions for every plan slot in ONE LLM call.
+    Returns {slot_id: [question, ...]}.
+    """
+    pb = PromptBudget("question_variants")
+    plan_str = pb.json(plan)
+
+    prompt = f"""
+INTERVIEW PLAN (JSON, without question text yet):
+{plan_str}
+
+TASK:
+For each item in the INTERVIEW PLAN, write {n} DIFFERENT concrete, short questions.
+Return ONLY a JSON array with one object per plan item, in this format:
+[
+  {{"id": 1, "questions": ["...", "..."]}}
+]
 
-    raw = call_llm(messages, temperature=0.4, max_tokens=600)
-    questions_plan = json.loads(raw)
-    return questions_plan
+Rules:
+- Each question must be 1-2 sentences.
+- Must be specific to this role and company.
+- Use "type" and "focus" of the item to shape the questions.
+- The {n} questions of an item must explore the same focus from different angles,
+  not be rephrasings of each other.
+- Do NOT add or remove items.
+"""
+
+    messages = pb.finish([
+        pb.role_message(role_profile),
+        {
+            "role": "system",
+            "content": "You return valid JSON only. You keep the same list length and ids.",
+        },
+        {"role": "user", "content": prompt},
+    ])
+
+    max_tokens = min(120 * n * max(len(plan), 1) + 100, 4000)
+    # Fresh variants every time: caching would just return the same pool again
+    items = complete_structured(
+        "question_variants", messages, {"type": "array", "items": VARIANT_ITEM_SCHEMA},
+        temperature=0.9, max_tokens=max_tokens, call_type="questions", use_cache=False,
+    )
+
+    plan_ids = {slot["id"] for slot in plan}
+    variants = {}
+    for item in items:
+        if item.get("id") in plan_ids:
+            variants[item["id"]] = [q.strip() for q in item["questions"] if q.strip()]
+    return variants
+
+
+def question_set_hash(plan: list, role_profile: dict) -> str:
+    """Identifies the inputs of generate_questions_batch for a role (no answers)."""
+    raw = json.dumps({"plan": plan, "role": role_profile}, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
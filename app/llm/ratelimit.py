@@ -0,0 +1,282 @@
+# app/llm/ratelimit.py
+import email.utils
+import random
+import threading
+import time
+
+import streamlit as st
+
+# Defaults for every model; override per model with a [LLM_RATE_LIMITS."<model>"] table
+DEFAULT_RPM = float(st.secrets.get("LLM_RPM", 20))
+DEFAULT_TPM = float(st.secrets.get("LLM_TPM", 0))  # 0 = no token limit
+MODEL_LIMITS = dict(st.secrets.get("LLM_RATE_LIMITS", {}))
+
+MAX_RETRIES = int(st.secrets.get("LLM_MAX_RETRIES", 5))
+BACKOFF_BASE = float(st.secrets.get("LLM_BACKOFF_BASE", 1.0))  # seconds
+BACKOFF_MAX = float(st.secrets.get("LLM_BACKOFF_MAX", 30.0))  # seconds
+
+BREAKER_THRESHOLD = int(st.secrets.get("LLM_BREAKER_THRESHOLD", 5))  # consecutive failures
+BREAKER_COOLDOWN = float(st.secrets.get("LLM_BREAKER_COOLDOWN", 30.0))  # seconds
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at rate_per_min.
+    The balance may go negative after charge() so actual usage is paid back later.
+    """
+
+    def __init__(self, rate_per_min: float, capacity: float | None = None):
+        self.rate = rate_per_min / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_min
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.cond = threading.Condition()
+        self.waiting = 0
+        self.max_waiting = 0
+        self.wait_seconds = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float, timeout: float) -> bool:
+        amount = min(amount, self.capacity)
+        end = time.monotonic() + timeout
+        with self.cond:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+            started = time.monotonic()
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if now >= self.paused_until and self.tokens >= amount:
+                        self.tokens -= amount
+                        return True
+                    if now >= end:
+                        return False
+                    if now < self.paused_until:
+                        need = self.paused_until - now
+                    else:
+                        need = (amount - self.tokens) / self.rate
+                    self.cond.wait(min(need, end - now))
+            finally:
+                self.waiting -= 1
+                self.wait_seconds += time.monotonic() - started
+
+    def charge(self, amount: float):
+        with self.cond:
+            self._refill(time.monotonic())
+            self.tokens -= amount
+            self.cond.notify_all()
+
+    def pause(self, seconds: float):
+        """Hold every caller until the provider's window resets."""
+        with self.cond:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class CircuitBreaker:
+    """closed -> open after N consecutive failures -> half-open after cooldown."""
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self.lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self.probing:
+                self.probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """The half-open probe ended without a verdict (never sent, or abandoned)."""
+        with self.lock:
+            self.probing = False
+
+
+class ModelLimiter:
+    def __init__(self, model: str):
+        limits = dict(MODEL_LIMITS.get(model, {}))
+        rpm = float(limits.get("rpm", DEFAULT_RPM))
+        tpm = float(limits.get("tpm", DEFAULT_TPM))
+        self.model = model
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.breaker = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN)
+        self.throttled = 0  # 429 responses seen
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(model: str) -> ModelLimiter:
+    limiter = _limiters.get(model)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(model)
+            if limiter is None:
+                limiter = ModelLimiter(model)
+                _limiters[model] = limiter
+    return limiter
+
+
+def estimate_tokens(messages: list, max_tokens: int) -> int:
+    """Rough upper bound: ~4 characters per prompt token plus the completion budget."""
+    chars = sum(len(m.get("content") or "") for m in messages)
+    return chars // 4 + max_tokens
+
+
+def before_request(model: str, est_tokens: int, timeout: float):
+    """Fail fast if the breaker is open, otherwise wait for request and token budget."""
+    limiter = get_limiter(model)
+    if not limiter.breaker.allow():
+        raise RuntimeError(
+            "LLM provider is saturated (circuit open). Please try again in a moment."
+        )
+    if (limiter.requests and not limiter.requests.acquire(1, timeout)) or (
+        limiter.tokens and not limiter.tokens.acquire(est_tokens, timeout)
+    ):
+        limiter.breaker.release_probe()
+        raise RuntimeError("LLM call exceeded its deadline waiting for the rate limiter.")
+
+
+def observe_failure(model: str):
+    """A request that got no usable response (timeout, connection error, broken body)."""
+    get_limiter(model).breaker.record_failure()
+
+
+def release_probe(model: str):
+    """A request let through by the breaker that was not sent after all, or was abandoned."""
+    get_limiter(model).breaker.release_probe()
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(when.timestamp() - time.time(), 0.0)
+
+
+def _parse_reset(value: str | None) -> float | None:
+    """
+    Reset headers come as epoch seconds, epoch milliseconds (OpenRouter)
+    or a relative duration like "1.5s" / "20ms" (OpenAI).
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        if value.endswith("ms"):
+            return float(value[:-2]) / 1000
+        if value.endswith("s"):
+            return float(value[:-1])
+        number = float(value)
+    except ValueError:
+        return None
+    now = time.time()
+    if number > 1e12:
+        return max(number / 1000 - now, 0.0)
+    if number > 1e9:
+        return max(number - now, 0.0)
+    return number
+
+
+def server_delay(headers) -> float | None:
+    """Seconds the provider asked us to wait, from Retry-After or rate-limit headers."""
+    delay = _parse_retry_after(headers.get("Retry-After"))
+    if delay is not None:
+        return delay
+    remaining = headers.get("X-RateLimit-Remaining") or headers.get(
+        "x-ratelimit-remaining-requests"
+    )
+    if remaining is not None and remaining.strip() == "0":
+        return _parse_reset(
+            headers.get("X-RateLimit-Reset") or headers.get("x-ratelimit-reset-requests")
+        )
+    return None
+
+
+def observe_response(model: str, status_code: int, headers, est_tokens: int,
+                     used_tokens: int | None = None):
+    """Feed the outcome back into the bucket, the breaker and the header-driven pause."""
+    limiter = get_limiter(model)
+
+    delay = server_delay(headers)
+    if delay and limiter.requests:
+        limiter.requests.pause(delay)
+
+    if status_code == 429 or status_code >= 500:
+        if status_code == 429:
+            limiter.throttled += 1
+        limiter.breaker.record_failure()
+        return
+
+    limiter.breaker.record_success()
+    if limiter.tokens and used_tokens is not None:
+        limiter.tokens.charge(used_tokens - est_tokens)
+
+
+def backoff_delay(attempt: int, headers=None) -> float:
+    """Full-jitter exponential backoff, never shorter than what the server asked for."""
+    jittered = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+    asked = server_delay(headers) if headers is not None else None
+    if asked is not None:
+        return min(max(asked, jittered), BACKOFF_MAX * 4)
+    return jittered
+
+
+def ratelimit_stats() -> dict:
+    stats = {}
+    for model, limiter in list(_limiters.items()):
+        req = limiter.requests
+        tok = limiter.tokens
+        stats[model] = {
+            "queue_depth": (req.waiting if req else 0) + (tok.waiting if tok else 0),
+            "max_queue_depth": max(req.max_waiting if req else 0, tok.max_waiting if tok else 0),
+            "wait_seconds": (req.wait_seconds if req else 0.0) + (tok.wait_seconds if tok else 0.0),
+            "throttled_429": limiter.throttled,
+            "breaker_state": limiter.breaker.state,
+            "breaker_rejected": limiter.breaker.rejected,
+        }
+    return stats
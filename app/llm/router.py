@@ -0,0 +1,191 @@
+# app/llm/router.py
+import threading
+import time
+from collections import Counter, deque
+
+import streamlit as st
+from app.llm import ratelimit
+
+# Ordered pool of backends, e.g.
+#   [[LLM_BACKENDS]]
+#   name = "llama-free"
+#   model = "meta-llama/llama-3.3-70b-instruct:free"
+#   url = "https://openrouter.ai/api/v1/chat/completions"   # optional, default LLM_API_URL
+#   api_key = "..."                                          # optional, default LLM_API_KEY
+#   json_mode = true                                         # optional, default LLM_JSON_MODE
+# Without it the single LLM_API_URL / LLM_MODEL backend is used.
+BACKENDS_CONFIG = list(st.secrets.get("LLM_BACKENDS", []))
+# Backend names allowed per call type (plan, questions, judge), in preference order
+ROUTES_CONFIG = dict(st.secrets.get("LLM_ROUTES", {}))
+
+WINDOW_SECONDS = float(st.secrets.get("LLM_ROUTER_WINDOW", 300))  # rolling stats window
+MIN_SAMPLES = int(st.secrets.get("LLM_ROUTER_MIN_SAMPLES", 5))  # before latency/error rate count
+MAX_ERROR_RATE = float(st.secrets.get("LLM_ROUTER_MAX_ERROR_RATE", 0.5))
+HEDGE_ENABLED = bool(st.secrets.get("LLM_HEDGE", True))
+HEDGE_AFTER = float(st.secrets.get("LLM_HEDGE_AFTER", 0))  # seconds, 0 = the backend's p95
+FALLBACK_RETRIES = int(st.secrets.get("LLM_FALLBACK_RETRIES", 1))  # retries before moving on
+# Send response_format (JSON mode) to the provider; per backend with `json_mode = true`
+JSON_MODE = bool(st.secrets.get("LLM_JSON_MODE", False))
+
+MAX_SAMPLES = 500  # per deque, bounds memory on busy processes
+
+
+def _percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    rank = max(int(-(-p * len(ordered) // 100)), 1)  # nearest rank
+    return ordered[rank - 1]
+
+
+class Backend:
+    """One model on one endpoint, with rolling latency (per call type) and error rate."""
+
+    def __init__(self, name: str, model: str, url: str, api_key: str | None,
+                 json_mode: bool = JSON_MODE):
+        self.name = name
+        self.model = model
+        self.url = url
+        self.json_mode = json_mode
+        self.headers = {"Authorization": f"Bearer {api_key}"}
+        self.lock = threading.Lock()
+        self.latencies = {}  # call_type -> deque of (time, seconds), successes only
+        self.outcomes = deque(maxlen=MAX_SAMPLES)  # (time, ok)
+        self.calls = 0
+        self.errors = 0
+
+    def _trim(self, samples: deque, now: float):
+        while samples and now - samples[0][0] > WINDOW_SECONDS:
+            samples.popleft()
+
+    def record(self, call_type: str, seconds: float, ok: bool):
+        now = time.monotonic()
+        with self.lock:
+            self.calls += 1
+            self.outcomes.append((now, ok))
+            if ok:
+                samples = self.latencies.setdefault(call_type, deque(maxlen=MAX_SAMPLES))
+                samples.append((now, seconds))
+            else:
+                self.errors += 1
+
+    def latency(self, call_type: str, p: float) -> float | None:
+        """Rolling latency percentile in seconds, None until MIN_SAMPLES successes."""
+        with self.lock:
+            samples = self.latencies.get(call_type)
+            if not samples:
+                return None
+            self._trim(samples, time.monotonic())
+            if len(samples) < MIN_SAMPLES:
+                return None
+            return _percentile([s for _, s in samples], p)
+
+    def error_rate(self) -> float | None:
+        with self.lock:
+            self._trim(self.outcomes, time.monotonic())
+            if len(self.outcomes) < MIN_SAMPLES:
+                return None
+            return sum(1 for _, ok in self.outcomes if not ok) / len(self.outcomes)
+
+    def healthy(self) -> bool:
+        if ratelimit.get_limiter(self.name).breaker.state == "open":
+            return False
+        rate = self.error_rate()
+        return rate is None or rate <= MAX_ERROR_RATE
+
+
+class Router:
+    """
+    Ranks the backends of a call type: healthy ones by rolling p50 (backends
+    without MIN_SAMPLES yet go first, to measure them), unhealthy ones last
+    as a final resort. Every decision is counted for router_stats().
+    """
+
+    def __init__(self, backends: list, routes: dict):
+        self.backends = {b.name: b for b in backends}
+        self.order = [b.name for b in backends]
+        self.routes = {
+            call_type: [n for n in names if n in self.backends] or self.order
+            for call_type, names in routes.items()
+        }
+        self.decisions = Counter()  # (call_type, backend, kind) -> count
+        self.lock = threading.Lock()
+
+    def route(self, call_type: str) -> list:
+        return [self.backends[n] for n in self.routes.get(call_type, self.order)]
+
+    def route_key(self, call_type: str) -> str:
+        """Identifies the models a call type can be answered by (part of the cache key)."""
+        return ",".join(b.model for b in self.route(call_type))
+
+    def candidates(self, call_type: str) -> list:
+        route = self.route(call_type)
+        healthy = [b for b in route if b.healthy()]
+        unhealthy = [b for b in route if b not in healthy]
+
+        def speed(backend):
+            p50 = backend.latency(call_type, 50)
+            return 0.0 if p50 is None else p50
+
+        # sorted() is stable: equal speeds keep the configured order
+        return sorted(healthy, key=speed) + unhealthy
+
+    def hedge_delay(self, backend: Backend, call_type: str) -> float | None:
+        """Seconds to wait on `backend` before hedging, None when hedging is off."""
+        if not HEDGE_ENABLED:
+            return None
+        if HEDGE_AFTER > 0:
+            return HEDGE_AFTER
+        return backend.latency(call_type, 95)
+
+    def record_decision(self, call_type: str, backend: Backend, kind: str):
+        """kind: primary, fallback, hedge (second request sent) or hedge_win."""
+        with self.lock:
+            self.decisions[(call_type, backend.name, kind)] += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            decisions = dict(self.decisions)
+        backends = {}
+        for name in self.order:
+            b = self.backends[name]
+            call_types = sorted(b.latencies)
+            backends[name] = {
+                "model": b.model,
+                "url": b.url,
+                "json_mode": b.json_mode,
+                "healthy": b.healthy(),
+                "calls": b.calls,
+                "errors": b.errors,
+                "error_rate": b.error_rate(),
+                "latency_ms": {
+                    ct: {
+                        "p50": _ms(b.latency(ct, 50)),
+                        "p95": _ms(b.latency(ct, 95)),
+                    }
+                    for ct in call_types
+                },
+            }
+        routing = {}
+        for (call_type, name, kind), count in decisions.items():
+            routing.setdefault(call_type, {}).setdefault(name, {})[kind] = count
+        return {"backends": backends, "routing": routing}
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def load_router(default_url: str, default_key: str | None, default_model: str) -> Router:
+    backends = []
+    for cfg in BACKENDS_CONFIG:
+        cfg = dict(cfg)
+        model = cfg.get("model", default_model)
+        backends.append(Backend(
+            name=cfg.get("name", model),
+            model=model,
+            url=cfg.get("url", default_url),
+            api_key=cfg.get("api_key", default_key),
+            json_mode=bool(cfg.get("json_mode", JSON_MODE)),
+        ))
+    if not backends:
+        backends.append(Backend(default_model, default_model, default_url, default_key))
+    return Router(backends, {k: list(v) for k, v in ROUTES_CONFIG.items()})
@@ -0,0 +1,96 @@
+# app/llm/singleflight.py
+import threading
+import time
+
+# Identical requests (same cache key) made while one is already in flight
+# wait for it and share its answer instead of sending their own.
+
+_lock = threading.Lock()
+_flights = {}  # key -> Flight
+
+_stats = {
+    "leaders": 0,  # requests actually sent
+    "coalesced": 0,  # callers served by someone else's request
+    "abandoned": 0,  # leaders that gave up (cancelled / stream dropped): followers retried
+}
+
+
+class Abandoned(Exception):
+    """The leader stopped without an answer for reasons of its own (cancelled, deadline)."""
+
+
+class Flight:
+    """One in-flight request: its deltas so far, then the outcome."""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.parts = []
+        self.done = False
+        self.error = None
+
+    def push(self, delta: str):
+        with self.cond:
+            self.parts.append(delta)
+            self.cond.notify_all()
+
+    def _wait(self, seen: int, deadline: float, cancelled):
+        """Block until there are more than `seen` parts or the flight is over."""
+        while len(self.parts) <= seen and not self.done:
+            if cancelled is not None and cancelled.is_set():
+                raise RuntimeError("LLM call cancelled.")
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise RuntimeError("LLM call exceeded its deadline.")
+            # short waits so cancellation is noticed
+            self.cond.wait(min(left, 0.5))
+
+    def follow(self, deadline: float, cancelled=None):
+        """Generator of every delta of the flight, replaying those already received."""
+        seen = 0
+        while True:
+            with self.cond:
+                self._wait(seen, deadline, cancelled)
+                new = self.parts[seen:]
+                seen = len(self.parts)
+                done, error = self.done, self.error
+            yield from new
+            if done and seen == len(self.parts):
+                if error is not None:
+                    raise error
+                return
+
+    def result(self, deadline: float, cancelled=None) -> str:
+        return "".join(self.follow(deadline, cancelled))
+
+
+def join(key: str):
+    """(flight, is_leader). The leader must call land() whatever happens."""
+    with _lock:
+        flight = _flights.get(key)
+        if flight is None:
+            flight = _flights[key] = Flight()
+            _stats["leaders"] += 1
+            return flight, True
+        _stats["coalesced"] += 1
+        return flight, False
+
+
+def land(key: str, flight: Flight, error: BaseException | None = None,
+         abandoned: bool = False):
+    """Publish the outcome to the followers and let the next identical call start fresh."""
+    with _lock:
+        if _flights.get(key) is flight:
+            del _flights[key]
+        if abandoned:
+            _stats["abandoned"] += 1
+    if abandoned:
+        error = Abandoned()
+    with flight.cond:
+        flight.done = True
+        flight.error = error
+        flight.cond.notify_all()
+
+
+def singleflight_stats() -> dict:
+    with _lock:
+        return {**_stats, "in_flight": len(_flights)}
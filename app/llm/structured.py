@@ -0,0 +1,395 @@
+# app/llm/structured.py
+import json
+import threading
+
+from app.llm import ratelimit
+from app.llm.client import acall_llm, call_llm, replace_cached_reply
+from app.observability import metrics
+
+# Sent when the expected output is a JSON object; backends without json_mode ignore it
+JSON_OBJECT_FORMAT = {"type": "json_object"}
+
+MAX_CUT_ATTEMPTS = 64  # truncation repair: how many shorter prefixes to try
+
+_lock = threading.Lock()
+_stats = {}  # name -> counters, see structured_stats()
+
+
+class StructuredOutputError(RuntimeError):
+    """
+    The output is still unusable after local repair and re-asking.
+    `value` is the best partial result (None if nothing could be parsed),
+    `errors` the remaining (path, message) problems, `raw` the first answer.
+    """
+
+    def __init__(self, name: str, errors: list, value=None, raw: str = ""):
+        self.name = name
+        self.errors = errors
+        self.value = value
+        self.raw = raw
+        details = "; ".join(f"{path}: {msg}" for path, msg in errors[:5])
+        super().__init__(f"Unusable {name} output from the LLM ({details})")
+
+
+# ---------------------------
+# Parsing + local repair
+# ---------------------------
+
+def _strip_fences(raw: str) -> str:
+    text = raw.strip()
+    if "```" in text:
+        start = text.index("```") + 3
+        end = text.find("```", start)
+        text = text[start:end if end != -1 else len(text)]
+        first_line, _, rest = text.partition("\n")
+        if first_line.strip().lower() in ("json", ""):
+            text = rest
+    return text.strip()
+
+
+def _closers(stack: list) -> str:
+    return "".join("}" if c == "{" else "]" for c in reversed(stack))
+
+
+def _repair_truncated(text: str):
+    """
+    Parse the longest prefix of `text` that ends after a complete value,
+    closing the brackets left open. A field cut mid-string is dropped
+    rather than kept half-written. Returns the value or raises ValueError.
+    """
+    stack = []
+    cuts = []  # (end index, open brackets at that point)
+    in_string = False
+    escaped = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append(ch)
+        elif ch in "}]":
+            if not stack:
+                break
+            stack.pop()
+            cuts.append((i + 1, list(stack)))
+            if not stack:
+                break  # first complete top-level value
+        elif ch == ",":
+            cuts.append((i, list(stack)))
+
+    for end, open_stack in reversed(cuts[-MAX_CUT_ATTEMPTS:]):
+        try:
+            return json.loads(text[:end] + _closers(open_stack))
+        except json.JSONDecodeError:
+            continue
+    raise ValueError("no parsable JSON prefix")
+
+
+def parse_json(raw: str, expect: str = "object"):
+    """
+    (value, repaired) from LLM text: direct json.loads first, then the first
+    {...} / [...] span with fences, surrounding prose, trailing commas and
+    truncation repaired locally. Raises ValueError if nothing usable is found.
+    """
+    text = _strip_fences(raw or "")
+    try:
+        return json.loads(text), False
+    except json.JSONDecodeError:
+        pass
+
+    opener = "{" if expect == "object" else "["
+    start = text.find(opener)
+    if start == -1:
+        raise ValueError(f"no JSON {expect} in the output")
+    return _repair_truncated(text[start:]), True
+
+
+# ---------------------------
+# Validation (the JSON-schema subset the prompts need)
+# ---------------------------
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+}
+
+
+def validate(value, schema: dict, path: str = "$") -> list:
+    """(path, message) for every violation; supports type, enum, properties,
+    required, items, minItems, maxItems and minLength."""
+    errors = []
+    expected = schema.get("type")
+    if expected:
+        ok = isinstance(value, _TYPES[expected])
+        if expected in ("integer", "number") and isinstance(value, bool):
+            ok = False
+        if expected == "integer" and isinstance(value, float) and value.is_integer():
+            ok = True
+        if not ok:
+            return [(path, f"expected {expected}")]
+
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append((path, f"must be one of {schema['enum']}"))
+
+    if isinstance(value, str) and len(value.strip()) < schema.get("minLength", 0):
+        errors.append((path, "must not be empty"))
+
+    if isinstance(value, dict):
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append((f"{path}.{key}", "missing"))
+        for key, sub in schema.get("properties", {}).items():
+            if key in value:
+                errors.extend(validate(value[key], sub, f"{path}.{key}"))
+
+    if isinstance(value, list):
+        if len(value) < schema.get("minItems", 0):
+            errors.append((path, f"expected at least {schema['minItems']} items"))
+        if "maxItems" in schema and len(value) > schema["maxItems"]:
+            errors.append((path, f"expected at most {schema['maxItems']} items"))
+        if "items" in schema:
+            for i, item in enumerate(value):
+                errors.extend(validate(item, schema["items"], f"{path}[{i}]"))
+    return errors
+
+
+# ---------------------------
+# Re-asking for missing fields
+# ---------------------------
+
+def _prune(value, errors: list):
+    """Drop invalid fields / array items so the re-ask answer can replace them."""
+    if isinstance(value, dict):
+        bad = {p.split(".")[1].split("[")[0] for p, _ in errors if p.startswith("$.")}
+        nested = {}
+        for key in bad:
+            prefix = f"$.{key}"
+            sub = [("$" + p[len(prefix):], m) for p, m in errors
+                   if p.startswith(prefix) and p != prefix]
+            if sub and isinstance(value.get(key), (dict, list)):
+                nested[key] = _prune(value[key], sub)
+        return {
+            k: nested.get(k, v) for k, v in value.items()
+            if k not in bad or k in nested
+        }
+    if isinstance(value, list):
+        bad_items = {int(p[2:].split("]")[0]) for p, _ in errors if p.startswith("$[")}
+        return [item for i, item in enumerate(value) if i not in bad_items]
+    return value
+
+
+def _merge(base, patch):
+    """Deep-merge objects; arrays of objects with "id" are merged by id and sorted."""
+    if isinstance(base, dict) and isinstance(patch, dict):
+        merged = dict(base)
+        for key, val in patch.items():
+            merged[key] = _merge(base.get(key), val) if key in base else val
+        return merged
+    if isinstance(base, list) and isinstance(patch, list):
+        if all(isinstance(x, dict) and "id" in x for x in base + patch):
+            by_id = {x["id"]: x for x in base}
+            for item in patch:
+                by_id[item["id"]] = _merge(by_id.get(item["id"], {}), item)
+            try:
+                return sorted(by_id.values(), key=lambda x: x["id"])
+            except TypeError:
+                return list(by_id.values())
+        return patch
+    return patch if patch is not None else base
+
+
+def _reask_messages(messages: list, raw: str, errors: list, expect: str) -> list:
+    problems = "\n".join(f"- {path}: {msg}" for path, msg in errors)
+    if expect == "object":
+        shape = "a JSON object containing ONLY the missing or invalid fields (same nesting)"
+    else:
+        shape = ("a JSON array containing ONLY the missing or invalid items, complete, "
+                 "with their original ids")
+    return messages + [
+        {"role": "assistant", "content": raw[:4000]},
+        {
+            "role": "user",
+            "content": (
+                "Your JSON had these problems ($ is the root):\n"
+                f"{problems}\n\n"
+                f"Return {shape}. Fields that were correct must NOT be repeated. "
+                "No extra text."
+            ),
+        },
+    ]
+
+
+# ---------------------------
+# Stats
+# ---------------------------
+
+def _record(name: str, **counts):
+    with _lock:
+        stats = _stats.setdefault(name, {
+            "calls": 0,  # structured calls made
+            "clean": 0,  # valid on first parse
+            "repaired": 0,  # needed local repair (fences, prose, truncation)
+            "reasks": 0,  # extra LLM calls for missing / invalid fields
+            "reask_fixed": 0,  # calls rescued by a re-ask
+            "failed": 0,  # still invalid at the end
+            "tokens": 0,  # estimated tokens of the first requests
+            "reask_tokens": 0,  # estimated tokens spent on re-asks
+        })
+        for key, n in counts.items():
+            stats[key] += n
+
+
+def structured_stats() -> dict:
+    """Per output name: counters plus parse-failure rate and share of tokens spent on re-asks."""
+    with _lock:
+        result = {}
+        for name, s in _stats.items():
+            calls = s["calls"] or 1
+            total_tokens = s["tokens"] + s["reask_tokens"]
+            result[name] = {
+                **s,
+                "parse_failure_rate": round((s["calls"] - s["clean"]) / calls, 3),
+                "reask_token_share": round(s["reask_tokens"] / total_tokens, 3) if total_tokens else 0.0,
+            }
+        return result
+
+
+def _metrics_families() -> list:
+    with _lock:
+        stats = {name: dict(s) for name, s in _stats.items()}
+    return [
+        ("jobfit_llm_structured_total", "counter",
+         "Structured LLM outputs by name and outcome (calls, clean, repaired, reasks, reask_fixed, failed).",
+         [({"name": name, "outcome": k}, s[k]) for name, s in stats.items()
+          for k in ("calls", "clean", "repaired", "reasks", "reask_fixed", "failed")]),
+    ]
+
+
+metrics.register_collector(_metrics_families)
+
+
+# ---------------------------
+# Entry points
+# ---------------------------
+
+def _check(value, schema, check) -> list:
+    errors = validate(value, schema)
+    if not errors and check is not None:
+        errors = check(value)
+    return errors
+
+
+def _first_pass(name, raw, schema, check):
+    """(value, errors, repaired) of the first answer; value None if unparsable."""
+    expect = schema.get("type", "object")
+    try:
+        value, repaired = parse_json(raw, expect)
+    except ValueError as e:
+        return None, [("$", str(e))], True
+    return value, _check(value, schema, check), repaired
+
+
+def _after_reask(value, errors, reask_raw, schema, check):
+    expect = schema.get("type", "object")
+    try:
+        patch, _ = parse_json(reask_raw, expect)
+    except ValueError:
+        return value, errors
+    # Nothing parsed the first time: the re-ask answer is the whole output
+    merged = patch if value is None else _merge(_prune(value, errors), patch)
+    return merged, _check(merged, schema, check)
+
+
+def _correct_cache(messages, temperature, max_tokens, call_type, response_format,
+                   value, errors):
+    """
+    call_llm caches the raw first reply before it is validated: when it needed
+    a re-ask, cache the validated result instead, or drop the bad reply.
+    """
+    content = None if errors else json.dumps(value, ensure_ascii=False)
+    replace_cached_reply(messages, temperature, max_tokens, call_type, response_format, content)
+
+
+def complete_structured(name: str, messages: list, schema: dict, temperature: float,
+                        max_tokens: int, call_type: str = "default", on_delta=None,
+                        use_cache: bool = True, max_reasks: int = 1, check=None):
+    """
+    call_llm for an output that must match `schema`: JSON mode when the
+    backend supports it, local repair of fenced / truncated JSON, then up to
+    max_reasks follow-ups asking only for the fields still missing or invalid.
+    check(value) -> [(path, message)] adds call-specific rules.
+    Raises StructuredOutputError (with the partial value) if it never validates.
+    """
+    response_format = JSON_OBJECT_FORMAT if schema.get("type") == "object" else None
+    raw = call_llm(messages, temperature=temperature, max_tokens=max_tokens,
+                   use_cache=use_cache, on_delta=on_delta, call_type=call_type,
+                   response_format=response_format)
+    _record(name, calls=1, tokens=ratelimit.estimate_tokens(messages, max_tokens))
+    value, errors, repaired = _first_pass(name, raw, schema, check)
+    _record(name, clean=int(not errors and not repaired), repaired=int(repaired))
+
+    needed_reask = bool(errors)
+    for _ in range(max_reasks):
+        if not errors:
+            break
+        reask = _reask_messages(messages, raw, errors, schema.get("type", "object"))
+        _record(name, reasks=1, reask_tokens=ratelimit.estimate_tokens(reask, max_tokens))
+        reask_raw = call_llm(reask, temperature=temperature, max_tokens=max_tokens,
+                             use_cache=False, call_type=call_type,
+                             response_format=response_format)
+        value, errors = _after_reask(value, errors, reask_raw, schema, check)
+        if not errors:
+            _record(name, reask_fixed=1)
+
+    if needed_reask and use_cache:
+        _correct_cache(messages, temperature, max_tokens, call_type, response_format,
+                       value, errors)
+    if errors:
+        _record(name, failed=1)
+        raise StructuredOutputError(name, errors, value, raw)
+    return value
+
+
+async def acomplete_structured(name: str, messages: list, schema: dict, temperature: float,
+                               max_tokens: int, call_type: str = "default",
+                               use_cache: bool = True, max_reasks: int = 1, check=None):
+    """Async version of complete_structured (no streaming)."""
+    response_format = JSON_OBJECT_FORMAT if schema.get("type") == "object" else None
+    raw = await acall_llm(messages, temperature=temperature, max_tokens=max_tokens,
+                          use_cache=use_cache, call_type=call_type,
+                          response_format=response_format)
+    _record(name, calls=1, tokens=ratelimit.estimate_tokens(messages, max_tokens))
+    value, errors, repaired = _first_pass(name, raw, schema, check)
+    _record(name, clean=int(not errors and not repaired), repaired=int(repaired))
+
+    needed_reask = bool(errors)
+    for _ in range(max_reasks):
+        if not errors:
+            break
+        reask = _reask_messages(messages, raw, errors, schema.get("type", "object"))
+        _record(name, reasks=1, reask_tokens=ratelimit.estimate_tokens(reask, max_tokens))
+        reask_raw = await acall_llm(reask, temperature=temperature, max_tokens=max_tokens,
+                                    use_cache=False, call_type=call_type,
+                                    response_format=response_format)
+        value, errors = _after_reask(value, errors, reask_raw, schema, check)
+        if not errors:
+            _record(name, reask_fixed=1)
+
+    if needed_reask and use_cache:
+        _correct_cache(messages, temperature, max_tokens, call_type, response_format,
+                       value, errors)
+    if errors:
+        _record(name, failed=1)
+        raise StructuredOutputError(name, errors, value, raw)
+    return value
@@ -0,0 +1,400 @@
+# app/observability/metrics.py
+import functools
+import inspect
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.observability import tracing
+
+# Configured from the environment: app/db is used by the CLIs without Streamlit secrets
+METRICS_ENABLED = os.environ.get("JOBFIT_METRICS", "1") != "0"
+# Share of successful calls that are timed; errors are always counted.
+# Sampled observations are weighted by 1/rate, so counts stay unbiased estimates.
+DB_SAMPLE_RATE = float(os.environ.get("JOBFIT_METRICS_DB_SAMPLE_RATE", 0.1))
+LLM_SAMPLE_RATE = float(os.environ.get("JOBFIT_METRICS_LLM_SAMPLE_RATE", 1.0))
+# Prometheus text endpoint (http://HOST:PORT/metrics), 0 = off
+METRICS_HOST = os.environ.get("JOBFIT_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("JOBFIT_METRICS_PORT", 9464))
+
+# Histogram upper bounds, in seconds
+# (the lowest LLM buckets are for cache hits)
+LLM_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 40.0, 90.0, 180.0)
+DB_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+              0.5, 2.5)
+
+_lock = threading.Lock()
+_metrics = {}  # name -> Counter / Histogram, in registration order
+_collectors = []  # callables returning extra families at render time, see register_collector()
+_server = None
+_server_failed = False  # port taken: not retried on every rerun
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.values = {}  # label values -> total
+
+    def inc(self, labels: tuple, amount: float = 1.0):
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def samples(self):
+        return [(self.name, dict(zip(self.labelnames, k)), v) for k, v in self.values.items()]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple, buckets: tuple):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.series = {}  # label values -> [count per bucket..., +Inf count, sum]
+
+    def observe(self, labels: tuple, seconds: float, weight: float = 1.0):
+        n = len(self.buckets)
+        i = 0
+        while i < n and seconds > self.buckets[i]:
+            i += 1
+        with _lock:
+            row = self.series.get(labels)
+            if row is None:
+                row = self.series[labels] = [0.0] * (n + 2)
+            row[i] += weight
+            row[n + 1] += seconds * weight
+
+    def samples(self):
+        out = []
+        for key, row in self.series.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), row):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                out.append((self.name + "_bucket", {**labels, "le": le}, cumulative))
+            out.append((self.name + "_count", labels, cumulative))
+            out.append((self.name + "_sum", labels, row[-1]))
+        return out
+
+    def quantile(self, labels: tuple, q: float) -> float | None:
+        """Estimated from the buckets (linear within one), like histogram_quantile()."""
+        with _lock:
+            row = list(self.series.get(labels) or ())
+        if not row:
+            return None
+        counts = row[:-1]
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        cumulative = 0.0
+        lower = 0.0
+        for bound, count in zip(self.buckets, counts):
+            if cumulative + count >= rank:
+                share = (rank - cumulative) / count if count else 0.0
+                return lower + (bound - lower) * share
+            cumulative += count
+            lower = bound
+        return self.buckets[-1]  # in the +Inf bucket: report the highest bound
+
+
+def _register(metric):
+    with _lock:
+        return _metrics.setdefault(metric.name, metric)
+
+
+LLM_CALLS = _register(Counter(
+    "jobfit_llm_calls_total",
+    "call_llm / stream_llm calls by call site and how they were answered "
+    "(network, cache_hit, coalesced, error).",
+    ("call_site", "result"),
+))
+LLM_CALL_SECONDS = _register(Histogram(
+    "jobfit_llm_call_seconds",
+    "End-to-end call_llm / stream_llm latency, including queueing, retries and fallbacks.",
+    ("call_site", "result"),
+    LLM_BUCKETS,
+))
+LLM_REQUEST_SECONDS = _register(Histogram(
+    "jobfit_llm_request_seconds",
+    "Latency of the completion request sent to one backend model.",
+    ("call_site", "model"),
+    LLM_BUCKETS,
+))
+LLM_TOKENS = _register(Counter(
+    "jobfit_llm_tokens_total",
+    "Tokens reported by the provider (kind: prompt, completion).",
+    ("call_site", "model", "kind"),
+))
+LLM_RETRIES = _register(Counter(
+    "jobfit_llm_retries_total",
+    "Retryable responses (429 / 5xx) from a backend model.",
+    ("call_site", "model", "status"),
+))
+LLM_ERRORS = _register(Counter(
+    "jobfit_llm_errors_total",
+    "Failed completion requests by backend model and exception type.",
+    ("call_site", "model", "error"),
+))
+DB_CALL_SECONDS = _register(Histogram(
+    "jobfit_db_call_seconds",
+    "Latency of app/db functions (sampled, see JOBFIT_METRICS_DB_SAMPLE_RATE).",
+    ("function",),
+    DB_BUCKETS,
+))
+DB_ERRORS = _register(Counter(
+    "jobfit_db_errors_total",
+    "app/db functions that raised, by exception type.",
+    ("function", "error"),
+))
+
+
+def _sampled(rate: float) -> bool:
+    return rate >= 1.0 or random.random() < rate
+
+
+def _weight(rate: float) -> float:
+    return 1.0 / rate if 0 < rate < 1 else 1.0
+
+
+def observe_llm_call(call_site: str, result: str, seconds: float):
+    """One call_llm / stream_llm call, however it was answered."""
+    if not METRICS_ENABLED:
+        return
+    if result == "error":
+        LLM_CALLS.inc((call_site, result))
+        LLM_CALL_SECONDS.observe((call_site, result), seconds)
+    elif _sampled(LLM_SAMPLE_RATE):
+        weight = _weight(LLM_SAMPLE_RATE)
+        LLM_CALLS.inc((call_site, result), weight)
+        LLM_CALL_SECONDS.observe((call_site, result), seconds, weight)
+
+
+def observe_llm_request(call_site: str, model: str, seconds: float, usage: dict | None = None,
+                        error: BaseException | None = None):
+    """One completion request to a backend: latency, reported tokens, or the error."""
+    if not METRICS_ENABLED:
+        return
+    if error is not None:
+        LLM_ERRORS.inc((call_site, model, type(error).__name__))
+        return
+    if not _sampled(LLM_SAMPLE_RATE):
+        return
+    weight = _weight(LLM_SAMPLE_RATE)
+    LLM_REQUEST_SECONDS.observe((call_site, model), seconds, weight)
+    for kind in ("prompt", "completion"):
+        tokens = (usage or {}).get(f"{kind}_tokens")
+        if tokens:
+            LLM_TOKENS.inc((call_site, model, kind), tokens * weight)
+
+
+def count_llm_retry(call_site: str, model: str, status: int):
+    if METRICS_ENABLED:
+        LLM_RETRIES.inc((call_site, model, str(status)))
+
+
+def timed_db(fn):
+    """
+    Time an app/db function under its name (sampled at DB_SAMPLE_RATE).
+    Generator functions are timed until the caller stops iterating.
+    Inside a trace (see app/observability/tracing.py) each call is also a
+    "db.<name>" span.
+    """
+    timed = _timed_db_call(fn) if METRICS_ENABLED else fn
+    if inspect.isgeneratorfunction(fn) or not tracing.TRACING_ENABLED:
+        return timed
+    span_name = "db." + fn.__name__
+
+    @functools.wraps(fn)
+    def traced_wrapper(*args, **kwargs):
+        if tracing.current_span() is None:
+            return timed(*args, **kwargs)
+        with tracing.span(span_name):
+            return timed(*args, **kwargs)
+    return traced_wrapper
+
+
+def _timed_db_call(fn):
+    name = fn.__name__
+    rate = DB_SAMPLE_RATE
+    weight = _weight(rate)
+
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def generator_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                yield from fn(*args, **kwargs)
+            except Exception as e:
+                DB_ERRORS.inc((name, type(e).__name__))
+                raise
+            finally:
+                # iterations are few and long (exports): always timed
+                DB_CALL_SECONDS.observe((name,), time.perf_counter() - started)
+        return generator_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _sampled(rate):
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                DB_ERRORS.inc((name, type(e).__name__))
+                raise
+        started = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            DB_ERRORS.inc((name, type(e).__name__))
+            raise
+        DB_CALL_SECONDS.observe((name,), time.perf_counter() - started, weight)
+        return result
+    return wrapper
+
+
+def register_collector(collect):
+    """
+    collect() -> list of (name, kind, help, [(labels dict, value), ...]),
+    called on every render: exposes stats other modules already keep.
+    """
+    with _lock:
+        if collect not in _collectors:
+            _collectors.append(collect)
+
+
+# ---------------------------
+# Exposition
+# ---------------------------
+
+def _number(value) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    value = float(value)
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _sample_line(name: str, labels: dict, value) -> str:
+    if labels:
+        inner = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+        return f"{name}{{{inner}}} {_number(value)}"
+    return f"{name} {_number(value)}"
+
+
+def render() -> str:
+    """Every metric in the Prometheus text exposition format (0.0.4)."""
+    lines = []
+    with _lock:
+        metrics = list(_metrics.values())
+        collectors = list(_collectors)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(_sample_line(*s) for s in metric.samples())
+
+    for collect in collectors:
+        try:
+            families = collect()
+        except Exception as e:  # a broken collector must not take the endpoint down
+            lines.append(f"# collector {getattr(collect, '__name__', collect)} failed: "
+                         f"{type(e).__name__}")
+            continue
+        for name, kind, help_text, samples in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(_sample_line(name, labels, value) for labels, value in samples
+                         if value is not None)
+    return "\n".join(lines) + "\n"
+
+
+def histogram_rows(histogram: Histogram) -> list:
+    """Per label set: estimated count, mean and p50 / p95 / p99 in ms (for the admin page)."""
+    with _lock:
+        series = {k: list(v) for k, v in histogram.series.items()}
+    rows = []
+    for key, row in series.items():
+        count = sum(row[:-1])
+        rows.append({
+            **dict(zip(histogram.labelnames, key)),
+            "count": round(count),
+            "mean_ms": round(1000 * row[-1] / count, 2) if count else None,
+            **{
+                f"p{q}_ms": _ms(histogram.quantile(key, q / 100))
+                for q in (50, 95, 99)
+            },
+            "total_sec": round(row[-1], 2),
+        })
+    return rows
+
+
+def counter_rows(counter: Counter) -> list:
+    with _lock:
+        values = dict(counter.values)
+    return [{**dict(zip(counter.labelnames, k)), "value": round(v)} for k, v in values.items()]
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def reset():
+    """Drop every recorded series (benchmarks, tests)."""
+    with _lock:
+        for metric in _metrics.values():
+            if isinstance(metric, Histogram):
+                metric.series.clear()
+            else:
+                metric.values.clear()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass  # scraped every few seconds: keep stderr quiet
+
+
+def start_metrics_server(port: int | None = None, host: str | None = None):
+    """
+    Serve /metrics from a daemon thread, once per process. Returns the
+    server, or None when disabled or the port is taken (another process
+    already exposes it).
+    """
+    global _server, _server_failed
+    port = METRICS_PORT if port is None else port
+    if not METRICS_ENABLED or not port:
+        return None
+    with _lock:
+        if _server is not None or _server_failed:
+            return _server
+        try:
+            server = ThreadingHTTPServer((host or METRICS_HOST, port), _Handler)
+        except OSError:
+            _server_failed = True
+            return None
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        _server = server
+    return server
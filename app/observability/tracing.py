@@ -0,0 +1,503 @@
+# app/observability/tracing.py
+import contextvars
+import functools
+import json
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+
+# One trace per interview session (pages/1_Interview.py), OpenTelemetry-style:
+# spans with trace / span / parent ids, attributes and a status. Configured
+# from the environment, like app/observability/metrics.py.
+TRACING_ENABLED = os.environ.get("JOBFIT_TRACING", "1") != "0"
+TRACE_SAMPLE_RATE = float(os.environ.get("JOBFIT_TRACE_SAMPLE_RATE", 1.0))  # per interview
+# Finished spans are appended here as JSON lines when set; the file is never
+# rotated, so leave rotation to logrotate or similar ...
+TRACE_FILE = os.environ.get("JOBFIT_TRACE_FILE", "")
+# ... and/or posted to an OTLP/HTTP collector, e.g. http://localhost:4318/v1/traces
+OTLP_ENDPOINT = os.environ.get("JOBFIT_OTLP_ENDPOINT", "")
+SERVICE_NAME = "jobfitindex"
+
+EXPORT_BATCH = 200  # spans per file write / OTLP request
+EXPORT_INTERVAL = 1.0  # seconds between exports while spans are queued
+RECENT_SPANS = 5000  # finished spans kept in memory, see recent_spans()
+
+_current = contextvars.ContextVar("jobfit_span", default=None)
+_queue = queue.Queue()
+_recent = deque(maxlen=RECENT_SPANS)
+_exporter_lock = threading.Lock()
+_exporter = None
+_stats_lock = threading.Lock()
+_stats = {"exported": 0, "dropped": 0}
+
+
+class Span:
+    """
+    One timed operation. Children are created with span() while it is the
+    current span (or with parent= across threads and processes).
+    """
+
+    def __init__(self, name: str, trace_id: str, parent_id: str | None = None,
+                 attributes: dict | None = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = {k: v for k, v in (attributes or {}).items() if v is not None}
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.last_activity_ns = self.start_ns  # latest end among its children
+        self.status = "unset"  # "ok" or "error" once set
+        self.status_message = ""
+        self.events = []
+        self.parent = None
+
+    def set(self, **attributes):
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+    def add_event(self, name: str, **attributes):
+        self.events.append({"name": name, "time_ns": time.time_ns(), "attributes": attributes})
+
+    def record_error(self, error: BaseException):
+        self.status = "error"
+        self.status_message = f"{type(error).__name__}: {error}"[:300]
+
+    def end(self, end_ns: int | None = None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns or time.time_ns()
+        if self.status == "unset":
+            self.status = "ok"
+        parent = self.parent
+        if parent is not None and self.end_ns > parent.last_activity_ns:
+            parent.last_activity_ns = self.end_ns
+        _export(self)
+
+    def traceparent(self) -> str:
+        """W3C trace context, to continue the trace in another thread or process."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "status": self.status,
+            "status_message": self.status_message,
+            "attributes": self.attributes,
+            "events": self.events,
+            "thread": threading.current_thread().name,
+        }
+
+
+class _NoopSpan:
+    """Returned when nothing is traced, so callers never check for None."""
+    trace_id = span_id = None
+
+    def set(self, **attributes):
+        pass
+
+    def add_event(self, name: str, **attributes):
+        pass
+
+    def record_error(self, error: BaseException):
+        pass
+
+    def end(self, end_ns: int | None = None):
+        pass
+
+    def traceparent(self):
+        return None
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def _parse_traceparent(value: str):
+    parts = (value or "").split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+def current_span():
+    """The span of the running operation, None outside a trace."""
+    return _current.get()
+
+
+def start_span(name: str, parent=None, **attributes):
+    """
+    A started span that is not made current (streams, spans ended elsewhere).
+    parent: a Span or traceparent string, default the current span.
+    Without a trace to join this returns NOOP_SPAN.
+    """
+    if not TRACING_ENABLED:
+        return NOOP_SPAN
+    if parent is None:
+        parent = _current.get()
+    if isinstance(parent, Span):
+        span = Span(name, parent.trace_id, parent.span_id, attributes)
+        span.parent = parent
+        return span
+    ids = _parse_traceparent(parent) if isinstance(parent, str) else None
+    if ids is None:
+        return NOOP_SPAN
+    return Span(name, ids[0], ids[1], attributes)
+
+
+@contextmanager
+def span(name: str, parent=None, **attributes):
+    """Child span, current for the duration of the block; an exception marks it as failed."""
+    s = start_span(name, parent, **attributes)
+    if s is NOOP_SPAN:
+        yield s
+        return
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        if not _is_control_flow(e):
+            s.record_error(e)
+        raise
+    finally:
+        _current.reset(token)
+        s.end()
+
+
+def _is_control_flow(error: BaseException) -> bool:
+    # st.rerun() / st.stop() and generator shutdown are not failures
+    return type(error).__name__ in ("RerunException", "StopException", "GeneratorExit")
+
+
+def traced(name: str):
+    """Decorator: run the function in a child span of the current one (no-op outside a trace)."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def set_attributes(**attributes):
+    """On the current span, if any."""
+    s = _current.get()
+    if s is not None:
+        s.set(**attributes)
+
+
+def add_event(name: str, **attributes):
+    s = _current.get()
+    if s is not None:
+        s.add_event(name, **attributes)
+
+
+def record_error(error: BaseException):
+    """Mark the current span, if any, as failed (errors handled without re-raising)."""
+    s = _current.get()
+    if s is not None:
+        s.record_error(error)
+
+
+def wrap_context(fn):
+    """fn bound to the caller's context, so spans opened in a worker thread nest correctly."""
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+# ---------------------------
+# Interview sessions (Streamlit reruns)
+# ---------------------------
+
+def start_rerun(state, **attributes):
+    """
+    The span of one script run of the interview page, child of the session's
+    "interview" trace (started on the first run, kept in `state`, e.g.
+    st.session_state). A run left open by st.rerun() is closed first, at
+    its last recorded activity. Made current, so the run's calls nest under it.
+    """
+    if not TRACING_ENABLED:
+        return NOOP_SPAN
+    session = state.get("trace")
+    if session is None:
+        session = state["trace"] = {
+            "root": (Span("interview", secrets.token_hex(16))
+                     if random.random() < TRACE_SAMPLE_RATE else None),
+            "reruns": 0,
+            "open": None,
+        }
+    root = session["root"]
+    _close_open_rerun(session)
+    if root is None:
+        return NOOP_SPAN
+
+    session["reruns"] += 1
+    rerun = start_span("rerun", root, **{"rerun.number": session["reruns"], **attributes})
+    session["open"] = rerun
+    _current.set(rerun)
+    return rerun
+
+
+def _close_open_rerun(session: dict):
+    rerun = session.get("open")
+    if rerun is not None:
+        rerun.end(max(rerun.last_activity_ns, rerun.start_ns))
+        session["open"] = None
+    _current.set(None)
+
+
+def end_rerun(state):
+    """End the current run's span: at the end of the page and before st.stop()."""
+    session = state.get("trace")
+    if session and session.get("open") is not None:
+        session["open"].end()
+        session["open"] = None
+        _current.set(None)
+
+
+def end_interview(state, outcome: str = "completed", **attributes):
+    """End the session's trace; the next run of the page starts a new one."""
+    session = state.get("trace")
+    if not session:
+        return
+    root = session["root"]
+    if root is not None:
+        end_rerun(state)
+        _close_open_rerun(session)
+        root.set(**{"interview.outcome": outcome, "interview.reruns": session["reruns"],
+                    **attributes})
+        root.end()
+    state["trace"] = None
+
+
+def interview_span(state):
+    """The session's root span (NOOP_SPAN when not traced)."""
+    session = state.get("trace") or {}
+    return session.get("root") or NOOP_SPAN
+
+
+# ---------------------------
+# Export
+# ---------------------------
+
+def _export(span: Span):
+    record = span.to_dict()
+    _recent.append(record)
+    if not (TRACE_FILE or OTLP_ENDPOINT):
+        return
+    _queue.put(record)
+    _ensure_exporter()
+
+
+def _ensure_exporter():
+    global _exporter
+    if _exporter is not None:
+        return
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = threading.Thread(target=_export_loop, name="trace-exporter", daemon=True)
+            _exporter.start()
+
+
+def _drain(block: bool) -> list:
+    batch = []
+    try:
+        batch.append(_queue.get(timeout=EXPORT_INTERVAL) if block else _queue.get_nowait())
+        while len(batch) < EXPORT_BATCH:
+            batch.append(_queue.get_nowait())
+    except queue.Empty:
+        pass
+    return batch
+
+
+def _write_batch(batch: list):
+    dropped = 0
+    if TRACE_FILE:
+        try:
+            with open(TRACE_FILE, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(r, default=str) + "\n" for r in batch))
+        except OSError:
+            dropped = len(batch)
+    if OTLP_ENDPOINT:
+        try:
+            requests.post(OTLP_ENDPOINT, json=otlp_payload(batch), timeout=5).raise_for_status()
+        except requests.RequestException:
+            dropped = len(batch)
+    with _stats_lock:
+        _stats["exported"] += len(batch) - dropped
+        _stats["dropped"] += dropped
+
+
+def _export_loop():
+    while True:
+        batch = _drain(block=True)
+        if batch:
+            _write_batch(batch)
+
+
+def flush():
+    """Write out the queued spans now (CLIs, benchmarks)."""
+    while True:
+        batch = _drain(block=False)
+        if not batch:
+            return
+        _write_batch(batch)
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict) -> list:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items()]
+
+
+def otlp_payload(records: list) -> dict:
+    """Span records in the OTLP/HTTP JSON encoding (ExportTraceServiceRequest)."""
+    spans = []
+    for r in records:
+        spans.append({
+            "traceId": r["trace_id"],
+            "spanId": r["span_id"],
+            **({"parentSpanId": r["parent_id"]} if r["parent_id"] else {}),
+            "name": r["name"],
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(r["start_ns"]),
+            "endTimeUnixNano": str(r["end_ns"]),
+            "attributes": _otlp_attributes({**r["attributes"], "thread.name": r["thread"]}),
+            "events": [
+                {"timeUnixNano": str(e["time_ns"]), "name": e["name"],
+                 "attributes": _otlp_attributes(e["attributes"])}
+                for e in r["events"]
+            ],
+            "status": {"code": 2 if r["status"] == "error" else 1,
+                       "message": r["status_message"]},
+        })
+    return {"resourceSpans": [{
+        "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+        "scopeSpans": [{"scope": {"name": "app.observability.tracing"}, "spans": spans}],
+    }]}
+
+
+def tracing_stats() -> dict:
+    with _stats_lock:
+        return {**_stats, "queued": _queue.qsize(), "recent": len(_recent)}
+
+
+# ---------------------------
+# Reading traces back
+# ---------------------------
+
+def recent_spans() -> list:
+    """Finished spans of this process, oldest first."""
+    return list(_recent)
+
+
+def load_spans(path: str | None = None) -> list:
+    """Span records from a JSONL trace file (default TRACE_FILE), or this process's recent ones."""
+    path = path or TRACE_FILE
+    if not path or not os.path.exists(path):
+        return recent_spans()
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue  # a line cut by a crash mid-write
+    return records
+
+
+def list_traces(records: list) -> list:
+    """One summary per trace, most recent first."""
+    traces = {}
+    for r in records:
+        t = traces.setdefault(r["trace_id"], {
+            "trace_id": r["trace_id"], "root": None, "spans": 0, "errors": 0,
+            "start_ns": r["start_ns"], "end_ns": r["end_ns"],
+        })
+        t["spans"] += 1
+        t["errors"] += r["status"] == "error"
+        t["start_ns"] = min(t["start_ns"], r["start_ns"])
+        t["end_ns"] = max(t["end_ns"], r["end_ns"])
+        if r["parent_id"] is None:
+            t["root"] = r
+    summaries = []
+    for t in traces.values():
+        root = t.pop("root")
+        t["name"] = root["name"] if root else "(in progress)"
+        t["attributes"] = root["attributes"] if root else {}
+        t["duration_ms"] = round((t["end_ns"] - t["start_ns"]) / 1e6, 1)
+        summaries.append(t)
+    return sorted(summaries, key=lambda t: t["start_ns"], reverse=True)
+
+
+def waterfall(records: list, trace_id: str) -> list:
+    """
+    The spans of one trace in tree order, each with its depth and start
+    offset / duration in ms from the start of the trace. Spans whose parent
+    was not exported (a session still in progress) are shown at the top level.
+    """
+    spans = [r for r in records if r["trace_id"] == trace_id]
+    if not spans:
+        return []
+    ids = {r["span_id"] for r in spans}
+    children = {}
+    for r in spans:
+        parent = r["parent_id"] if r["parent_id"] in ids else None
+        children.setdefault(parent, []).append(r)
+    origin = min(r["start_ns"] for r in spans)
+
+    rows = []
+
+    def visit(parent, depth):
+        for r in sorted(children.get(parent, []), key=lambda r: r["start_ns"]):
+            rows.append({
+                "depth": depth,
+                "name": r["name"],
+                "offset_ms": round((r["start_ns"] - origin) / 1e6, 2),
+                "duration_ms": round((r["end_ns"] - r["start_ns"]) / 1e6, 2),
+                "status": r["status"],
+                "attributes": r["attributes"],
+                "span_id": r["span_id"],
+                "thread": r.get("thread"),
+            })
+            visit(r["span_id"], depth + 1)
+
+    visit(None, 0)
+    return rows
+
+
+def format_waterfall(rows: list, width: int = 60) -> str:
+    """Text rendering of waterfall() rows: one bar per span on a shared time axis."""
+    if not rows:
+        return ""
+    total = max(r["offset_ms"] + r["duration_ms"] for r in rows) or 1.0
+    label_width = min(max(2 * r["depth"] + len(r["name"]) for r in rows), 48)
+    lines = []
+    for r in rows:
+        label = ("  " * r["depth"] + r["name"])[:label_width].ljust(label_width)
+        start = int(width * r["offset_ms"] / total)
+        length = max(1, int(width * r["duration_ms"] / total))
+        bar = (" " * start + "█" * length)[:width].ljust(width)
+        flag = " !" if r["status"] == "error" else ""
+        lines.append(f"{label} |{bar}| {r['duration_ms']:>10.1f} ms{flag}")
+    return "\n".join(lines)
@@ -0,0 +1,153 @@
+# benchmarks/db_bench.py
+"""
+Concurrent SQLite throughput: the old connect-per-call access pattern vs the
+shared app/db layer (per-thread connections, WAL, busy_timeout, pragmas).
+
+    python -m benchmarks.db_bench --writers 8 --readers 8 --seconds 5
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from app.db import connection
+from app.db.evaluations import save_evaluation, get_evaluation
+from app.db.migrations import run_migrations
+
+CANDIDATE = {"name": "Bench Candidate", "email": "bench@example.com", "phone": "-"}
+ANSWERS = {"focus_%d" % i: "answer text " * 20 for i in range(5)}
+SCORES = {"Evidence density": 10, "Decision quality": 15}
+
+
+# --- baseline: the access pattern app/db used before the shared connection layer ---
+
+def _legacy_save(path):
+    conn = sqlite3.connect(path)
+    cur = conn.cursor()
+    cur.execute(
+        """
+        INSERT INTO evaluations (
+            role_id, candidate_name, candidate_email, candidate_phone,
+            answers_json, scores_json, summary
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (1, CANDIDATE["name"], CANDIDATE["email"], CANDIDATE["phone"],
+         json.dumps(ANSWERS), json.dumps(SCORES), "summary"),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _legacy_get(path, eval_id):
+    conn = sqlite3.connect(path)
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT id, role_id, candidate_name, candidate_email, candidate_phone,
+               answers_json, scores_json, summary, created_at
+        FROM evaluations
+        WHERE id = ?
+        """,
+        (eval_id,),
+    )
+    cur.fetchone()
+    conn.close()
+
+
+def _pooled_save(path):
+    save_evaluation(1, CANDIDATE, ANSWERS, SCORES, "summary")
+
+
+def _pooled_get(path, eval_id):
+    get_evaluation(eval_id)
+
+
+def _run(save, get, path, writers, readers, seconds, seed_rows):
+    stop = time.monotonic() + seconds
+    counts = {"writes": 0, "reads": 0, "locked": 0}
+    lock = threading.Lock()
+
+    def writer():
+        done = errors = 0
+        while time.monotonic() < stop:
+            try:
+                save(path)
+                done += 1
+            except sqlite3.OperationalError:
+                errors += 1
+        with lock:
+            counts["writes"] += done
+            counts["locked"] += errors
+
+    def reader(offset):
+        done = errors = 0
+        i = offset
+        while time.monotonic() < stop:
+            try:
+                get(path, i % seed_rows + 1)
+                done += 1
+            except sqlite3.OperationalError:
+                errors += 1
+            i += 7
+        with lock:
+            counts["reads"] += done
+            counts["locked"] += errors
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return {
+        "writes_per_sec": round(counts["writes"] / seconds, 1),
+        "reads_per_sec": round(counts["reads"] / seconds, 1),
+        "locked_errors": counts["locked"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--seed-rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, save, get in (
+            ("before", _legacy_save, _legacy_get),
+            ("after", _pooled_save, _pooled_get),
+        ):
+            path = os.path.join(tmp, f"{mode}.db")
+            connection.set_db_path(path)
+            run_migrations()
+            if mode == "before":
+                # back to the default rollback journal the old code ran with
+                connection.close_thread_connections()
+                conn = sqlite3.connect(path)
+                conn.execute("PRAGMA journal_mode=DELETE")
+                conn.close()
+            for _ in range(args.seed_rows):
+                save(path)
+            results[mode] = _run(
+                save, get, path, args.writers, args.readers, args.seconds, args.seed_rows
+            )
+            connection.close_thread_connections()
+
+    print(json.dumps({
+        "writers": args.writers,
+        "readers": args.readers,
+        "seconds": args.seconds,
+        **results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+# benchmarks/load_test.py
+"""
+Offline load test: N simulated candidates through plan -> questions -> judge -> save_evaluation.
+
+    python -m benchmarks.load_test --candidates 200 --concurrency 16 --rate-429 0.02 --malformed 0.05
+
+The LLM is the local mock server (benchmarks.mock_llm), started in-process
+unless --url points at one already running. Runs on a temporary database
+unless --db is given. Prints a JSON report: throughput, p50/p95/p99 per
+stage, DB contention and the client-side cache / coalescing / retry stats.
+
+With --incremental each answer is scored in the background as it is given
+(--think-time seconds apart), and the judge stage is the time-to-report
+after the last answer.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.db import connection
+from app.db.evaluations import criterion_averages, list_evaluations_page, save_evaluation
+from app.db.migrations import run_migrations
+from app.db.roles import add_role
+from app.jobs.answer_scoring import AnswerScorer
+from app.llm import cache, client, ratelimit, router as routing
+from app.llm.budget import prompt_stats
+from app.llm.judge import evaluate_answers_with_llama
+from app.llm.plan import generate_interview_plan
+from app.llm.questions import generate_questions_batch
+from app.llm.structured import structured_stats
+from benchmarks.mock_llm import MockLLMServer, add_mock_arguments, config_from_args
+
+STAGES = ("plan", "questions", "judge", "save")
+MOCK_MODEL = "mock-llm"
+
+SENTENCES = [
+    "I led the migration of our nightly batch jobs to a streaming pipeline.",
+    "We measured the error budget every week and cut incidents by half.",
+    "I chose the simpler design because the team had to own it after launch.",
+    "The first version failed in production, so I added canary releases.",
+    "I explained the trade-off to sales with a one-page cost comparison.",
+    "We interviewed ten customers before writing any code.",
+    "My usual approach is to ship a thin slice and instrument it.",
+    "I disagreed with the architecture review and wrote down why.",
+]
+
+
+def _percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    rank = max(int(-(-p * len(ordered) // 100)), 1)  # nearest rank
+    return ordered[rank - 1]
+
+
+def _summary(samples: list, errors: int = 0) -> dict:
+    if not samples:
+        return {"count": 0, "errors": errors}
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "mean_ms": round(1000 * sum(samples) / len(samples), 1),
+        "p50_ms": round(1000 * _percentile(samples, 50), 1),
+        "p95_ms": round(1000 * _percentile(samples, 95), 1),
+        "p99_ms": round(1000 * _percentile(samples, 99), 1),
+        "max_ms": round(1000 * max(samples), 1),
+    }
+
+
+def synthetic_role(i: int) -> dict:
+    return {
+        "company_name": f"Load Test Co {i}",
+        "title": ("Data Engineer", "Product Manager", "Backend Developer", "UX Designer")[i % 4],
+        "context": "Synthetic role created by benchmarks.load_test.",
+        "min_years_exp": 2 + i % 5,
+        "required_tech": ("Python, SQL", "", "Go, Postgres", "Figma")[i % 4],
+        "requires_degree": "No",
+        "must_haves": "Ownership, clear written communication",
+        "nice_to_have": "",
+        "red_flags": "",
+        "num_questions": 5,
+    }
+
+
+def synthetic_answers(plan: list, candidate_no: int, seed: int) -> dict:
+    rng = random.Random(f"{seed}:{candidate_no}")
+    return {
+        slot["focus"]: " ".join(rng.choice(SENTENCES) for _ in range(rng.randint(2, 6)))
+        for slot in plan
+    }
+
+
+class LoadTest:
+    def __init__(self, roles: list, num_questions: int, per_criterion, stream: bool, seed: int,
+                 incremental: bool = False, think_time: float = 0.0):
+        self.roles = roles
+        self.num_questions = num_questions
+        self.per_criterion = per_criterion
+        self.incremental = incremental
+        self.think_time = think_time
+        self.on_delta = (lambda delta: None) if stream else None
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.samples = {stage: [] for stage in STAGES}
+        self.errors = {stage: 0 for stage in STAGES}
+        self.error_messages = {}
+        self.db_locked = 0
+        self.completed = 0
+
+    def _timed(self, stage: str, fn, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            message = f"{stage}: {type(e).__name__}: {e}"[:200]
+            with self.lock:
+                self.errors[stage] += 1
+                self.error_messages[message] = self.error_messages.get(message, 0) + 1
+                if isinstance(e, sqlite3.OperationalError) and "locked" in str(e):
+                    self.db_locked += 1
+            raise
+        with self.lock:
+            self.samples[stage].append(time.perf_counter() - start)
+        return result
+
+    def _answer_incrementally(self, answers: dict) -> dict:
+        """Give the answers one by one, as the Interview page does in incremental mode."""
+        scorer = AnswerScorer()
+        for focus, answer in answers.items():
+            time.sleep(self.think_time)
+            scorer.submit(focus, answer)
+        return scorer.partial()
+
+    def candidate(self, n: int):
+        """One interview, the way the Role Setup + Interview pages drive it."""
+        role = self.roles[n % len(self.roles)]
+        try:
+            plan = self._timed("plan", generate_interview_plan, role, self.num_questions)
+            self._timed("questions", generate_questions_batch, plan, role, answers={},
+                        on_delta=self.on_delta)
+            answers = synthetic_answers(plan, n, self.seed)
+            partial = self._answer_incrementally(answers) if self.incremental else None
+            result = self._timed("judge", evaluate_answers_with_llama, answers,
+                                 on_delta=self.on_delta, per_criterion=self.per_criterion,
+                                 partial=partial)
+            candidate = {"name": f"Candidate {n}", "email": f"c{n}@example.com", "phone": "-"}
+            self._timed("save", save_evaluation, role["id"], candidate, answers,
+                        result["scores"], result["summary"])
+        except Exception:
+            return
+        with self.lock:
+            self.completed += 1
+
+
+def _readers(count: int, stop: threading.Event, out: dict):
+    """Score Report-style reads running alongside the writers."""
+    lock = threading.Lock()
+
+    def loop():
+        samples, locked = [], 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                list_evaluations_page(limit=50)
+                criterion_averages()
+            except sqlite3.OperationalError:
+                locked += 1
+                continue
+            samples.append(time.perf_counter() - start)
+        connection.close_thread_connections()
+        with lock:
+            out.setdefault("samples", []).extend(samples)
+            out["locked"] = out.get("locked", 0) + locked
+
+    threads = [threading.Thread(target=loop, name=f"reader-{i}") for i in range(count)]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def configure_client(url: str, rpm: float, use_cache: bool):
+    """Send every call type to `url` (the secrets-configured backends are replaced)."""
+    client.router = routing.Router([routing.Backend(MOCK_MODEL, MOCK_MODEL, url, "mock")], {})
+    # read when a backend's limiter is first created
+    ratelimit.DEFAULT_RPM = rpm
+    ratelimit.DEFAULT_TPM = 0
+    cache.CACHE_ENABLED = use_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8, help="simulated candidates at once")
+    parser.add_argument("--roles", type=int, default=4)
+    parser.add_argument("--questions", type=int, default=5, help="questions per interview")
+    parser.add_argument("--per-criterion", action=argparse.BooleanOptionalAction,
+                        default=None, help="judge mode (default: JUDGE_PER_CRITERION)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="score each answer in the background as it is given")
+    parser.add_argument("--think-time", type=float, default=0.0,
+                        help="seconds between answers (with --incremental)")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream questions and judge like the Interview page")
+    parser.add_argument("--readers", type=int, default=2,
+                        help="threads reading the Score Report queries during the run")
+    parser.add_argument("--rpm", type=float, default=0,
+                        help="client-side requests/min limit, 0 = unlimited")
+    parser.add_argument("--no-cache", action="store_true", help="disable the LLM response cache")
+    parser.add_argument("--url", help="use a mock server that is already running")
+    parser.add_argument("--db", help="database file (default: a temporary one)")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        url = args.url
+    else:
+        server = MockLLMServer(("127.0.0.1", 0), config_from_args(args))
+        server.start()
+        url = server.url
+    configure_client(url, args.rpm, not args.no_cache)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        connection.set_db_path(args.db or os.path.join(tmp, "load_test.db"))
+        run_migrations()
+        roles = []
+        for i in range(args.roles):
+            profile = synthetic_role(i)
+            profile["id"] = add_role(profile)
+            roles.append(profile)
+
+        test = LoadTest(roles, args.questions, args.per_criterion, args.stream, args.seed,
+                        args.incremental, args.think_time)
+        stop = threading.Event()
+        reads = {}
+        readers = _readers(args.readers, stop, reads)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency,
+                                thread_name_prefix="candidate") as pool:
+            list(pool.map(test.candidate, range(args.candidates)))
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        for t in readers:
+            t.join()
+        connection.close_thread_connections()
+
+    report = {
+        "candidates": args.candidates,
+        "completed": test.completed,
+        "concurrency": args.concurrency,
+        "elapsed_sec": round(elapsed, 2),
+        "candidates_per_min": round(60 * test.completed / elapsed, 1) if elapsed else 0.0,
+        "stages": {s: _summary(test.samples[s], test.errors[s]) for s in STAGES},
+        "errors": test.error_messages,
+        "db": {
+            "save": _summary(test.samples["save"], test.errors["save"]),
+            "writes_locked": test.db_locked,
+            "reads": _summary(reads.get("samples", []), reads.get("locked", 0)),
+            "reads_per_sec": round(len(reads.get("samples", [])) / elapsed, 1) if elapsed else 0.0,
+        },
+        "llm": {
+            "cache": cache.cache_stats(),
+            "coalescing": client.coalescing_stats(),
+            "router": client.router_stats(),
+            "structured": structured_stats(),
+            "prompts": prompt_stats(),
+        },
+    }
+    if server is not None:
+        report["mock"] = server.stats()
+        server.shutdown()
+        server.server_close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
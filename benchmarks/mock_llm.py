@@ -0,0 +1,401 @@
+# benchmarks/mock_llm.py
+"""
+Deterministic local stand-in for an OpenAI-compatible chat-completions API.
+
+    python -m benchmarks.mock_llm --port 8799 --latency lognormal:0.8,0.5 --rate-429 0.05
+
+Point the app at it with LLM_API_URL = "http://127.0.0.1:8799/v1/chat/completions"
+(and LLM_RPM = 0). It answers the plan, question, variant and judge prompts
+with valid content derived from the request, streams when "stream" is set,
+and can inject latency, 429s and malformed output. GET /stats returns counters.
+Answers and injected faults depend only on the seed and the request body
+(plus how many times that body was sent), not on thread timing.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CRITERIA = [
+    "Evidence density",
+    "Decision quality",
+    "Failure intelligence",
+    "Context translation",
+    "Uniqueness signal",
+]
+SCORES = (0, 5, 10, 15, 20)
+MALFORMED_KINDS = ("fenced", "prose", "truncated")
+STREAM_CHUNK_CHARS = 16  # characters per SSE delta
+
+
+def parse_latency(spec: str):
+    """
+    "fixed:S", "uniform:A,B", "normal:MU,SIGMA" or "lognormal:MEDIAN,SIGMA"
+    (seconds) -> function(rng) returning a delay.
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(*values)
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(rng.gauss(*values), 0.0)
+    if kind == "lognormal" and len(values) == 2:
+        median, sigma = values
+        return lambda rng: median * rng.lognormvariate(0.0, sigma)
+    raise ValueError(f"Bad latency spec: {spec!r}")
+
+
+def _digest(*parts) -> int:
+    raw = "\x1f".join(str(p) for p in parts).encode("utf-8")
+    return int.from_bytes(hashlib.sha256(raw).digest()[:8], "big")
+
+
+def _json_after(text: str, marker: str):
+    """The JSON document on the line(s) after `marker` (prompts embed compact JSON)."""
+    start = text.find(marker)
+    if start == -1:
+        return None
+    body = text[start + len(marker):].lstrip()
+    try:
+        value, _ = json.JSONDecoder().raw_decode(body)
+    except json.JSONDecodeError:
+        return None
+    return value
+
+
+def call_type(messages: list) -> str:
+    """Which app prompt this is, from markers in its text."""
+    last = messages[-1].get("content") or ""
+    if last.startswith("Your JSON had these problems"):
+        return "reask"
+    text = "\n".join(m.get("content") or "" for m in messages)
+    if "You create interview plans" in text:
+        return "plan"
+    if "DIFFERENT concrete" in text:
+        return "variants"
+    if "INTERVIEW PLAN" in text:
+        return "questions"
+    if "evaluate the candidate on 5 criteria" in text:
+        return "judge"
+    if "evaluating ONE answer" in text:
+        return "judge_answer"
+    if '"score": 0' in text:
+        return "judge_criterion"
+    if '{"summary"' in text:
+        return "judge_summary"
+    if "CURRENT CRITERION TO EXPLORE" in text:
+        return "next_question"
+    return "other"
+
+
+def _answers_text(text: str) -> str:
+    match = re.search(r"Candidate answers? \(JSON[^)]*\):\s*(.*)", text, re.DOTALL)
+    return match.group(1)[:2000] if match else text[-2000:]
+
+
+def respond(messages: list) -> tuple:
+    """(call type, completion text) for a chat request, deterministic in the messages."""
+    kind = call_type(messages)
+    if kind == "reask":
+        # Answer the original request again in full; the app merges what it needs
+        kind, content = respond(messages[:-2])
+        return "reask", content
+
+    text = "\n".join(m.get("content") or "" for m in messages)
+    if kind == "plan":
+        match = re.search(r"EXACTLY (\d+) objects", text)
+        n = int(match.group(1)) if match else 5
+        types = ("open", "open", "mcq", "scale")
+        plan = [
+            {"id": i, "type": types[_digest(text, i) % len(types)], "focus": f"focus_{i}"}
+            for i in range(1, n + 1)
+        ]
+        return kind, json.dumps(plan)
+
+    if kind in ("questions", "variants"):
+        plan = _json_after(text, "INTERVIEW PLAN (JSON, without question text yet):") or []
+        if kind == "questions":
+            return kind, json.dumps([
+                {**slot, "question": f"Tell me about a time you worked on {slot.get('focus')}: "
+                                     f"what did you decide, and why?"}
+                for slot in plan if isinstance(slot, dict)
+            ])
+        match = re.search(r"write (\d+) DIFFERENT", text)
+        n = int(match.group(1)) if match else 3
+        return kind, json.dumps([
+            {"id": slot.get("id"), "questions": [
+                f"Variant {k + 1}: walk me through {slot.get('focus')} in a recent project."
+                for k in range(n)
+            ]}
+            for slot in plan if isinstance(slot, dict)
+        ])
+
+    answers = _answers_text(text)
+    if kind == "judge":
+        return kind, json.dumps({
+            "scores": {c: SCORES[_digest(answers, c) % len(SCORES)] for c in CRITERIA},
+            "reasons": {c: f"Mock justification for {c.lower()}." for c in CRITERIA},
+            "summary": "Works from evidence. Explains trade-offs plainly. Learns from failures.",
+        })
+    if kind == "judge_answer":
+        block = text.split("ONLY on these criteria:", 1)[-1]
+        criteria = [c for c in CRITERIA if f"- {c}:" in block] or CRITERIA
+        return kind, json.dumps({
+            "scores": {c: SCORES[_digest(answers, c) % len(SCORES)] for c in criteria},
+            "reasons": {c: f"Mock justification for {c.lower()}." for c in criteria},
+            "summary": "Works from evidence. Explains trade-offs plainly. Learns from failures.",
+        })
+    if kind == "judge_criterion":
+        match = re.search(r"ONE criterion only:\s*([^:\n]+):", text)
+        criterion = match.group(1).strip() if match else ""
+        return kind, json.dumps({
+            "score": SCORES[_digest(answers, criterion) % len(SCORES)],
+            "reason": f"Mock justification for {criterion.lower() or 'this criterion'}.",
+        })
+    if kind == "judge_summary":
+        return kind, json.dumps({
+            "summary": "Works from evidence. Explains trade-offs plainly. Learns from failures.",
+        })
+    if kind == "next_question":
+        return kind, "What was the hardest trade-off in your last project, and how did you decide?"
+    return kind, "OK"
+
+
+def malform(content: str, rng: random.Random) -> tuple:
+    """(kind, corrupted content) the way real models break JSON."""
+    kind = rng.choice(MALFORMED_KINDS)
+    if kind == "fenced":
+        return kind, f"```json\n{content}\n```"
+    if kind == "prose":
+        return kind, f"Sure! Here is the JSON you asked for:\n{content}\nLet me know if you need more."
+    cut = max(1, int(len(content) * rng.uniform(0.5, 0.95)))
+    return kind, content[:cut]
+
+
+class MockConfig:
+    def __init__(self, latency="lognormal:0.5,0.4", latency_for=None, ttft_share=0.3,
+                 rate_429=0.0, retry_after=1.0, malformed=0.0, broken_body=0.0, seed=0):
+        self.latency = parse_latency(latency)
+        self.latency_for = {k: parse_latency(v) for k, v in (latency_for or {}).items()}
+        self.ttft_share = ttft_share  # share of the latency before the first streamed delta
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.malformed = malformed  # content is valid JSON corrupted (fenced, prose, truncated)
+        self.broken_body = broken_body  # the HTTP body / SSE chunk itself is not JSON
+        self.seed = seed
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: MockConfig):
+        super().__init__(address, _Handler)
+        self.config = config
+        self.lock = threading.Lock()
+        self.attempts = {}  # body digest -> times seen, so retries draw new faults
+        self.counters = {
+            "requests": 0,
+            "streamed": 0,
+            "injected_429": 0,
+            "malformed": 0,
+            "broken_body": 0,
+            "by_call_type": {},
+        }
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def request_rng(self, body: bytes) -> random.Random:
+        digest = hashlib.sha256(body).hexdigest()
+        with self.lock:
+            attempt = self.attempts.get(digest, 0)
+            self.attempts[digest] = attempt + 1
+        return random.Random(f"{self.config.seed}:{digest}:{attempt}")
+
+    def count(self, key: str, call_type: str | None = None):
+        with self.lock:
+            self.counters[key] += 1
+            if call_type is not None:
+                by_type = self.counters["by_call_type"]
+                by_type[call_type] = by_type.get(call_type, 0) + 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            return json.loads(json.dumps(self.counters))
+
+    def start(self) -> threading.Thread:
+        """Serve from a daemon thread (in-process use, e.g. benchmarks.load_test)."""
+        thread = threading.Thread(target=self.serve_forever, name="mock-llm", daemon=True)
+        thread.start()
+        return thread
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real providers
+    disable_nagle_algorithm = True  # headers and body are separate writes: avoid the ~40ms ACK stall
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            self._send(200, json.dumps(self.server.stats()).encode("utf-8"))
+        else:
+            self._send(404, b'{"error": "not found"}')
+
+    def do_POST(self):
+        server = self.server
+        config = server.config
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        try:
+            request = json.loads(body)
+            messages = request["messages"]
+        except (json.JSONDecodeError, KeyError, TypeError):
+            self._send(400, b'{"error": {"message": "invalid request"}}')
+            return
+
+        rng = server.request_rng(body)
+        kind, content = respond(messages)
+        server.count("requests", kind)
+
+        if rng.random() < config.rate_429:
+            server.count("injected_429")
+            self._send(429, b'{"error": {"message": "rate limited (mock)"}}',
+                       headers={"Retry-After": f"{config.retry_after:g}"})
+            return
+        if rng.random() < config.malformed:
+            server.count("malformed")
+            _, content = malform(content, rng)
+        broken = rng.random() < config.broken_body
+        if broken:
+            server.count("broken_body")
+
+        latency = config.latency_for.get(kind, config.latency)(rng)
+        model = request.get("model", "mock")
+        usage = {
+            "prompt_tokens": sum(len(m.get("content") or "") for m in messages) // 4,
+            "completion_tokens": len(content) // 4,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        if request.get("stream"):
+            server.count("streamed")
+            self._stream(model, content, usage, latency, broken)
+            return
+
+        time.sleep(latency)
+        if broken:
+            self._send(200, b'{"choices": [{"message": {"content": "')
+            return
+        self._send(200, json.dumps({
+            "id": f"mock-{_digest(body)}",
+            "object": "chat.completion",
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        }).encode("utf-8"))
+
+    def _stream(self, model: str, content: str, usage: dict, latency: float, broken: bool):
+        chunks = [content[i:i + STREAM_CHUNK_CHARS]
+                  for i in range(0, len(content), STREAM_CHUNK_CHARS)] or [""]
+        first = latency * self.server.config.ttft_share
+        gap = (latency - first) / len(chunks)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")  # SSE body ends when the socket closes
+        self.end_headers()
+        self.close_connection = True
+
+        def event(payload):
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        self.wfile.write(b": MOCK PROCESSING\n\n")
+        time.sleep(first)
+        for i, chunk in enumerate(chunks):
+            if broken and i == len(chunks) // 2:
+                self.wfile.write(b'data: {"choices": [{"delta": \n\n')
+                self.wfile.flush()
+                return
+            event({"model": model, "choices": [{"index": 0, "delta": {"content": chunk}}]})
+            time.sleep(gap)
+        event({"model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+               "usage": usage})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    """The fault / latency flags, shared with benchmarks.load_test."""
+    parser.add_argument("--latency", default="lognormal:0.5,0.4",
+                        help="fixed:S | uniform:A,B | normal:MU,SIGMA | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--latency-for", action="append", default=[], metavar="TYPE=SPEC",
+                        help="per call type (plan, questions, judge, judge_criterion, ...)")
+    parser.add_argument("--ttft-share", type=float, default=0.3,
+                        help="share of the latency before the first streamed delta")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="probability of a 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After of 429s")
+    parser.add_argument("--malformed", type=float, default=0.0,
+                        help="probability of fenced / prose-wrapped / truncated JSON content")
+    parser.add_argument("--broken-body", type=float, default=0.0,
+                        help="probability of an unparsable response body or SSE chunk")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def config_from_args(args) -> MockConfig:
+    latency_for = dict(item.split("=", 1) for item in args.latency_for)
+    return MockConfig(
+        latency=args.latency,
+        latency_for=latency_for,
+        ttft_share=args.ttft_share,
+        rate_429=args.rate_429,
+        retry_after=args.retry_after,
+        malformed=args.malformed,
+        broken_body=args.broken_body,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8799)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockLLMServer((args.host, args.port), config_from_args(args))
+    print(json.dumps({"url": server.url}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+# benchmarks/suite.py
+"""
+Benchmark suite for the interview pipeline, with a JSON history and regression check.
+
+    python -m benchmarks.suite run --label "before cache change"
+    python -m benchmarks.suite compare            # last run vs the one before
+    python -m benchmarks.suite compare 3 -1 --threshold 0.05
+    python -m benchmarks.suite list
+
+LLM paths (plan, questions, judge) run against the in-process mock server
+with a fixed latency, so results only move when the code does. app/db paths
+run on temporary databases seeded with 1k / 100k / 1M evaluations.
+compare exits with status 1 when a benchmark's median got slower than the
+threshold, so it can gate CI.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from app.db import connection
+from app.db.evaluations import (
+    INSERT_EVALUATION_SQL,
+    SCORE_CRITERIA,
+    criterion_averages,
+    evaluation_params,
+    get_evaluation,
+    list_evaluations_page,
+    save_evaluation,
+    top_evaluations_for_role,
+    total_score_percentiles,
+)
+from app.db.migrations import run_migrations
+from app.db.plans import get_plan_for_role, save_plan_for_role
+from app.db.roles import add_role, get_role, update_role
+from app.llm import cache
+from app.llm.judge import evaluate_answers_with_llama
+from app.llm.plan import generate_interview_plan
+from app.llm.questions import generate_questions_batch
+from benchmarks.load_test import configure_client, synthetic_answers, synthetic_role
+from benchmarks.mock_llm import MockConfig, MockLLMServer
+
+# Machine-specific timings: git-ignored, never committed
+DEFAULT_HISTORY = os.path.join(os.path.dirname(__file__), "history.json")
+DEFAULT_SIZES = "1000,100000,1000000"
+SEED_CHUNK = 10000  # rows per executemany when seeding
+SEED_ROLES = 20
+WARMUP = 2
+
+
+def _size_label(n: int) -> str:
+    if n >= 1_000_000 and n % 1_000_000 == 0:
+        return f"{n // 1_000_000}M"
+    if n >= 1000 and n % 1000 == 0:
+        return f"{n // 1000}k"
+    return str(n)
+
+
+def measure(fn, repeat: int, warmup: int = WARMUP) -> dict:
+    """Run fn warmup + repeat times; timing stats of the measured runs, in ms."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    ordered = sorted(samples)
+    return {
+        "runs": repeat,
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(ordered[max(int(-(-95 * repeat // 100)), 1) - 1], 3),
+        "min_ms": round(ordered[0], 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+    }
+
+
+# ---------------------------
+# Benchmarks
+# ---------------------------
+
+def bench_llm(repeat: int, latency: float, tmp: str) -> dict:
+    """Plan (cached / LLM / response-cache hit), question batch and judge, on the mock."""
+    server = MockLLMServer(("127.0.0.1", 0), MockConfig(latency=f"fixed:{latency}"))
+    server.start()
+    configure_client(server.url, rpm=0, use_cache=False)
+    connection.set_db_path(os.path.join(tmp, "llm.db"))
+    run_migrations()
+
+    role = synthetic_role(0)
+    role["id"] = add_role(role)
+    plan = generate_interview_plan(role, 5, use_llm=True)
+    answers = synthetic_answers(plan, 0, seed=0)
+    results = {}
+    try:
+        results["plan.cached"] = measure(
+            lambda: generate_interview_plan(role, 5, use_llm=False), repeat
+        )
+        results["plan.llm"] = measure(
+            lambda: generate_interview_plan(role, 5, use_llm=True), repeat
+        )
+        cache.CACHE_ENABLED = True
+        results["plan.llm_cache_hit"] = measure(
+            lambda: generate_interview_plan(role, 5, use_llm=True), repeat
+        )
+        cache.CACHE_ENABLED = False
+        results["questions.batch"] = measure(
+            lambda: generate_questions_batch(plan, role, answers={}), repeat
+        )
+        results["questions.batch_stream"] = measure(
+            lambda: generate_questions_batch(plan, role, answers={}, on_delta=lambda d: None),
+            repeat,
+        )
+        results["judge.single"] = measure(
+            lambda: evaluate_answers_with_llama(answers, per_criterion=False), repeat
+        )
+        results["judge.per_criterion"] = measure(
+            lambda: evaluate_answers_with_llama(answers, per_criterion=True), repeat
+        )
+    finally:
+        server.shutdown()
+        server.server_close()
+        connection.close_thread_connections()
+    return results
+
+
+def seed_evaluations(rows: int, seed: int = 0) -> list:
+    """Insert `rows` evaluations over SEED_ROLES roles, created over the last rows minutes."""
+    rng = random.Random(seed)
+    role_ids = [add_role(synthetic_role(i)) for i in range(SEED_ROLES)]
+    conn = connection.get_conn()
+    answers = {f"focus_{i}": "Seeded answer text for benchmarks." for i in range(5)}
+    inserted = 0
+    while inserted < rows:
+        chunk = []
+        for n in range(inserted, min(inserted + SEED_CHUNK, rows)):
+            scores = {c: rng.choice((0, 5, 10, 15, 20)) for c in SCORE_CRITERIA}
+            candidate = {"name": f"Seed {n}", "email": f"seed{n}@example.com", "phone": "-"}
+            chunk.append(evaluation_params(
+                role_ids[n % SEED_ROLES], candidate, answers, scores, "Seeded summary."
+            ))
+        with conn:
+            conn.executemany(INSERT_EVALUATION_SQL, chunk)
+        inserted += len(chunk)
+    with conn:
+        conn.execute(
+            "UPDATE evaluations SET created_at = datetime('now', ?, printf('+%d minutes', id))",
+            (f"-{rows} minutes",),
+        )
+    conn.execute("ANALYZE")
+    return role_ids
+
+
+def bench_db(rows: int, repeat: int, tmp: str) -> tuple:
+    """(results, seed seconds) of the app/db functions on a database of `rows` evaluations."""
+    label = _size_label(rows)
+    connection.set_db_path(os.path.join(tmp, f"db_{label}.db"))
+    run_migrations()
+    started = time.perf_counter()
+    role_ids = seed_evaluations(rows)
+    seed_sec = time.perf_counter() - started
+
+    rng = random.Random(1)
+    role_id = role_ids[0]
+    role = get_role(role_id)
+    candidate = {"name": "Bench", "email": "bench@example.com", "phone": "-"}
+    answers = {f"focus_{i}": "answer text " * 20 for i in range(5)}
+    scores = {c: 10 for c in SCORE_CRITERIA}
+    plan = [{"id": i, "type": "open", "focus": f"focus_{i}"} for i in range(1, 6)]
+    save_plan_for_role(role_id, plan)
+    # keyset cursor halfway down the list
+    mid_cursor = tuple(connection.get_conn().execute(
+        "SELECT created_at, id FROM evaluations ORDER BY created_at DESC, id DESC "
+        "LIMIT 1 OFFSET ?", (rows // 2,)
+    ).fetchone())
+
+    ops = {
+        "save_evaluation": lambda: save_evaluation(role_id, candidate, answers, scores, "s"),
+        "get_evaluation": lambda: get_evaluation(rng.randint(1, rows)),
+        "list_page": lambda: list_evaluations_page(limit=50),
+        "list_page_role": lambda: list_evaluations_page(limit=50, role_id=role_id),
+        "list_page_deep": lambda: list_evaluations_page(limit=50, cursor=mid_cursor),
+        "top_for_role": lambda: top_evaluations_for_role(role_id, 10),
+        "criterion_averages_role": lambda: criterion_averages(role_id),
+        "criterion_averages_all": lambda: criterion_averages(),
+        "percentiles_role": lambda: total_score_percentiles(role_id),
+        "get_role": lambda: get_role(role_id),
+        "update_role": lambda: update_role(role_id, role),
+        "save_plan": lambda: save_plan_for_role(role_id, plan),
+        "get_plan": lambda: get_plan_for_role(role_id),
+    }
+    results = {f"db.{name}@{label}": measure(fn, repeat) for name, fn in ops.items()}
+    connection.close_thread_connections()
+    return results, seed_sec
+
+
+# ---------------------------
+# History
+# ---------------------------
+
+def load_history(path: str) -> dict:
+    if not os.path.exists(path):
+        return {"runs": []}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_history(path: str, history: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(history, f, indent=2)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def find_run(runs: list, ref: str) -> dict:
+    """A run by 1-based number, negative index (-1 = latest) or label."""
+    try:
+        n = int(ref)
+    except ValueError:
+        matches = [r for r in runs if r.get("label") == ref]
+        if not matches:
+            raise SystemExit(f"No run labelled {ref!r}")
+        return matches[-1]
+    index = n - 1 if n > 0 else n
+    try:
+        return runs[index]
+    except IndexError:
+        raise SystemExit(f"No run {ref} (history has {len(runs)})")
+
+
+def compare_runs(base: dict, new: dict, threshold: float, min_delta_ms: float) -> list:
+    """Rows of (name, base median, new median, change, status), status REGRESSION when slower."""
+    rows = []
+    names = sorted(set(base["results"]) | set(new["results"]))
+    for name in names:
+        b = base["results"].get(name, {}).get("median_ms")
+        n = new["results"].get(name, {}).get("median_ms")
+        if b is None or n is None:
+            rows.append((name, b, n, None, "new" if b is None else "removed"))
+            continue
+        change = (n - b) / b if b else 0.0
+        if change > threshold and n - b > min_delta_ms:
+            status = "REGRESSION"
+        elif change < -threshold and b - n > min_delta_ms:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append((name, b, n, change, status))
+    return rows
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+
+def cmd_run(args):
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()] if args.sizes else []
+    run = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "label": args.label,
+        "commit": _git_commit(),
+        "env": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "config": {
+            "repeat": args.repeat,
+            "llm_latency_ms": args.llm_latency * 1000,
+            "sizes": sizes,
+        },
+        "seed_sec": {},
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        if not args.skip_llm:
+            print("llm ...", file=sys.stderr)
+            run["results"].update(bench_llm(args.repeat, args.llm_latency, tmp))
+        for rows in sizes:
+            print(f"db @ {_size_label(rows)} rows ...", file=sys.stderr)
+            results, seed_sec = bench_db(rows, args.repeat, tmp)
+            run["results"].update(results)
+            run["seed_sec"][_size_label(rows)] = round(seed_sec, 1)
+
+    history = load_history(args.history)
+    history["runs"].append(run)
+    save_history(args.history, history)
+    print(json.dumps({"run": len(history["runs"]), "history": args.history,
+                      "results": run["results"]}, indent=2))
+
+
+def cmd_compare(args):
+    runs = load_history(args.history)["runs"]
+    if len(runs) < 2 and (args.base is None or args.new is None):
+        raise SystemExit("Need at least two runs in the history to compare.")
+    base = find_run(runs, args.base if args.base is not None else "-2")
+    new = find_run(runs, args.new if args.new is not None else "-1")
+    if base["config"].get("llm_latency_ms") != new["config"].get("llm_latency_ms"):
+        print("warning: the runs used different mock LLM latencies", file=sys.stderr)
+
+    rows = compare_runs(base, new, args.threshold, args.min_delta_ms)
+    print(f"base: {base['created_at']} {base.get('label') or ''} ({base.get('commit')})")
+    print(f"new:  {new['created_at']} {new.get('label') or ''} ({new.get('commit')})")
+    width = max((len(r[0]) for r in rows), default=10)
+    print(f"{'benchmark':<{width}}  {'base ms':>10}  {'new ms':>10}  {'change':>8}  status")
+    for name, b, n, change, status in rows:
+        fmt = lambda v: "-" if v is None else f"{v:.3f}"
+        pct = "-" if change is None else f"{change:+.1%}"
+        print(f"{name:<{width}}  {fmt(b):>10}  {fmt(n):>10}  {pct:>8}  {status}")
+
+    regressions = [r for r in rows if r[4] == "REGRESSION"]
+    print(f"\n{len(regressions)} regression(s), threshold {args.threshold:.0%} "
+          f"and {args.min_delta_ms} ms")
+    if regressions:
+        sys.exit(1)
+
+
+def cmd_list(args):
+    for i, run in enumerate(load_history(args.history)["runs"], start=1):
+        print(f"{i:>3}  {run['created_at']}  {run.get('commit') or '-':<10}  "
+              f"{len(run['results']):>3} results  {run.get('label') or ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON history file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="run the suite and append it to the history")
+    run.add_argument("--label", help="free text, e.g. the change being measured")
+    run.add_argument("--repeat", type=int, default=20, help="measured runs per benchmark")
+    run.add_argument("--llm-latency", type=float, default=0.05,
+                     help="fixed mock LLM latency in seconds")
+    run.add_argument("--sizes", default=DEFAULT_SIZES,
+                     help="evaluation rows for the app/db benchmarks ('' to skip)")
+    run.add_argument("--skip-llm", action="store_true")
+    run.set_defaults(func=cmd_run)
+
+    compare = sub.add_parser("compare", help="compare two runs (default: the last two)")
+    compare.add_argument("base", nargs="?", help="run number, negative index or label")
+    compare.add_argument("new", nargs="?", help="run number, negative index or label")
+    compare.add_argument("--threshold", type=float, default=0.10,
+                         help="relative slowdown of the median flagged as a regression")
+    compare.add_argument("--min-delta-ms", type=float, default=0.1,
+                         help="ignore changes smaller than this (timer noise)")
+    compare.set_defaults(func=cmd_compare)
+
+    lst = sub.add_parser("list", help="list the runs in the history")
+    lst.set_defaults(func=cmd_list)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
 # pages/0_Role_setup.py
 import streamlit as st
-from app.db.roles import init_db, add_role, list_roles, get_role, delete_role, update_role
+from app.db.migrations import ensure_schema
+from app.observability.metrics import start_metrics_server
+from app.db.roles import add_role, list_roles, get_role, delete_role, update_role
 from app.llm.plan import generate_interview_plan
 from app.db.plans import save_plan_for_role
+from app.jobs.prefetch import prefetch_question_set
 
 
 @st.dialog("Confirm delete")
@@ -23,7 +26,9 @@ def confirm_delete_dialog(role_id: int):
 
 st.title("JobFitIndex – Role setup")
 
-init_db()
+ensure_schema()
+# /metrics for Prometheus, once per process (JOBFIT_METRICS_PORT)
+start_metrics_server()
 
 if "role_profile" not in st.session_state:
     st.session_state["role_profile"] = {}
@@ -198,11 +203,13 @@ with col_right:
 
                 try:
                     plan = generate_interview_plan(new_profile, num_questions, use_llm=True)
-                    st.write("DEBUG plan generated:", plan)
                     save_plan_for_role(current_id, plan)
                 except RuntimeError as e:
                     st.warning(f"Role updated, but plan generation failed: {e}")
 
+                # Questions are generated in the background and served from the DB at interview start
+                prefetch_question_set(current_id)
+
                 st.session_state["role_profile"] = new_profile
                 st.session_state["current_role_id"] = current_id
                 st.success("Role profile updated.")
@@ -212,11 +219,12 @@ with col_right:
 
                 try:
                     plan = generate_interview_plan(new_profile, num_questions, use_llm=True)
-                    st.write("DEBUG plan generated:", plan)
                     save_plan_for_role(role_id, plan)
                 except RuntimeError as e:
                     st.warning(f"Role saved, but plan generation failed: {e}")
 
+                prefetch_question_set(role_id)
+
                 st.session_state["role_profile"] = new_profile
                 st.session_state["current_role_id"] = role_id
                 st.success("Role profile saved. You can now run the interview.")
@@ -1,14 +1,29 @@
 # pages/1_Interview.py
+import json
+import re
 import streamlit as st
-from app.llm.questions import generate_next_question, generate_questions_batch
-from app.llm.plan import generate_interview_plan
-from app.llm.judge import evaluate_answers_with_llama
+from app.llm.questions import generate_questions_batch
+from app.llm.judge import CRITERIA, JUDGE_INCREMENTAL, evaluate_answers_with_llama
 from app.db.roles import list_roles, get_role
-from app.db.plans import init_plans_db
-from app.db.evaluations import init_evaluations_db, save_evaluation
+from app.db.migrations import ensure_schema
+from app.observability.metrics import start_metrics_server
+from app.observability import tracing
+from app.db.evaluations import save_evaluation
+from app.jobs.evaluations import EVAL_IN_BACKGROUND, submit_evaluation
+from app.jobs.answer_scoring import AnswerScorer
+from app.jobs.prefetch import (
+    interview_base_plan,
+    draw_question_set,
+    load_question_set,
+    store_question_set,
+)
 
-init_plans_db()
-init_evaluations_db()
+ensure_schema()
+# /metrics for Prometheus, once per process (JOBFIT_METRICS_PORT)
+start_metrics_server()
+# One trace per interview session, one span per run of this page; ended at
+# the bottom of the page and before every st.stop()
+tracing.start_rerun(st.session_state, **{"interview.step": st.session_state.get("step", 0)})
 
 
 @st.dialog("Interview completed")
@@ -18,7 +33,7 @@ def interview_done_dialog():
         for key in [
             "role_profile", "candidate", "plan", "messages", "step", "answers",
             "current_question", "current_options", "current_q_type", "current_focus",
-            "evaluation", "evaluation_error"
+            "evaluation", "evaluation_error", "evaluation_job_id", "answer_scorer"
         ]:
             if key in st.session_state:
                 del st.session_state[key]
@@ -41,6 +56,7 @@ if not st.session_state["role_profile"]:
     roles = list_roles()
     if not roles:
         st.info("No roles available. Go to Role setup to create one.")
+        tracing.end_rerun(st.session_state)
         st.stop()
 
     for rid, company, title in roles:
@@ -48,8 +64,13 @@ if not st.session_state["role_profile"]:
             role = get_role(rid)
             if role:
                 st.session_state["role_profile"] = role
+                tracing.interview_span(st.session_state).set(**{
+                    "role.id": rid, "role.company": company, "role.title": title,
+                    "interview.questions": role.get("num_questions"),
+                })
                 st.rerun()
 
+    tracing.end_rerun(st.session_state)
     st.stop()
 
 # ---------------------------
@@ -71,9 +92,11 @@ with h_col:
     st.title(f"{company} – {title}")
 with b_col:
     if st.button("← Back", key="back_to_role_list", use_container_width=True):
+        tracing.end_interview(st.session_state, "abandoned")
         for key in [
             "role_profile", "candidate", "plan", "messages", "step", "answers",
-            "current_question", "current_options", "current_q_type", "current_focus"
+            "current_question", "current_options", "current_q_type", "current_focus",
+            "answer_scorer"
         ]:
             if key in st.session_state:
                 del st.session_state[key]
@@ -99,6 +122,7 @@ if not candidate:
     )
 
     if st.button("Start interview", key="start_interview"):
+        tracing.interview_span(st.session_state).add_event("candidate_info_submitted")
         st.session_state["candidate"] = {
             "name": name,
             "email": email,
@@ -110,6 +134,7 @@ if not candidate:
 
 candidate = st.session_state["candidate"]
 if not candidate:
+    tracing.end_rerun(st.session_state)
     st.stop()
 
 # ---------------------------
@@ -141,6 +166,17 @@ def add_ai_message(content: str):
 def add_user_message(content: str):
     st.session_state["messages"].append({"role": "user", "content": content})
 
+def streamed_strings(buffer: str, key: str) -> list:
+    """String values of `key` found so far in a partial (still streaming) JSON buffer."""
+    values = []
+    for raw in re.findall(r'"%s"\s*:\s*"((?:[^"\\]|\\.)*)' % re.escape(key), buffer):
+        try:
+            # drop a dangling escape cut in half by the stream
+            values.append(json.loads('"' + raw.rstrip("\\") + '"'))
+        except json.JSONDecodeError:
+            values.append(raw)
+    return values
+
 # ---------------------------
 # Start interview
 # ---------------------------
@@ -149,18 +185,39 @@ num_questions = role_profile.get("num_questions", 5)
 
 if "plan" not in st.session_state:
     # Plan leggero: id/type/focus
-    base_plan = generate_interview_plan(role_profile, num_questions, use_llm=False)
-    # Una sola chiamata LLM per generare tutte le domande
-    questions_plan = generate_questions_batch(base_plan, role_profile, answers={})
+    base_plan = interview_base_plan(role_profile)
+    # Varianti dal pool del ruolo, altrimenti il set precalcolato: nessuna chiamata LLM
+    questions_plan = draw_question_set(role_profile, base_plan)
+    if questions_plan is None:
+        questions_plan = load_question_set(role_profile, base_plan)
+
+    if questions_plan is None:
+        # Una sola chiamata LLM per generare tutte le domande (in streaming)
+        preview = st.empty()
+        streamed = []
+
+        def show_questions_progress(delta: str):
+            streamed.append(delta)
+            questions = streamed_strings("".join(streamed), "question")
+            if questions:
+                with preview.container():
+                    st.caption(
+                        f"Preparing your interview… {len(questions)} / {len(base_plan)} questions"
+                    )
+                    with st.chat_message("assistant"):
+                        st.markdown(f"**{questions[0]}**")
+
+        questions_plan = generate_questions_batch(
+            base_plan, role_profile, answers={}, on_delta=show_questions_progress
+        )
+        preview.empty()
+        store_question_set(role_profile, base_plan, questions_plan)
+
     st.session_state["plan"] = questions_plan
 
 plan = st.session_state["plan"]
 max_steps = len(plan)
 
-st.write(f"DEBUG max_steps = {max_steps}, plan length = {len(plan)}")
-st.write(f"DEBUG current step = {st.session_state['step']}")
-
-
 
 if st.session_state["step"] == 0:
     intro_text = (
@@ -231,8 +288,18 @@ if 1 <= current_step <= max_steps:
 
     if answer_value is not None and answer_value != "":
         # salva risposta
-        add_user_message(answer_value)
-        st.session_state["answers"][focus] = answer_value
+        with tracing.span("answer", **{
+            "answer.step": current_step, "answer.type": q_type, "answer.focus": focus,
+            "answer.chars": len(answer_value),
+        }):
+            add_user_message(answer_value)
+            st.session_state["answers"][focus] = answer_value
+            if JUDGE_INCREMENTAL:
+                # Scored in the background while the candidate goes on;
+                # the final evaluation only merges the partial scores
+                if "answer_scorer" not in st.session_state:
+                    st.session_state["answer_scorer"] = AnswerScorer()
+                st.session_state["answer_scorer"].submit(focus, answer_value)
 
         # passa allo step successivo o chiudi
         if current_step < max_steps:
@@ -242,25 +309,58 @@ if 1 <= current_step <= max_steps:
             add_ai_message(
                 "The interview is complete. The score report is being generated in the background."
             )
-            with st.spinner("Calculating score..."):
-                try:
-                    result = evaluate_answers_with_llama(st.session_state["answers"])
-                    st.session_state["evaluation"] = result
-
-                    role_id = st.session_state["role_profile"].get("id")
-                    candidate = st.session_state.get("candidate", {})
-
-                    save_evaluation(
-                        role_id=role_id,
-                        candidate=candidate,
-                        answers=st.session_state["answers"],
-                        scores=result["scores"],
-                        summary=result["summary"],
+            role_id = st.session_state["role_profile"].get("id")
+            candidate = st.session_state.get("candidate", {})
+            scorer = st.session_state.get("answer_scorer")
+            partial = scorer.partial() if scorer is not None else None
+
+            if EVAL_IN_BACKGROUND:
+                # Judge + save_evaluation run on the worker pool; Score Report polls the job.
+                # The job's spans continue this trace.
+                with tracing.span("evaluation.enqueue"):
+                    st.session_state["evaluation_job_id"] = submit_evaluation(
+                        role_id, candidate, st.session_state["answers"], partial=partial
                     )
-                except RuntimeError as e:
-                    st.session_state["evaluation_error"] = str(e)
+            else:
+                with st.spinner("Calculating score..."), tracing.span("evaluation"):
+                    live = st.empty()
+                    judged = []
+
+                    def show_scoring_progress(delta: str):
+                        judged.append(delta)
+                        buffer = "".join(judged)
+                        lines = []
+                        for crit in CRITERIA:
+                            reason = streamed_strings(buffer, crit)
+                            if reason:
+                                lines.append(f"**{crit}** – {reason[-1]}")
+                        summary = streamed_strings(buffer, "summary")
+                        if summary:
+                            lines.append(f"_{summary[0]}_")
+                        if lines:
+                            live.markdown("  \n".join(lines))
+
+                    try:
+                        result = evaluate_answers_with_llama(
+                            st.session_state["answers"], on_delta=show_scoring_progress,
+                            partial=partial,
+                        )
+                        st.session_state["evaluation"] = result
+
+                        save_evaluation(
+                            role_id=role_id,
+                            candidate=candidate,
+                            answers=st.session_state["answers"],
+                            scores=result["scores"],
+                            summary=result["summary"],
+                        )
+                    except RuntimeError as e:
+                        st.session_state["evaluation_error"] = str(e)
 
             st.session_state["step"] = max_steps + 1
+            tracing.end_interview(st.session_state, "completed", **{
+                "interview.answers": len(st.session_state["answers"]),
+            })
             interview_done_dialog()
 
 
@@ -280,3 +380,5 @@ st.markdown(
     """,
     unsafe_allow_html=True,
 )
+
+tracing.end_rerun(st.session_state)
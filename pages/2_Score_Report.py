@@ -1,7 +1,22 @@
 # pages/2_Score_Report.py
-import json
+import time
 import streamlit as st
-from app.db.evaluations import init_evaluations_db, list_evaluations, get_evaluation
+from app.db.migrations import ensure_schema
+from app.observability.metrics import start_metrics_server
+from app.db.evaluations import count_evaluations, list_evaluations_page, get_evaluation
+from app.db.roles import list_roles
+from app.analytics.cohorts import get_score_store
+from app.db.jobs import list_jobs
+from app.jobs.evaluations import start_workers
+from app.export.evaluations import (
+    CLI_HINT,
+    DOWNLOAD_MAX_ROWS,
+    EXPORT_FORMATS,
+    anti_portfolio_markdown,
+    evaluation_scores,
+    export_bytes,
+    report_file_name,
+)
 
 st.title("Score Report")
 
@@ -13,96 +28,237 @@ CRITERIA = [
     "Uniqueness signal",
 ]
 
-init_evaluations_db()
+ensure_schema()
+# /metrics for Prometheus, once per process (JOBFIT_METRICS_PORT)
+start_metrics_server()
+# Picks up jobs queued by the Interview page (or left over after a restart)
+start_workers()
 
 if "current_eval_id" not in st.session_state:
     st.session_state["current_eval_id"] = None
+if "active_job_ids" not in st.session_state:
+    st.session_state["active_job_ids"] = set()
+if "eval_page_cursors" not in st.session_state:
+    # cursors[i] = keyset cursor that opens page i (page 0 has none)
+    st.session_state["eval_page_cursors"] = [None]
+if "eval_filters" not in st.session_state:
+    st.session_state["eval_filters"] = None
 
-evals = list_evaluations()
+PAGE_SIZE = 25
+LEADERBOARD_PAGE_SIZE = 50
 
-col_left, col_right = st.columns([1, 3])
 
-# ---------------------------
-# COLONNA SINISTRA: lista evaluation
-# ---------------------------
-with col_left:
-    st.subheader("Past evaluations")
+@st.fragment(run_every="3s")
+def pending_jobs_panel():
+    jobs = list_jobs(statuses=("queued", "running", "failed"), limit=20)
+    active = {j["id"] for j in jobs if j["status"] in ("queued", "running")}
 
-    if not evals:
-        st.info("No evaluations yet. Complete an interview first.")
-    else:
-        for eid, created_at, role_id, name, email, phone in evals:
-            label = f"{name or 'Unknown'} – {created_at.split(' ')[0]}"
-            if st.button(label, key=f"eval_btn_{eid}", use_container_width=True):
-                st.session_state["current_eval_id"] = eid
-                st.rerun()
+    # A job left the queue since the last poll: reload the evaluation list
+    finished = st.session_state["active_job_ids"] - active
+    st.session_state["active_job_ids"] = active
+    if finished:
+        st.rerun()
 
-# ---------------------------
-# COLONNA DESTRA: dettaglio score
-# ---------------------------
-with col_right:
-    eval_id = st.session_state.get("current_eval_id")
+    if not jobs:
+        return
 
-    if eval_id is None:
-        st.markdown("### Select an evaluation to view details")
-    else:
-        ev = get_evaluation(eval_id)
-        if not ev:
-            st.warning("Selected evaluation not found.")
+    st.subheader("Scoring queue")
+    now = time.time()
+    for job in jobs:
+        name = job["candidate"].get("name") or "Unknown"
+        if job["status"] == "running":
+            detail = f"running for {now - job['started_at']:.0f}s"
+        elif job["status"] == "queued":
+            detail = f"queued {now - job['created_at']:.0f}s ago"
         else:
-            scores = json.loads(ev["scores_json"])
-            summary = ev["summary"]
-
-            total = sum(scores.get(c, 0) for c in CRITERIA)
-            st.markdown(
-                f"### Candidate: {ev['candidate_name'] or 'Unknown'}  \n"
-                f"Email: {ev['candidate_email'] or '-'}  \n"
-                f"Phone: {ev['candidate_phone'] or '-'}"
+            detail = f"failed: {job['error']}"
+        st.caption(
+            f"{name} – {detail} (attempt {job['attempts']}/{job['max_attempts']})"
+        )
+
+tab_evals, tab_leaderboard = st.tabs(["Evaluations", "Leaderboard"])
+
+with tab_evals:
+    col_left, col_right = st.columns([1, 3])
+
+    # ---------------------------
+    # COLONNA SINISTRA: lista evaluation
+    # ---------------------------
+    with col_left:
+        pending_jobs_panel()
+
+        st.subheader("Past evaluations")
+
+        with st.expander("Filters"):
+            roles = {rid: f"{company} – {title}" for rid, company, title in list_roles()}
+            role_filter = st.selectbox(
+                "Role",
+                [None, *roles],
+                format_func=lambda rid: "All roles" if rid is None else roles[rid],
             )
-            st.subheader(f"Total score: {total} / 100")
+            date_range = st.date_input("Date range", value=())
+            score_band = st.slider("Total score", min_value=0, max_value=100, value=(0, 100), step=5)
 
-            for crit in CRITERIA:
-                s = scores.get(crit, 0)
-                st.markdown(f"**{crit}**: {s} / 20")
-                st.progress(s / 20)
+        date_from = date_range[0] if len(date_range) > 0 else None
+        date_to = date_range[1] if len(date_range) > 1 else date_from
+        filters = (role_filter, date_from, date_to, score_band)
 
-            st.markdown("### Signature summary")
-            st.write(summary)
+        # New filters: back to the first page
+        if filters != st.session_state["eval_filters"]:
+            st.session_state["eval_filters"] = filters
+            st.session_state["eval_page_cursors"] = [None]
 
-                        # --- genera markdown anti-portfolio ---
-            md = f"""# JobFitIndex Anti-Portfolio – Score Report
+        cursors = st.session_state["eval_page_cursors"]
+        page = len(cursors) - 1
+        evals, next_cursor = list_evaluations_page(
+            limit=PAGE_SIZE,
+            cursor=cursors[-1],
+            role_id=role_filter,
+            date_from=date_from,
+            date_to=date_to,
+            min_total=score_band[0] if score_band[0] > 0 else None,
+            max_total=score_band[1] if score_band[1] < 100 else None,
+        )
 
-## Candidate
-- Name: {ev['candidate_name'] or '-'}
-- Email: {ev['candidate_email'] or '-'}
-- Phone: {ev['candidate_phone'] or '-'}
+        if not evals and filters == (None, None, None, (0, 100)):
+            st.info("No evaluations yet. Complete an interview first.")
+        elif not evals:
+            st.info("No evaluations match these filters.")
+        else:
+            for eid, created_at, role_id, name, email, phone in evals:
+                label = f"{name or 'Unknown'} – {created_at.split(' ')[0]}"
+                if st.button(label, key=f"eval_btn_{eid}", use_container_width=True):
+                    st.session_state["current_eval_id"] = eid
+                    st.rerun()
 
-## Impronta professionale (signature summary)
-{summary}
+        p_prev, p_label, p_next = st.columns([1, 1, 1])
+        with p_prev:
+            if st.button("←", key="eval_page_prev", disabled=page == 0, use_container_width=True):
+                cursors.pop()
+                st.rerun()
+        with p_label:
+            st.caption(f"Page {page + 1}")
+        with p_next:
+            if st.button("→", key="eval_page_next", disabled=next_cursor is None,
+                         use_container_width=True):
+                cursors.append(next_cursor)
+                st.rerun()
+
+        with st.expander("Bulk export"):
+            st.caption("All evaluations matching the role and date filters.")
+            export_format = st.selectbox("Format", list(EXPORT_FORMATS), key="export_format")
+            mime, ext = EXPORT_FORMATS[export_format]
+            export_count = count_evaluations(role_filter, date_from, date_to)
+            if export_count > DOWNLOAD_MAX_ROWS:
+                st.info(
+                    f"{export_count} evaluations match: the page downloads at most "
+                    f"{DOWNLOAD_MAX_ROWS}. Narrow the filters, or export them to a file "
+                    f"with `{CLI_HINT} --format {export_format}`."
+                )
+            else:
+                # Built only on click, off the script thread; held in memory until downloaded
+                st.download_button(
+                    label=f"Download .{ext}",
+                    data=lambda: export_bytes(export_format, role_filter, date_from, date_to),
+                    file_name=f"jobfitindex_evaluations.{ext}",
+                    mime=mime,
+                    on_click="ignore",
+                    use_container_width=True,
+                )
+
+    # ---------------------------
+    # COLONNA DESTRA: dettaglio score
+    # ---------------------------
+    with col_right:
+        eval_id = st.session_state.get("current_eval_id")
+
+        if eval_id is None:
+            st.markdown("### Select an evaluation to view details")
+        else:
+            ev = get_evaluation(eval_id)
+            if not ev:
+                st.warning("Selected evaluation not found.")
+            else:
+                scores, total = evaluation_scores(ev)
+                summary = ev["summary"]
+                st.markdown(
+                    f"### Candidate: {ev['candidate_name'] or 'Unknown'}  \n"
+                    f"Email: {ev['candidate_email'] or '-'}  \n"
+                    f"Phone: {ev['candidate_phone'] or '-'}"
+                )
+                st.subheader(f"Total score: {total} / 100")
+
+                for crit in CRITERIA:
+                    s = scores.get(crit, 0)
+                    st.markdown(f"**{crit}**: {s} / 20")
+                    st.progress(s / 20)
 
-## Score breakdown
-Total score: {total} / 100
+                st.markdown("### Signature summary")
+                st.write(summary)
 
-"""  # chiudo f-string
+                st.download_button(
+                    label="Download report (.md)",
+                    data=anti_portfolio_markdown(ev),
+                    file_name=report_file_name(ev),
+                    mime="text/markdown",
+                )
 
-            for crit in CRITERIA:
-                s = scores.get(crit, 0)
-                md += f"- {crit}: {s} / 20\n"
+# ---------------------------
+# LEADERBOARD: ranking e confronto tra ruoli
+# ---------------------------
+with tab_leaderboard:
+    store = get_score_store()
+    role_names = {rid: f"{company} – {title}" for rid, company, title in list_roles()}
 
-            md += """
+    if not len(store.ids):
+        st.info("No evaluations yet. Complete an interview first.")
+    else:
+        lb_role = st.selectbox(
+            "Role",
+            sorted(set(store.role_ids.tolist())),
+            format_func=lambda rid: role_names.get(rid, f"Role #{rid}"),
+            key="leaderboard_role",
+        )
+        stats = store.role_stats(lb_role)
 
-## Come usare questo anti-portfolio
-Questo documento è generato da JobFitIndex a partire da un'intervista strutturata.
-Mette in evidenza pattern decisionali, densità di evidenze e segnali di unicità,
-invece di limitarsi a job title e lista di esperienze.
-"""
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Candidates", stats["count"])
+        m2.metric("Mean total", f"{stats['total_mean']:.1f}")
+        m3.metric("Median total", f"{stats['total_percentiles'][50]:.0f}")
+        m4.metric("90th percentile", f"{stats['total_percentiles'][90]:.0f}")
 
-            st.download_button(
-                label="Download report (.md)",
-                data=md,
-                file_name=f"jobfitindex_anti_portfolio_{ev['candidate_name'] or 'candidate'}.md",
-                mime="text/markdown",
+        lb_page = st.number_input(
+            "Leaderboard page", min_value=1, value=1, step=1, key="leaderboard_page"
+        )
+        st.dataframe(
+            store.leaderboard(lb_role, limit=LEADERBOARD_PAGE_SIZE,
+                              offset=(lb_page - 1) * LEADERBOARD_PAGE_SIZE),
+            hide_index=True,
+            use_container_width=True,
+        )
+
+        h_col, c_col = st.columns(2)
+        with h_col:
+            st.markdown("**Total score distribution**")
+            st.bar_chart(
+                {"candidates": store.histogram(lb_role)}, x_label="total", y_label="candidates"
             )
+        with c_col:
+            st.markdown("**Criteria per role (mean / variance)**")
+            st.dataframe(stats["criteria"], use_container_width=True)
+
+        st.markdown("**Criterion correlations**")
+        st.dataframe(store.criterion_correlations(lb_role), use_container_width=True)
+
+        st.markdown("**All roles**")
+        st.dataframe(
+            [
+                {"role": role_names.get(r["role_id"], f"Role #{r['role_id']}"), **r}
+                for r in store.compare_roles()
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
 
 
 # Stile container
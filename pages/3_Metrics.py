@@ -0,0 +1,97 @@
+# pages/3_Metrics.py
+import streamlit as st
+from app.db.migrations import ensure_schema
+from app.observability import metrics
+from app.observability.metrics import start_metrics_server
+from app.llm import cache, ratelimit
+from app.llm.client import coalescing_stats, pool_stats, router_stats
+from app.llm.budget import prompt_stats
+from app.llm.structured import structured_stats
+
+st.title("Metrics")
+
+ensure_schema()
+# /metrics for Prometheus, once per process (JOBFIT_METRICS_PORT)
+server = start_metrics_server()
+
+if not metrics.METRICS_ENABLED:
+    st.info("Metrics are disabled (JOBFIT_METRICS=0).")
+elif server is not None:
+    host, port = server.server_address[:2]
+    st.caption(f"Prometheus endpoint: http://{host}:{port}/metrics")
+else:
+    st.caption("Prometheus endpoint not started (JOBFIT_METRICS_PORT=0 or port in use).")
+
+st.caption(
+    f"Sampling: app/db {metrics.DB_SAMPLE_RATE:.0%}, LLM {metrics.LLM_SAMPLE_RATE:.0%} of "
+    "successful calls; errors are always counted. Counts are estimates when sampled."
+)
+
+
+def _by_total_time(rows):
+    return sorted(rows, key=lambda r: r["total_sec"], reverse=True)
+
+
+@st.fragment(run_every="5s")
+def metrics_panel():
+    tab_llm, tab_db, tab_client, tab_raw = st.tabs(["LLM", "Database", "LLM client", "Raw"])
+
+    with tab_llm:
+        st.subheader("Calls by call site")
+        st.caption("End to end: cache, coalescing, rate limit, retries and fallbacks included.")
+        rows = metrics.histogram_rows(metrics.LLM_CALL_SECONDS)
+        if rows:
+            st.dataframe(_by_total_time(rows), use_container_width=True, hide_index=True)
+        else:
+            st.info("No LLM calls yet in this process.")
+
+        st.subheader("Requests by backend model")
+        rows = metrics.histogram_rows(metrics.LLM_REQUEST_SECONDS)
+        if rows:
+            st.dataframe(_by_total_time(rows), use_container_width=True, hide_index=True)
+
+        col_tokens, col_retries, col_errors = st.columns(3)
+        with col_tokens:
+            st.markdown("**Tokens**")
+            st.dataframe(metrics.counter_rows(metrics.LLM_TOKENS), hide_index=True)
+        with col_retries:
+            st.markdown("**Retries**")
+            st.dataframe(metrics.counter_rows(metrics.LLM_RETRIES), hide_index=True)
+        with col_errors:
+            st.markdown("**Errors**")
+            st.dataframe(metrics.counter_rows(metrics.LLM_ERRORS), hide_index=True)
+
+    with tab_db:
+        st.subheader("app/db functions")
+        rows = metrics.histogram_rows(metrics.DB_CALL_SECONDS)
+        if rows:
+            st.dataframe(_by_total_time(rows), use_container_width=True, hide_index=True)
+        else:
+            st.info("No sampled app/db calls yet in this process.")
+        errors = metrics.counter_rows(metrics.DB_ERRORS)
+        if errors:
+            st.markdown("**Errors**")
+            st.dataframe(errors, use_container_width=True, hide_index=True)
+
+    with tab_client:
+        for label, stats in (
+            ("Response cache", cache.cache_stats()),
+            ("Coalescing", coalescing_stats()),
+            ("Router", router_stats()),
+            ("Rate limits", ratelimit.ratelimit_stats()),
+            ("Connection pool", pool_stats()),
+            ("Structured output", structured_stats()),
+            ("Prompt budgets", prompt_stats()),
+        ):
+            with st.expander(label):
+                st.json(stats)
+
+    with tab_raw:
+        st.code(metrics.render(), language="text")
+
+
+metrics_panel()
+
+if st.button("Reset metrics"):
+    metrics.reset()
+    st.rerun()
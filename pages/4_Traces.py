@@ -0,0 +1,93 @@
+# pages/4_Traces.py
+from datetime import datetime
+
+import altair as alt
+import streamlit as st
+from app.observability import tracing
+
+st.title("Traces")
+
+if not tracing.TRACING_ENABLED:
+    st.info("Tracing is disabled (JOBFIT_TRACING=0).")
+    st.stop()
+
+stats = tracing.tracing_stats()
+st.caption(
+    f"Sampling {tracing.TRACE_SAMPLE_RATE:.0%} of interviews · "
+    f"{stats['exported']} spans exported, {stats['dropped']} dropped · "
+    f"file: {tracing.TRACE_FILE or '-'} · OTLP: {tracing.OTLP_ENDPOINT or '-'}"
+)
+
+source = "This process"
+if tracing.TRACE_FILE:
+    source = st.radio("Spans", ["This process", "Trace file"], horizontal=True)
+if source == "Trace file":
+    tracing.flush()
+    records = tracing.load_spans()
+else:
+    records = tracing.recent_spans()
+
+traces = tracing.list_traces(records)
+if not traces:
+    st.info("No traces yet. Run an interview first.")
+    st.stop()
+
+
+def _label(t):
+    started = datetime.fromtimestamp(t["start_ns"] / 1e9).strftime("%Y-%m-%d %H:%M:%S")
+    attrs = t["attributes"]
+    role = [str(attrs[k]) for k in ("role.company", "role.title") if attrs.get(k)]
+    name = " – ".join([t["name"], *role])
+    errors = f", {t['errors']} errors" if t["errors"] else ""
+    return f"{started} · {name} · {t['duration_ms'] / 1000:.1f}s, {t['spans']} spans{errors}"
+
+
+trace = st.selectbox("Trace", traces, format_func=_label)
+rows = tracing.waterfall(records, trace["trace_id"])
+
+chart_rows = [
+    {
+        "order": i,
+        "span": " " * r["depth"] + r["name"],
+        "start_ms": r["offset_ms"],
+        "end_ms": r["offset_ms"] + r["duration_ms"],
+        "duration_ms": r["duration_ms"],
+        "status": r["status"],
+    }
+    for i, r in enumerate(rows)
+]
+chart = (
+    alt.Chart(alt.Data(values=chart_rows))
+    .mark_bar()
+    .encode(
+        x=alt.X("start_ms:Q", title="ms from start of trace"),
+        x2="end_ms:Q",
+        y=alt.Y("span:N", sort=alt.SortField("order"), title=None,
+                axis=alt.Axis(labelLimit=400)),
+        color=alt.Color("status:N", scale=alt.Scale(domain=["ok", "error"],
+                                                    range=["#4c78a8", "#d9534f"])),
+        tooltip=["span:N", "start_ms:Q", "duration_ms:Q", "status:N"],
+    )
+    .properties(height=max(120, 22 * len(chart_rows)))
+)
+st.altair_chart(chart, use_container_width=True)
+
+st.subheader("Spans")
+st.dataframe(
+    [
+        {
+            "span": "  " * r["depth"] + r["name"],
+            "offset_ms": r["offset_ms"],
+            "duration_ms": r["duration_ms"],
+            "status": r["status"],
+            "thread": r["thread"],
+            "attributes": r["attributes"],
+        }
+        for r in rows
+    ],
+    use_container_width=True,
+    hide_index=True,
+)
+
+with st.expander("Text waterfall"):
+    st.code(tracing.format_waterfall(rows), language="text")
@@ -0,0 +1,80 @@
+# tests/conftest.py
+import os
+import socket
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# Modules read st.secrets at import time; point Streamlit at a throwaway
+# secrets file (and the app at a throwaway database) before any is imported.
+_tmp = Path(tempfile.mkdtemp(prefix="jobfit-tests-"))
+(_tmp / "secrets.toml").write_text('LLM_API_KEY = "test"\n')
+os.environ.setdefault("JOBFIT_DB_PATH", str(_tmp / "import.db"))
+
+from streamlit import config as st_config  # noqa: E402
+
+st_config.set_option("secrets.files", [str(_tmp / "secrets.toml")])
+
+from app.db import connection  # noqa: E402
+from app.db.migrations import run_migrations  # noqa: E402
+from app.llm import cache, client, ratelimit  # noqa: E402
+from app.llm import router as routing  # noqa: E402
+from benchmarks.mock_llm import MockConfig, MockLLMServer  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh, migrated database for the test."""
+    monkeypatch.setattr(connection, "DB_PATH", tmp_path / "jobfit.db")
+    run_migrations()
+    yield connection.DB_PATH
+    connection.close_thread_connections()
+
+
+@pytest.fixture
+def mock_llm():
+    """Start the mock LLM server; call it with MockConfig keyword arguments."""
+    servers = []
+
+    def start(**kwargs):
+        kwargs.setdefault("latency", "fixed:0.05")
+        server = MockLLMServer(("127.0.0.1", 0), MockConfig(**kwargs))
+        server.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def route_llm(monkeypatch):
+    """Send every call type to one backend at `url`: no cache, rate limit or retries."""
+
+    def route(url):
+        backend = routing.Backend("test-backend", "mock-llm", url, "test")
+        monkeypatch.setattr(client, "router", routing.Router([backend], {}))
+        monkeypatch.setattr(ratelimit, "_limiters", {})
+        monkeypatch.setattr(ratelimit, "DEFAULT_RPM", 0)
+        monkeypatch.setattr(ratelimit, "DEFAULT_TPM", 0)
+        monkeypatch.setattr(ratelimit, "MAX_RETRIES", 0)
+        monkeypatch.setattr(cache, "CACHE_ENABLED", False)
+
+    return route
+
+
+@pytest.fixture
+def unreachable_llm(route_llm):
+    """Route to a local port nobody listens on: every call fails with ConnectionError."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    route_llm(f"http://127.0.0.1:{port}/v1/chat/completions")
@@ -0,0 +1,54 @@
+# tests/test_budget.py
+import pytest
+
+from app.llm import budget
+from app.llm.budget import ANSWERS_SLOT, PromptBudget, PromptTooLong, fit_answers
+
+LONG = "I measured every step of the pipeline. " * 60  # ~500 tokens
+
+
+def _size(answers):
+    return budget.count_tokens(budget.compact_json(answers))
+
+
+def test_fit_answers_keeps_answers_that_fit():
+    answers = {"a": "short", "b": "", "c": None, "d": "also short"}
+    fitted, clipped, dropped = fit_answers(answers, 1000)
+    assert fitted == {"a": "short", "d": "also short"}
+    assert (clipped, dropped) == (0, 0)
+
+
+def test_fit_answers_clips_older_answers_first():
+    answers = {"old": LONG, "recent": LONG}
+    fitted, clipped, dropped = fit_answers(answers, 700, keep_recent=1)
+    assert fitted["recent"] == LONG
+    assert fitted["old"].endswith(" …") and len(fitted["old"]) < len(LONG)
+    assert clipped == 1 and dropped == 0
+    assert _size(fitted) <= 700
+
+
+def test_fit_answers_drops_oldest_when_clipping_is_not_enough():
+    answers = {f"q{i}": LONG for i in range(40)}
+    fitted, clipped, dropped = fit_answers(answers, 800, keep_recent=1)
+    assert dropped > 0
+    assert fitted["earlier_answers_omitted"] == dropped
+    assert "q0" not in fitted and fitted["q39"] == LONG
+    assert _size(fitted) <= 800
+
+
+def test_finish_without_fit_sends_answers_in_full():
+    answers = {"old": LONG, "recent": LONG, "empty": ""}
+    messages = [{"role": "user", "content": f"Answers: {ANSWERS_SLOT}"}]
+    sent = PromptBudget("judge").finish(messages, answers, fit=False)
+    assert sent[0]["content"] == "Answers: " + budget.compact_json({"old": LONG, "recent": LONG})
+
+
+def test_finish_without_fit_raises_when_over_budget(monkeypatch):
+    monkeypatch.setitem(budget.PROMPT_BUDGETS, "judge", 300)
+    messages = [{"role": "user", "content": f"Answers: {ANSWERS_SLOT}"}]
+    with pytest.raises(PromptTooLong) as info:
+        PromptBudget("judge").finish(messages, {"a": LONG, "b": LONG}, fit=False)
+    assert info.value.budget == 300 and info.value.tokens > 300
+    # the fitting prompts of the same size still go through, shortened
+    sent = PromptBudget("judge").finish(messages, {"a": LONG, "b": LONG})
+    assert budget.count_message_tokens(sent) <= 300
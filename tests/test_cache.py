@@ -0,0 +1,75 @@
+# tests/test_cache.py
+import sqlite3
+import uuid
+
+import pytest
+
+from app.llm import cache
+
+USAGE = {"prompt_tokens": 12, "completion_tokens": 34}
+
+
+@pytest.fixture
+def key(db):
+    return cache.make_key("mock-llm", [{"role": "user", "content": str(uuid.uuid4())}], 0.0, 64)
+
+
+def _locked(*args, **kwargs):
+    raise sqlite3.OperationalError("database is locked")
+
+
+def test_make_key_depends_on_every_field():
+    messages = [{"role": "user", "content": "hi"}]
+    key = cache.make_key("m", messages, 0.0, 64)
+    assert key == cache.make_key("m", [{"content": "hi", "role": "user"}], 0.0, 64)
+    assert len({key, cache.make_key("n", messages, 0.0, 64),
+                cache.make_key("m", messages, 0.5, 64),
+                cache.make_key("m", messages, 0.0, 65)}) == 4
+
+
+def test_store_then_lookup_hits_memory(key):
+    assert cache.lookup(key) is None
+    cache.store(key, "mock-llm", "answer", USAGE, 120.0)
+    before = cache.cache_stats()["memory_hits"]
+    assert cache.lookup(key)["content"] == "answer"
+    assert cache.cache_stats()["memory_hits"] == before + 1
+
+
+def test_disk_hit_is_promoted_to_memory(key):
+    cache.store(key, "mock-llm", "answer", USAGE, 120.0)
+    cache._memory.pop(key)
+    before = cache.cache_stats()
+    assert cache.lookup(key)["content"] == "answer"
+    assert cache.lookup(key)["content"] == "answer"
+    after = cache.cache_stats()
+    assert after["disk_hits"] == before["disk_hits"] + 1
+    assert after["memory_hits"] == before["memory_hits"] + 1
+
+
+def test_expired_entries_are_misses(key, monkeypatch):
+    cache.store(key, "mock-llm", "answer", USAGE, 120.0)
+    monkeypatch.setattr(cache, "CACHE_TTL", -1)
+    assert cache.lookup(key) is None
+
+
+def test_evict_drops_both_tiers(key):
+    cache.store(key, "mock-llm", "answer", USAGE, 120.0)
+    cache.evict(key)
+    assert cache.lookup(key) is None
+
+
+def test_locked_database_on_read_is_a_miss(key, monkeypatch):
+    monkeypatch.setattr(cache, "get_cached_response", _locked)
+    before = cache.cache_stats()
+    assert cache.lookup(key) is None
+    after = cache.cache_stats()
+    assert after["lookup_errors"] == before["lookup_errors"] + 1
+    assert after["misses"] == before["misses"] + 1
+
+
+def test_locked_database_on_write_keeps_memory_entry(key, monkeypatch):
+    monkeypatch.setattr(cache, "save_cached_response", _locked)
+    before = cache.cache_stats()["store_errors"]
+    cache.store(key, "mock-llm", "answer", USAGE, 120.0)
+    assert cache.cache_stats()["store_errors"] == before + 1
+    assert cache.lookup(key)["content"] == "answer"
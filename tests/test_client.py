@@ -0,0 +1,27 @@
+# tests/test_client.py
+import pytest
+
+from app.llm import client
+
+
+@pytest.fixture
+def fresh_adapter(monkeypatch):
+    monkeypatch.setattr(client, "_adapter", None)
+    monkeypatch.setattr(client, "_http2", False)
+
+
+def test_pool_stats_reports_http2_off_when_not_requested(fresh_adapter, monkeypatch):
+    monkeypatch.setattr(client, "USE_HTTP2", False)
+    assert client.pool_stats()["http2"] is False
+
+
+def test_pool_stats_reports_http2_unavailable(fresh_adapter, monkeypatch):
+    monkeypatch.setattr(client, "USE_HTTP2", True)
+    monkeypatch.setattr(client, "_enable_http2", lambda: False)  # urllib3.http2 missing
+    assert client.pool_stats()["http2"] is False
+
+
+def test_pool_stats_reports_http2_enabled(fresh_adapter, monkeypatch):
+    monkeypatch.setattr(client, "USE_HTTP2", True)
+    monkeypatch.setattr(client, "_enable_http2", lambda: True)
+    assert client.pool_stats()["http2"] is True
@@ -0,0 +1,97 @@
+# tests/test_evaluations.py
+import random
+
+import pytest
+
+from app.db.connection import get_conn
+from app.db.evaluations import list_evaluations_page, save_evaluation, total_score_percentiles
+from app.db.roles import add_role
+
+SCORES = {"Evidence density": 10, "Decision quality": 5}
+
+
+@pytest.fixture
+def role_id(db):
+    return add_role({"company_name": "Test Co", "title": "Data Engineer"})
+
+
+def _save(role_id, name, created_at=None, scores=SCORES):
+    eval_id = save_evaluation(role_id, {"name": name}, {"q": "a"}, scores, "Summary.")
+    if created_at:
+        conn = get_conn()
+        with conn:
+            conn.execute("UPDATE evaluations SET created_at = ? WHERE id = ?",
+                         (created_at, eval_id))
+    return eval_id
+
+
+def _all_pages(limit, **filters):
+    pages, cursor = [], None
+    while True:
+        rows, cursor = list_evaluations_page(limit, cursor, **filters)
+        pages.append([row[0] for row in rows])
+        if cursor is None:
+            return pages
+
+
+def test_pages_cover_every_row_once_newest_first(role_id):
+    # three rows per timestamp: ties are ordered by id
+    created = {_save(role_id, f"c{i}", f"2025-01-0{1 + i // 3} 10:00:00"): i // 3
+               for i in range(7)}
+    pages = _all_pages(3)
+    assert [len(p) for p in pages] == [3, 3, 1]
+    assert sum(pages, []) == sorted(created, key=lambda i: (created[i], i), reverse=True)
+
+
+def test_new_rows_do_not_shift_later_pages(role_id):
+    ids = [_save(role_id, f"c{i}", f"2025-01-01 10:00:0{i}") for i in range(4)]
+    first, cursor = list_evaluations_page(2)
+    _save(role_id, "new", "2025-02-01 10:00:00")
+    second, cursor = list_evaluations_page(2, cursor)
+    assert [r[0] for r in first + second] == ids[::-1]
+    assert cursor is None
+
+
+def test_exact_multiple_has_no_empty_last_page(role_id):
+    for i in range(4):
+        _save(role_id, f"c{i}")
+    assert [len(p) for p in _all_pages(2)] == [2, 2]
+
+
+def test_pages_apply_filters(role_id):
+    other = add_role({"company_name": "Other Co", "title": "Designer"})
+    mine = [_save(role_id, "a", "2025-03-01 09:00:00"), _save(role_id, "b", "2025-03-02 09:00:00")]
+    _save(other, "c", "2025-03-02 10:00:00")
+    _save(role_id, "d", "2025-04-01 09:00:00")
+    assert _all_pages(1, role_id=role_id, date_from="2025-03-01", date_to="2025-03-31") == [
+        [mine[1]], [mine[0]]]
+
+
+def test_pages_filter_on_score_band(role_id):
+    low = _save(role_id, "low", scores={"Evidence density": 5})
+    high = _save(role_id, "high", scores={"Evidence density": 20, "Decision quality": 20})
+    assert _all_pages(10, min_total=30) == [[high]]
+    assert _all_pages(10, max_total=10) == [[low]]
+
+
+def _nearest_rank(values, p):
+    ordered = sorted(values)
+    return ordered[max(-(-p * len(ordered) // 100), 1) - 1]
+
+
+def test_percentiles_match_nearest_rank(role_id):
+    rng = random.Random(7)
+    totals = [rng.choice(range(0, 101, 5)) for _ in range(57)]
+    for i, total in enumerate(totals):
+        _save(role_id, f"c{i}", scores={"Evidence density": total})
+    other = add_role({"company_name": "Other Co", "title": "Designer"})
+    _save(other, "outlier", scores={"Evidence density": 100})
+
+    percentiles = (1, 25, 50, 75, 90, 100)
+    assert total_score_percentiles(role_id, percentiles) == {
+        p: _nearest_rank(totals, p) for p in percentiles}
+    assert total_score_percentiles(None, (100,)) == {100: 100}
+
+
+def test_percentiles_of_no_rows(role_id):
+    assert total_score_percentiles(role_id) == {25: None, 50: None, 75: None, 90: None}
@@ -0,0 +1,40 @@
+# tests/test_export.py
+import json
+
+import pytest
+
+from app.db.evaluations import count_evaluations, save_evaluation
+from app.db.roles import add_role
+from app.export import evaluations as export
+
+SCORES = {"Evidence density": 10, "Decision quality": 5}
+
+
+@pytest.fixture
+def evaluations(db):
+    role_id = add_role({"company_name": "Test Co", "title": "Data Engineer"})
+    other_id = add_role({"company_name": "Other Co", "title": "Designer"})
+    for i in range(3):
+        save_evaluation(role_id, {"name": f"Candidate {i}"}, {"q": "a"}, SCORES, "Summary.")
+    save_evaluation(other_id, {"name": "Other"}, {"q": "a"}, SCORES, "Summary.")
+    return role_id
+
+
+def test_count_matches_iterated_rows(evaluations):
+    assert count_evaluations() == 4
+    assert count_evaluations(evaluations) == 3
+    assert count_evaluations(date_from="2999-01-01") == 0
+
+
+def test_export_bytes_writes_every_row(evaluations):
+    lines = export.export_bytes("jsonl", evaluations).decode().splitlines()
+    assert [json.loads(line)["candidate"]["name"] for line in lines] == [
+        "Candidate 0", "Candidate 1", "Candidate 2",
+    ]
+
+
+def test_export_bytes_refuses_exports_over_the_cap(evaluations, monkeypatch):
+    monkeypatch.setattr(export, "DOWNLOAD_MAX_ROWS", 3)
+    assert export.export_bytes("csv", evaluations)
+    with pytest.raises(ValueError, match="app.cli.export_evaluations"):
+        export.export_bytes("csv")
@@ -0,0 +1,140 @@
+# tests/test_jobs.py
+import pytest
+
+from app.db import jobs
+from app.db.connection import get_conn
+from app.db.roles import add_role
+from app.jobs import evaluations as worker
+
+CANDIDATE = {"name": "Test Candidate", "email": "test@example.com"}
+ANSWERS = {"evidence": "I cut the nightly batch from 4h to 20 minutes."}
+SCORES = {"Evidence density": 10, "Decision quality": 5}
+
+
+@pytest.fixture
+def role_id(db):
+    return add_role({"company_name": "Test Co", "title": "Data Engineer", "num_questions": 1})
+
+
+def _evaluation_count():
+    return get_conn().execute("SELECT COUNT(*) FROM evaluations").fetchone()[0]
+
+
+def test_claim_takes_each_job_once(role_id):
+    job_id = jobs.enqueue_evaluation_job(role_id, CANDIDATE, ANSWERS)
+    job = jobs.claim_next_job()
+    assert job["id"] == job_id
+    assert job["status"] == "running" and job["attempts"] == 1
+    assert job["answers"] == ANSWERS
+    assert jobs.claim_next_job() is None
+
+
+def test_claim_follows_queue_order(role_id):
+    first = jobs.enqueue_evaluation_job(role_id, CANDIDATE, ANSWERS)
+    second = jobs.enqueue_evaluation_job(role_id, CANDIDATE, ANSWERS)
+    assert [jobs.claim_next_job()["id"], jobs.claim_next_job()["id"]] == [first, second]
+
+
+def test_save_job_evaluation_completes_job(role_id):
+    job_id = jobs.enqueue_evaluation_job(role_id, CANDIDATE, ANSWERS)
+    job = jobs.claim_next_job()
+    eval_id = jobs.save_job_evaluation(job, SCORES, "Summary.")
+
+    saved = jobs.get_job(job_id)
+    assert saved["status"] == "done"
+    assert saved["evaluation_id"] == eval_id
+    assert saved["finished_at"] is not None
+    assert _evaluation_count() == 1
+
+
+def test_save_job_evaluation_is_idempotent(role_id):
+    jobs.enqueue_evaluation_job(role_id, CANDIDATE, ANSWERS)
+    job = jobs.claim_next_job()
+    first = jobs.save_job_evaluation(job, SCORES, "Summary.")
+    # e.g. judged a second time after being requeued as stale
+    second = jobs.save_job_evaluation(job, SCORES, "Another summary.")
+    assert first == second
+    assert _evaluation_count() == 1
+
+
+def test_failed_job_is_retried_then_failed(role_id):
+    job_id = jobs.enqueue_evaluation_job(role_id, CANDIDATE, ANSWERS, max_attempts=2)
+    jobs.fail_job(jobs.claim_next_job()["id"], "RuntimeError: boom", retry_delay=0)
+    assert jobs.get_job(job_id)["status"] == "queued"
+
+    job = jobs.claim_next_job()
+    assert job["attempts"] == 2
+    assert jobs.get_job(job_id)["error"] is None
+    jobs.fail_job(job["id"], "RuntimeError: boom", retry_delay=0)
+    failed = jobs.get_job(job_id)
+    assert failed["status"] == "failed" and failed["error"] == "RuntimeError: boom"
+    assert jobs.claim_next_job() is None
+
+
+def test_retry_waits_for_its_delay(role_id):
+    jobs.enqueue_evaluation_job(role_id, CANDIDATE, ANSWERS)
+    jobs.fail_job(jobs.claim_next_job()["id"], "RuntimeError: boom", retry_delay=60)
+    assert jobs.claim_next_job() is None
+
+
+def test_stale_running_job_is_requeued(role_id):
+    job_id = jobs.enqueue_evaluation_job(role_id, CANDIDATE, ANSWERS)
+    jobs.claim_next_job()
+    assert jobs.requeue_stale_jobs(older_than=3600) == 0
+    assert jobs.requeue_stale_jobs(older_than=-1) == 1
+
+    job = jobs.claim_next_job()
+    assert job["id"] == job_id and job["attempts"] == 2
+
+
+def test_run_job_saves_evaluation(role_id, monkeypatch):
+    monkeypatch.setattr(worker, "evaluate_answers_with_llama",
+                        lambda answers, partial=None: {"scores": SCORES, "summary": "Summary."})
+    job_id = jobs.enqueue_evaluation_job(role_id, CANDIDATE, ANSWERS)
+    worker._run_job(jobs.claim_next_job())
+    assert jobs.get_job(job_id)["status"] == "done"
+    assert _evaluation_count() == 1
+
+
+def test_run_job_requeues_on_judge_error(role_id, monkeypatch):
+    def fail(answers, partial=None):
+        raise RuntimeError("LLM call timed out.")
+
+    monkeypatch.setattr(worker, "evaluate_answers_with_llama", fail)
+    job_id = jobs.enqueue_evaluation_job(role_id, CANDIDATE, ANSWERS)
+    worker._run_job(jobs.claim_next_job())
+    job = jobs.get_job(job_id)
+    assert job["status"] == "queued"
+    assert job["error"] == "RuntimeError: LLM call timed out."
+    assert _evaluation_count() == 0
+
+
+def test_requeued_job_with_evaluation_is_not_judged_again(role_id, monkeypatch):
+    def judge(answers, partial=None):
+        raise AssertionError("judged twice")
+
+    job_id = jobs.enqueue_evaluation_job(role_id, CANDIDATE, ANSWERS)
+    eval_id = jobs.save_job_evaluation(jobs.claim_next_job(), SCORES, "Summary.")
+    get_conn().execute("UPDATE evaluation_jobs SET status = 'running' WHERE id = ?", (job_id,))
+    get_conn().commit()
+    assert jobs.requeue_stale_jobs(older_than=-1) == 1
+
+    monkeypatch.setattr(worker, "evaluate_answers_with_llama", judge)
+    worker._run_job(jobs.claim_next_job())
+    job = jobs.get_job(job_id)
+    assert job["status"] == "done" and job["evaluation_id"] == eval_id
+    assert _evaluation_count() == 1
+
+
+def test_workers_sweep_stale_jobs_periodically(role_id, monkeypatch):
+    monkeypatch.setattr(worker, "STALE_AFTER", -1)
+    monkeypatch.setattr(worker, "_next_requeue", 0.0)
+    job_id = jobs.enqueue_evaluation_job(role_id, CANDIDATE, ANSWERS)
+    jobs.claim_next_job()  # its final status write is lost: stays 'running'
+
+    worker._requeue_stale()
+    assert jobs.get_job(job_id)["status"] == "queued"
+
+    jobs.claim_next_job()
+    worker._requeue_stale()  # within REQUEUE_INTERVAL: no sweep
+    assert jobs.get_job(job_id)["status"] == "running"
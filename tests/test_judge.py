@@ -0,0 +1,106 @@
+# tests/test_judge.py
+import pytest
+
+from app.llm import budget, client, judge
+from app.llm.budget import PromptTooLong
+
+ANSWERS = {
+    "evidence": "I cut the nightly batch from 4h to 20 minutes.",
+    "failure": "The first release broke billing; I added canaries.",
+}
+
+
+@pytest.fixture
+def unreachable(db, unreachable_llm):
+    pass
+
+
+def test_transport_error_is_raised_as_runtime_error(unreachable):
+    with pytest.raises(RuntimeError, match="LLM call failed") as info:
+        client.call_llm([{"role": "user", "content": "ping"}], timeout=5, use_cache=False)
+    assert info.value.__cause__ is not None
+
+
+def test_per_criterion_falls_back_when_backend_is_unreachable(unreachable):
+    result = judge.evaluate_answers_with_llama(ANSWERS, per_criterion=True)
+    assert result["scores"] == {c: 0 for c in judge.CRITERIA}
+    assert all(r.startswith("Automatic scoring failed") for r in result["reasons"].values())
+    assert result["summary"] == "Automatic scoring failed. No summary available."
+
+
+def test_per_criterion_scores_with_mock(db, mock_llm, route_llm):
+    route_llm(mock_llm().url)
+    result = judge.evaluate_answers_with_llama(ANSWERS, per_criterion=True)
+    assert set(result["scores"]) == set(judge.CRITERIA)
+    assert all(s in judge.ALLOWED_SCORES for s in result["scores"].values())
+    assert result["summary"]
+
+
+def test_merge_falls_back_when_backend_is_unreachable(unreachable):
+    partial = {"answers": {}, "summary": ""}
+    result = judge.evaluate_answers_with_llama(ANSWERS, partial=partial)
+    assert result["scores"] == {c: 0 for c in judge.CRITERIA}
+    assert result["summary"] == "Automatic scoring failed. No summary available."
+
+
+def test_merge_keeps_partial_scores(unreachable):
+    scored = judge.criteria_for_focus("evidence")
+    partial = {
+        "answers": {"evidence": {
+            "scores": {c: 15 for c in scored},
+            "reasons": {c: "Concrete numbers." for c in scored},
+            "summary": "Measures outcomes.",
+        }},
+        "summary": "Measures outcomes.",
+    }
+    result = judge.evaluate_answers_with_llama(ANSWERS, partial=partial)
+    assert all(result["scores"][c] == 15 for c in scored)
+    assert result["summary"] == "Measures outcomes."
+
+
+def test_streamed_judge_raises_runtime_error_when_unreachable(unreachable):
+    # the Interview page streams the judge and shows a RuntimeError as an error message
+    with pytest.raises(RuntimeError):
+        judge.evaluate_answers_with_llama(ANSWERS, on_delta=lambda delta: None,
+                                          per_criterion=False)
+
+
+@pytest.fixture
+def recorded_prompts(db, mock_llm, route_llm, monkeypatch):
+    route_llm(mock_llm().url)
+    prompts = []
+    complete = judge.complete_structured
+
+    def record(name, messages, *args, **kwargs):
+        prompts.append((name, messages[-1]["content"]))
+        return complete(name, messages, *args, **kwargs)
+
+    monkeypatch.setattr(judge, "complete_structured", record)
+    return prompts
+
+
+def test_judge_scores_per_answer_instead_of_clipping(recorded_prompts, monkeypatch):
+    long_answers = {k: v * 40 for k, v in ANSWERS.items()}
+    monkeypatch.setitem(budget.PROMPT_BUDGETS, "judge", 1000)
+    result = judge.evaluate_answers_with_llama(long_answers, per_criterion=False)
+    assert set(result["scores"]) == set(judge.CRITERIA)
+    assert [name for name, _ in recorded_prompts] == ["judge_answer", "judge_answer"]
+    for (_, prompt), answer in zip(recorded_prompts, long_answers.values()):
+        assert answer in prompt
+
+
+def test_judge_fails_when_one_answer_does_not_fit(recorded_prompts, monkeypatch):
+    monkeypatch.setitem(budget.PROMPT_BUDGETS, "judge", 200)
+    monkeypatch.setitem(budget.PROMPT_BUDGETS, "judge_answer", 200)
+    long_answers = {k: v * 40 for k, v in ANSWERS.items()}
+    with pytest.raises(PromptTooLong):
+        judge.evaluate_answers_with_llama(long_answers, per_criterion=False)
+    assert recorded_prompts == []
+
+
+def test_failed_parts_flags_placeholder_scores(unreachable):
+    result = judge.evaluate_answers_with_llama(ANSWERS, per_criterion=True)
+    assert judge.failed_parts(result) == [*judge.CRITERIA, "summary"]
+    ok = {"scores": {c: 5 for c in judge.CRITERIA},
+          "reasons": {c: "Some evidence." for c in judge.CRITERIA}, "summary": "Works in slices."}
+    assert judge.failed_parts(ok) == []
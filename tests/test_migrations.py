@@ -0,0 +1,85 @@
+# tests/test_migrations.py
+import json
+import sqlite3
+import threading
+
+import pytest
+
+from app.db import connection, migrations
+from app.db.connection import get_conn
+from app.db.evaluations import get_evaluation
+
+VERSIONS = [version for version, _, _ in migrations.MIGRATIONS]
+
+
+@pytest.fixture
+def empty_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, "DB_PATH", tmp_path / "jobfit.db")
+    yield connection.DB_PATH
+    connection.close_thread_connections()
+
+
+def test_migrations_are_numbered_in_order():
+    assert VERSIONS == list(range(1, len(VERSIONS) + 1))
+
+
+def test_fresh_database_gets_every_migration_once(empty_db):
+    assert migrations.run_migrations() == VERSIONS
+    assert migrations.run_migrations() == []
+    assert migrations.schema_version() == VERSIONS[-1]
+
+
+def test_database_from_old_init_functions_is_upgraded(empty_db):
+    # the schema the pages created before migrations existed, with one evaluation
+    scores = {"Evidence density": 10, "Decision quality": 15}
+    conn = sqlite3.connect(empty_db)
+    with conn:
+        conn.execute("CREATE TABLE roles (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                     "company_name TEXT, title TEXT)")
+        conn.execute("CREATE TABLE evaluations (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                     "role_id INTEGER, candidate_name TEXT, candidate_email TEXT, "
+                     "candidate_phone TEXT, answers_json TEXT, scores_json TEXT, "
+                     "summary TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+        conn.execute("INSERT INTO roles (company_name, title) VALUES ('Old Co', 'Engineer')")
+        conn.execute("INSERT INTO evaluations (role_id, candidate_name, scores_json, summary) "
+                     "VALUES (1, 'Legacy', ?, 'Old summary.')", (json.dumps(scores),))
+    conn.close()
+
+    assert migrations.run_migrations() == VERSIONS
+    ev = get_evaluation(1)
+    assert ev["candidate_name"] == "Legacy"
+    assert ev["total_score"] == 25  # typed score columns backfilled from scores_json
+
+
+def test_failed_migration_is_rolled_back(empty_db, monkeypatch):
+    def broken(conn):
+        conn.execute("CREATE TABLE half_done (id INTEGER)")
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(migrations, "MIGRATIONS",
+                        [*migrations.MIGRATIONS, (VERSIONS[-1] + 1, "broken", broken)])
+    with pytest.raises(sqlite3.OperationalError):
+        migrations.run_migrations()
+    assert migrations.schema_version() == VERSIONS[-1]
+    tables = {row[0] for row in get_conn().execute("SELECT name FROM sqlite_master")}
+    assert "half_done" not in tables
+
+
+def test_concurrent_runs_apply_each_migration_once(empty_db):
+    applied, errors = [], []
+
+    def run():
+        try:
+            applied.extend(migrations.run_migrations())
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close_thread_connections()
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert sorted(applied) == VERSIONS
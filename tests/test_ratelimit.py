@@ -0,0 +1,121 @@
+# tests/test_ratelimit.py
+import socket
+import time
+
+import pytest
+import requests
+
+from app.llm import client, ratelimit
+from app.llm.router import Backend
+
+
+def _half_open(breaker):
+    for _ in range(breaker.threshold):
+        breaker.record_failure()
+    assert breaker.state == "open"
+    time.sleep(breaker.cooldown + 0.01)
+    assert breaker.state == "half-open"
+
+
+def test_breaker_opens_after_threshold():
+    breaker = ratelimit.CircuitBreaker(threshold=3, cooldown=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.rejected == 1
+
+
+def test_breaker_success_resets_failures():
+    breaker = ratelimit.CircuitBreaker(threshold=2, cooldown=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = ratelimit.CircuitBreaker(threshold=1, cooldown=0.05)
+    _half_open(breaker)
+    assert breaker.allow()
+    assert not breaker.allow()  # the probe is still out
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_probe_reopens():
+    breaker = ratelimit.CircuitBreaker(threshold=1, cooldown=0.05)
+    _half_open(breaker)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.probing
+    time.sleep(0.06)
+    assert breaker.allow()  # next cooldown, next probe
+
+
+def test_released_probe_can_be_retried():
+    breaker = ratelimit.CircuitBreaker(threshold=1, cooldown=0.05)
+    _half_open(breaker)
+    assert breaker.allow()
+    breaker.release_probe()
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+
+
+@pytest.fixture
+def limiters(monkeypatch):
+    monkeypatch.setattr(ratelimit, "_limiters", {})
+    monkeypatch.setattr(ratelimit, "DEFAULT_RPM", 0)
+    monkeypatch.setattr(ratelimit, "DEFAULT_TPM", 0)
+
+
+def _probing_breaker(name):
+    breaker = ratelimit.get_limiter(name).breaker
+    breaker.threshold, breaker.cooldown = 1, 0.05
+    _half_open(breaker)
+    return breaker
+
+
+def _post(backend, timeout):
+    messages = [{"role": "user", "content": "ping"}]
+    return client._post_completion(
+        backend, messages, 0.0, 16, time.monotonic() + timeout, max_retries=0
+    )
+
+
+def test_timed_out_probe_reopens_breaker(limiters, mock_llm):
+    server = mock_llm(latency="fixed:1.0")
+    backend = Backend("probe-timeout", "mock-llm", server.url, "test")
+    breaker = _probing_breaker(backend.name)
+
+    with pytest.raises(RuntimeError, match="timed out"):
+        _post(backend, timeout=0.2)
+    assert breaker.state == "open"
+    assert not breaker.probing
+
+
+def test_connection_error_probe_reopens_breaker(limiters):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    backend = Backend("probe-refused", "mock-llm", f"http://127.0.0.1:{port}/v1", "test")
+    breaker = _probing_breaker(backend.name)
+
+    with pytest.raises(requests.ConnectionError):
+        _post(backend, timeout=2)
+    assert breaker.state == "open"
+    assert not breaker.probing
+
+
+def test_successful_probe_closes_breaker(limiters, mock_llm):
+    server = mock_llm()
+    backend = Backend("probe-ok", "mock-llm", server.url, "test")
+    breaker = _probing_breaker(backend.name)
+
+    data = _post(backend, timeout=5)
+    assert data["choices"][0]["message"]["content"]
+    assert breaker.state == "closed"
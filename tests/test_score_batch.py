@@ -0,0 +1,52 @@
+# tests/test_score_batch.py
+import json
+
+import pytest
+
+from app.cli import score_batch
+from app.db.connection import get_conn
+from app.db.roles import add_role
+
+RECORDS = [
+    {"name": f"Candidate {i}", "answers": {"evidence": f"I shipped project {i} in two weeks."}}
+    for i in range(3)
+]
+
+
+@pytest.fixture
+def batch_file(db, tmp_path):
+    role_id = add_role({"company_name": "Test Co", "title": "Data Engineer"})
+    path = tmp_path / "answers.jsonl"
+    path.write_text("".join(json.dumps(r) + "\n" for r in RECORDS) + "not json\n")
+    return path, role_id
+
+
+def _run(path, role_id):
+    return score_batch.run(path, role_id, "jsonl", workers=2, batch_size=2, per_criterion=True)
+
+
+def _evaluation_count():
+    return get_conn().execute("SELECT COUNT(*) FROM evaluations").fetchone()[0]
+
+
+def test_rerun_only_scores_missing_records(batch_file, mock_llm, route_llm):
+    route_llm(mock_llm().url)
+    first = _run(*batch_file)
+    assert (first["scored"], first["failed"]) == (3, 1)  # the last line does not parse
+
+    second = _run(*batch_file)
+    assert (second["skipped"], second["scored"], second["failed"]) == (3, 0, 1)
+    assert _evaluation_count() == 3
+
+
+def test_failed_judgements_are_not_checkpointed(batch_file, mock_llm, route_llm,
+                                                 unreachable_llm):
+    # every judge request fails: the fallback zeros must not be saved as scores
+    summary = _run(*batch_file)
+    assert (summary["scored"], summary["failed"]) == (0, 4)
+    assert _evaluation_count() == 0
+
+    route_llm(mock_llm().url)
+    summary = _run(*batch_file)
+    assert (summary["skipped"], summary["scored"]) == (0, 3)
+    assert _evaluation_count() == 3
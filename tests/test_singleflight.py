@@ -0,0 +1,107 @@
+# tests/test_singleflight.py
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.llm import cache, client, ratelimit, singleflight
+from app.llm import router as routing
+
+
+def _follow(flight, timeout=2.0):
+    """Run flight.result() in a thread; returns a getter for its outcome."""
+    outcome = {}
+
+    def run():
+        try:
+            outcome["content"] = flight.result(time.monotonic() + timeout)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+
+    def get():
+        thread.join(timeout + 1)
+        return outcome
+
+    return get
+
+
+def test_followers_share_the_answer():
+    key = f"test-{uuid.uuid4()}"
+    flight, leader = singleflight.join(key)
+    assert leader
+    same, leader = singleflight.join(key)
+    assert same is flight and not leader
+
+    result = _follow(flight)
+    flight.push("hello ")
+    flight.push("world")
+    singleflight.land(key, flight)
+    assert result() == {"content": "hello world"}
+
+
+def test_landing_with_error_wakes_followers():
+    key = f"test-{uuid.uuid4()}"
+    flight, _ = singleflight.join(key)
+    result = _follow(flight)
+    error = RuntimeError("LLM call timed out.")
+    singleflight.land(key, flight, error)
+    assert result()["error"] is error
+
+    # the next identical call starts a new flight
+    again, leader = singleflight.join(key)
+    assert leader and again is not flight
+    singleflight.land(key, again)
+
+
+def test_abandoned_flight_tells_followers_to_retry():
+    key = f"test-{uuid.uuid4()}"
+    flight, _ = singleflight.join(key)
+    result = _follow(flight)
+    singleflight.land(key, flight, RuntimeError("LLM call cancelled."), abandoned=True)
+    assert isinstance(result()["error"], singleflight.Abandoned)
+
+
+def test_follower_gives_up_at_its_deadline():
+    key = f"test-{uuid.uuid4()}"
+    flight, _ = singleflight.join(key)
+    with pytest.raises(RuntimeError, match="deadline"):
+        flight.result(time.monotonic() + 0.05)
+    singleflight.land(key, flight)
+
+
+@pytest.fixture
+def mock_client(db, mock_llm, monkeypatch):
+    server = mock_llm(latency="fixed:0.2")
+    backend = routing.Backend("mock-singleflight", "mock-llm", server.url, "test")
+    monkeypatch.setattr(client, "router", routing.Router([backend], {}))
+    monkeypatch.setattr(ratelimit, "_limiters", {})
+    monkeypatch.setattr(ratelimit, "DEFAULT_RPM", 0)
+    monkeypatch.setattr(ratelimit, "DEFAULT_TPM", 0)
+    monkeypatch.setattr(cache, "CACHE_ENABLED", True)
+    return server
+
+
+def test_cache_write_failure_does_not_strand_followers(mock_client, monkeypatch):
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(cache, "save_cached_response", locked)
+    messages = [{"role": "user", "content": f"singleflight {uuid.uuid4()}"}]
+    before = {**cache.cache_stats(), **singleflight.singleflight_stats()}
+
+    with ThreadPoolExecutor(3) as pool:
+        futures = [pool.submit(client.call_llm, messages, 0.0, 32, 5) for _ in range(3)]
+        replies = [f.result(timeout=5) for f in futures]
+
+    after = {**cache.cache_stats(), **singleflight.singleflight_stats()}
+    assert len(set(replies)) == 1 and replies[0]
+    assert after["coalesced"] - before["coalesced"] == 2
+    assert after["store_errors"] - before["store_errors"] == 1
+    assert after["in_flight"] == 0
+    assert mock_client.stats()["requests"] == 1
@@ -0,0 +1,110 @@
+# tests/test_structured.py
+import json
+
+import pytest
+
+from app.llm import structured
+from app.llm.structured import StructuredOutputError, _merge, _prune, parse_json, validate
+
+SCHEMA = {
+    "type": "object",
+    "required": ["score", "reason"],
+    "properties": {
+        "score": {"type": "integer", "enum": [0, 5, 10, 15, 20]},
+        "reason": {"type": "string", "minLength": 1},
+    },
+}
+
+
+@pytest.mark.parametrize("raw, value, repaired", [
+    ('{"a": 1}', {"a": 1}, False),
+    ('```json\n{"a": 1}\n```', {"a": 1}, False),
+    ('Sure! Here it is: {"a": 1} Hope this helps.', {"a": 1}, True),
+    ('{"a": 1, "b": [1, 2,],}', {"a": 1, "b": [1, 2]}, True),
+    ('{"a": 1, "b": {"c": [1, 2]', {"a": 1, "b": {"c": [1, 2]}}, True),
+    # the last value may itself be cut ("2" of "25"): only complete ones are kept
+    ('{"a": 1, "b": {"c": [1, 2', {"a": 1, "b": {"c": [1]}}, True),
+    ('{"a": 1, "b": "cut mid-str', {"a": 1}, True),
+])
+def test_parse_json_repairs_locally(raw, value, repaired):
+    assert parse_json(raw) == (value, repaired)
+
+
+def test_parse_json_array_and_failure():
+    # the cut item keeps its complete fields; validation flags what is missing
+    assert parse_json('Questions: [{"id": 1}, {"id": 2, "q": "cut', expect="array") == (
+        [{"id": 1}, {"id": 2}], True)
+    with pytest.raises(ValueError):
+        parse_json("no json here")
+
+
+def test_validate_reports_every_violation():
+    assert validate({"score": 5, "reason": "ok"}, SCHEMA) == []
+    assert validate({"score": 7.0, "reason": " "}, SCHEMA) == [
+        ("$.score", "must be one of [0, 5, 10, 15, 20]"),
+        ("$.reason", "must not be empty"),
+    ]
+    assert validate({"score": True}, SCHEMA) == [
+        ("$.reason", "missing"), ("$.score", "expected integer"),
+    ]
+    assert validate([], {"type": "array", "minItems": 1}) == [("$", "expected at least 1 items")]
+
+
+def test_prune_drops_only_invalid_fields():
+    value = {"scores": {"a": 5, "b": 7}, "reasons": {"a": "ok"}, "summary": ""}
+    errors = [("$.scores.b", "must be one of"), ("$.summary", "must not be empty")]
+    assert _prune(value, errors) == {"scores": {"a": 5}, "reasons": {"a": "ok"}}
+    assert _prune([{"id": 1}, {"id": 2}, {"id": 3}], [("$[1].q", "missing")]) == [
+        {"id": 1}, {"id": 3}]
+
+
+def test_merge_patches_objects_and_arrays_by_id():
+    assert _merge({"scores": {"a": 5}, "summary": "x"}, {"scores": {"b": 10}}) == {
+        "scores": {"a": 5, "b": 10}, "summary": "x"}
+    assert _merge([{"id": 2, "q": "b"}, {"id": 1, "q": "a"}], [{"id": 3, "q": "c"}]) == [
+        {"id": 1, "q": "a"}, {"id": 2, "q": "b"}, {"id": 3, "q": "c"}]
+    assert _merge(["a"], ["b"]) == ["b"]
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """complete_structured against canned replies; records the cache corrections."""
+    calls, corrections = [], []
+
+    def start(*replies):
+        replies = iter(replies)
+
+        def call_llm(messages, **kwargs):
+            calls.append(messages)
+            return next(replies)
+
+        monkeypatch.setattr(structured, "call_llm", call_llm)
+        monkeypatch.setattr(structured, "replace_cached_reply",
+                            lambda *args: corrections.append(args[-1]))
+        return calls, corrections
+
+    return start
+
+
+def test_reask_asks_only_for_invalid_fields(fake_llm):
+    calls, corrections = fake_llm('{"score": 7, "reason": "Concrete."}', '{"score": 10}')
+    value = structured.complete_structured("test", [{"role": "user", "content": "?"}],
+                                           SCHEMA, 0.1, 100)
+    assert value == {"score": 10, "reason": "Concrete."}
+    assert "$.score" in calls[1][-1]["content"] and "$.reason" not in calls[1][-1]["content"]
+    # the raw first reply was cached before validation: replaced by the valid value
+    assert [json.loads(c) for c in corrections] == [{"score": 10, "reason": "Concrete."}]
+
+
+def test_clean_reply_leaves_cache_alone(fake_llm):
+    calls, corrections = fake_llm('{"score": 5, "reason": "Some."}')
+    structured.complete_structured("test", [], SCHEMA, 0.1, 100)
+    assert len(calls) == 1 and corrections == []
+
+
+def test_unusable_reply_is_evicted_and_raised(fake_llm):
+    calls, corrections = fake_llm("I cannot score this.", "Still no JSON.")
+    with pytest.raises(StructuredOutputError) as info:
+        structured.complete_structured("test", [], SCHEMA, 0.1, 100)
+    assert info.value.value is None and info.value.raw == "I cannot score this."
+    assert corrections == [None]  # dropped from the cache
@@ -0,0 +1,61 @@
+# tests/test_variants.py
+import pytest
+
+from app.db import variants
+from app.db.connection import get_conn
+from app.db.roles import add_role
+from app.jobs import prefetch
+
+PLAN = [{"id": "s1", "focus": "evidence"}, {"id": "s2", "focus": "failure"}]
+
+
+@pytest.fixture
+def role(db):
+    return {"id": add_role({"company_name": "Test Co", "title": "Data Engineer"})}
+
+
+def _rows(role_id):
+    return get_conn().execute(
+        "SELECT slot_id, question, served_count FROM question_variants WHERE role_id = ? "
+        "ORDER BY id", (role_id,),
+    ).fetchall()
+
+
+def _serve(role_id, question, times):
+    conn = get_conn()
+    with conn:
+        conn.execute("UPDATE question_variants SET served_count = ? "
+                     "WHERE role_id = ? AND question = ?", (times, role_id, question))
+
+
+def test_round_robin_draws_least_served(role):
+    variants.add_question_variants(role["id"], "h", [("s1", "a"), ("s1", "b"), ("s2", "c")])
+    first = variants.draw_variants(role["id"], "h", ["s1", "s2"])
+    second = variants.draw_variants(role["id"], "h", ["s1", "s2"])
+    assert first == {"s1": "a", "s2": "c"}
+    assert second == {"s1": "b", "s2": "c"}
+    assert variants.draw_variants(role["id"], "h", ["s1", "s3"]) is None
+
+
+def test_delete_exhausted_keeps_slots_without_fresh_variants(role):
+    variants.add_question_variants(role["id"], "h", [("s1", "old"), ("s1", "new"), ("s2", "only")])
+    _serve(role["id"], "old", 20)
+    _serve(role["id"], "only", 20)
+    assert variants.delete_exhausted_variants(role["id"], "h", 20) == 1
+    assert [q for _, q, _ in _rows(role["id"])] == ["new", "only"]
+
+
+def test_top_up_prunes_used_up_variants(role, monkeypatch):
+    batches = iter([{"s1": ["a1", "a2"], "s2": ["b1", "b2"]},
+                    {"s1": ["a3", "a4"], "s2": ["b3", "b4"]}])
+    monkeypatch.setattr(prefetch, "generate_question_variants",
+                        lambda plan, role, n: next(batches))
+    monkeypatch.setattr(prefetch, "VARIANT_MAX_SERVES", 2)
+    monkeypatch.setattr(prefetch, "VARIANT_LOW_WATER", 2)
+
+    prefetch._top_up_variants(role, PLAN, "h")
+    for q in ("a1", "a2", "b1", "b2"):
+        _serve(role["id"], q, 2)
+    prefetch._top_up_variants(role, PLAN, "h")
+
+    assert sorted(q for _, q, _ in _rows(role["id"])) == ["a3", "a4", "b3", "b4"]